@@ -0,0 +1,77 @@
+"""
+Startup benchmark for the StaticGuard entry points.
+
+Each case runs in a fresh interpreter, so import caches do not carry over.
+Run from the repository root:
+
+    python benchmarks/startup.py --runs 10
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CASES: Dict[str, List[str]] = {
+    "sglib.tools": ["-c", "import staticguard_agent.sglib.tools"],
+    "cli --help": ["-m", "staticguard_agent", "--help"],
+    "agent module (tools only)": ["-c", "import staticguard_agent.agent"],
+    "root_agent (ADK)": ["-c", "from staticguard_agent.agent import root_agent"],
+}
+
+# Fails the CLI case if ADK sneaks back into its import graph.
+ADK_CHECK = (
+    "import sys, staticguard_agent.cli, staticguard_agent.agent; "
+    "heavy = sorted(m for m in sys.modules if m.startswith(('google.adk', 'google.genai'))); "
+    "sys.exit('loaded: ' + ', '.join(heavy[:5]) if heavy else 0)"
+)
+
+
+def time_case(args: List[str], runs: int) -> List[float]:
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args],
+            cwd=ROOT,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    subprocess.run(
+        [sys.executable, "-c", ADK_CHECK],
+        cwd=ROOT,
+        env=dict(os.environ, PYTHONPATH=str(ROOT)),
+        check=True,
+    )
+
+    print(f"{'case':<28} {'median':>9} {'min':>9}")
+    for name, case_args in CASES.items():
+        timings = time_case(case_args, args.runs)
+        print(
+            f"{name:<28} {statistics.median(timings) * 1000:>7.0f}ms "
+            f"{min(timings) * 1000:>7.0f}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1 +1,12 @@
-from . import agent
+from __future__ import annotations
+
+import importlib
+from typing import Any
+
+
+def __getattr__(name: str) -> Any:
+    # The agent module (and with it ADK) is only imported when something
+    # asks for it, so `staticguard_agent.sglib` and the CLI stay light.
+    if name == "agent":
+        return importlib.import_module(f"{__name__}.agent")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,6 @@
+from __future__ import annotations
+
+from .cli import main
+
+
+raise SystemExit(main())
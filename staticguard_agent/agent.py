@@ -1,12 +1,19 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
-
-from google.adk.agents.llm_agent import Agent
-from google.adk.tools.agent_tool import AgentTool
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 from .sglib.tools import run_bandit, evaluate_patch, BanditError
-from .sub_agents import scanner_agent, fixer_agent, save_report_tool
+from .sub_agents import (
+    build_scanner_agent,
+    build_fixer_agent,
+    save_report_tool,
+    record_scan,
+    record_patch_eval,
+)
+
+if TYPE_CHECKING:
+    from google.adk.agents.llm_agent import Agent
 
 
 def scan_repo(path: str, severity_filter: Optional[str] = None) -> Dict[str, Any]:
@@ -29,7 +36,7 @@ def scan_repo(path: str, severity_filter: Optional[str] = None) -> Dict[str, Any
     instead of raising, so the agent can handle it gracefully.        
     """
     try:
-        return run_bandit(path=path, severity_filter=severity_filter)
+        result = run_bandit(path=path, severity_filter=severity_filter)
     except BanditError as e:
         return {
             "path": path,
@@ -37,66 +44,103 @@ def scan_repo(path: str, severity_filter: Optional[str] = None) -> Dict[str, Any
             "summary": {},
             "results": [],
         }
+    record_scan(result)
+    return result
 
 
 def evaluate_patch_tool(
     file_path: str,
     patched_content: str,
     severity_filter: Optional[str] = None,
+    test_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Tool: Compare Bandit results before and after applying a patch to a file.
 
     The agent should pass the original file path and the FULL patched file
-    content. The tool runs Bandit on the original file and on a temporary
-    file containing the patched content, then returns summaries and deltas.
+    content, plus the test_id of the targeted finding when known. The tool
+    runs Bandit on the original file and on a temporary file containing the
+    patched content, then returns summaries and deltas.
     """
-    return evaluate_patch(
+    result = evaluate_patch(
         file_path=file_path,
         patched_content=patched_content,
         severity_filter=severity_filter,
     )
+    record_patch_eval(result, test_id)
+    return result
+
+
+@lru_cache(maxsize=None)
+def build_agent_tools() -> Dict[str, Any]:
+    """
+    Wrap the sub-agents as tools for the coordinator (Agent-as-a-Tool
+    pattern). Built on first use, like the agents themselves.
+    """
+    from google.adk.tools.agent_tool import AgentTool
+
+    return {
+        "scanner_tool": AgentTool(agent=build_scanner_agent(), skip_summarization=False),
+        "fixer_tool": AgentTool(agent=build_fixer_agent(), skip_summarization=False),
+    }
+
+
+@lru_cache(maxsize=None)
+def build_root_agent() -> "Agent":
+    """
+    Build the coordinator agent on first use.
+
+    ADK and google.genai are imported here rather than at module level, so
+    the tools above (and sglib) can be used without loading them.
+    """
+    from google.adk.agents.llm_agent import Agent
+
+    return Agent(
+        model="gemini-2.5-flash",
+        name="staticguard_root",
+        description=(
+            "StaticGuard – a static security patch assistant for Python code, "
+            "designed and implemented by Amjad Kudsi."
+        ),
+        instruction=(
+            "You are StaticGuard, a static-only security assistant for Python code. "
+            "You coordinate a scanner agent and a fixer agent to run Bandit, propose a "
+            "minimal patch, evaluate it, and report Bandit findings before and after.\n\n"
+            "If the user asks for 'help' or 'about', explain what StaticGuard does and "
+            "mention that it was created by Amjad Kudsi as part of the 5-Day AI Agents "
+            "Intensive (Google x Kaggle)."
+            "analyzer for Python) to detect issues and evaluate patches.\n\n"
+            "Tools available:\n"
+            "1) scan_repo(path, severity_filter=None): run Bandit on a file or "
+            "directory and return a JSON summary of findings.\n"
+            "2) evaluate_patch_tool(file_path, patched_content, "
+            "severity_filter=None, test_id=None): run Bandit on the original file and on a "
+            "temporary file containing the patched content, then return severity "
+            "summaries and their difference.\n\n"
+            "When the user asks to improve or fix a specific Bandit finding in a "
+            "file, follow this pattern:\n"
+            "- First, call scan_repo to understand the current issues.\n"
+            "- Propose a SMALL, LOCAL patch that only modifies the function or "
+            "small region that contains the issue. Avoid refactoring unrelated "
+            "code.\n"
+            "- Produce both (a) the full patched file content and (b) a unified "
+            "diff for the user to review.\n"
+            "- Then call evaluate_patch_tool with the original file path and the "
+            "FULL patched content to compute Bandit metrics before and after.\n"
+            "- Finally, explain the metrics (original vs patched, including delta) "
+            "and whether the patch seems to reduce or introduce issues.\n\n"
+            "Never claim to have executed the code or tests. You only perform "
+            "static analysis using Bandit."
+        ),
+        tools=[scan_repo, evaluate_patch_tool, save_report_tool],
+    )
+
 
-# Wrapping subagents as tools for the coordinator (Agent-as-a-Tool pattern). 
-scanner_tool = AgentTool(agent=scanner_agent, skip_summarization=False)
-fixer_tool = AgentTool(agent=fixer_agent, skip_summarization=False)
-
-root_agent = Agent(
-    model="gemini-2.5-flash",
-    name="staticguard_root",
-    description=(
-        "StaticGuard – a static security patch assistant for Python code, "
-        "designed and implemented by Amjad Kudsi."
-    ),
-    instruction=(
-        "You are StaticGuard, a static-only security assistant for Python code. "
-        "You coordinate a scanner agent and a fixer agent to run Bandit, propose a "
-        "minimal patch, evaluate it, and report Bandit findings before and after.\n\n"
-        "If the user asks for 'help' or 'about', explain what StaticGuard does and "
-        "mention that it was created by Amjad Kudsi as part of the 5-Day AI Agents "
-        "Intensive (Google x Kaggle)."
-        "analyzer for Python) to detect issues and evaluate patches.\n\n"
-        "Tools available:\n"
-        "1) scan_repo(path, severity_filter=None): run Bandit on a file or "
-        "directory and return a JSON summary of findings.\n"
-        "2) evaluate_patch_tool(file_path, patched_content, "
-        "severity_filter=None): run Bandit on the original file and on a "
-        "temporary file containing the patched content, then return severity "
-        "summaries and their difference.\n\n"
-        "When the user asks to improve or fix a specific Bandit finding in a "
-        "file, follow this pattern:\n"
-        "- First, call scan_repo to understand the current issues.\n"
-        "- Propose a SMALL, LOCAL patch that only modifies the function or "
-        "small region that contains the issue. Avoid refactoring unrelated "
-        "code.\n"
-        "- Produce both (a) the full patched file content and (b) a unified "
-        "diff for the user to review.\n"
-        "- Then call evaluate_patch_tool with the original file path and the "
-        "FULL patched content to compute Bandit metrics before and after.\n"
-        "- Finally, explain the metrics (original vs patched, including delta) "
-        "and whether the patch seems to reduce or introduce issues.\n\n"
-        "Never claim to have executed the code or tests. You only perform "
-        "static analysis using Bandit."
-    ),
-    tools=[scan_repo, evaluate_patch_tool, save_report_tool],
-    )
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    # `adk run`, `adk web` and main_local look up root_agent here; it is
+    # built on first access.
+    if name == "root_agent":
+        return build_root_agent()
+    if name in ("scanner_tool", "fixer_tool"):
+        return build_agent_tools()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
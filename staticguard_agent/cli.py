@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Any, Optional, Sequence
+
+from .sglib.files import FileTooLargeError
+from .sglib.limits import (
+    DEFAULT_FILE_TIMEOUT,
+    DEFAULT_MAX_AST_DEPTH,
+    DEFAULT_MAX_FILE_SIZE,
+    DEFAULT_SCAN_TIMEOUT,
+    LIMIT_POLICIES,
+)
+from .sglib.report_writer import FORMATS, ReportWriter
+from .sglib.tools import BanditError, evaluate_patch, load_file, patch_accepted, run_bandit
+
+
+def _add_scan_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("path", help="Python file, directory or archive")
+    parser.add_argument("--severity", help="Only report LOW, MEDIUM or HIGH findings")
+    parser.add_argument("--scan-timeout", type=float, default=DEFAULT_SCAN_TIMEOUT)
+    parser.add_argument("--file-timeout", type=float, default=DEFAULT_FILE_TIMEOUT)
+    parser.add_argument("--max-file-size", type=int, default=DEFAULT_MAX_FILE_SIZE)
+    parser.add_argument("--max-ast-depth", type=int, default=DEFAULT_MAX_AST_DEPTH)
+    parser.add_argument("--limit-policy", choices=LIMIT_POLICIES, default="skip")
+    parser.add_argument("--max-memory-mb", type=int)
+    parser.add_argument(
+        "--workers", type=int, help="Scan a directory in this many shard worker processes"
+    )
+
+
+def _scan(args: argparse.Namespace) -> Any:
+    return run_bandit(
+        path=args.path,
+        severity_filter=args.severity,
+        scan_timeout=args.scan_timeout,
+        file_timeout=args.file_timeout,
+        max_file_size=args.max_file_size,
+        max_ast_depth=args.max_ast_depth,
+        limit_policy=args.limit_policy,
+        max_memory_mb=args.max_memory_mb,
+        workers=args.workers,
+    )
+
+
+def _print_json(data: Any) -> None:
+    json.dump(data, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Scan-only command line, for example:
+
+        python -m staticguard_agent scan crm_helper --severity HIGH
+        python -m staticguard_agent evaluate crm_helper/backup.py patched.py --test-id B602
+        python -m staticguard_agent report crm_helper --output reports/crm --format sarif
+
+    It only uses sglib and never imports ADK or google.genai.
+
+    Exit codes: 0 on success (no findings for scan, accepted patch for
+    evaluate), 1 when scan finds issues or evaluate rejects the patch, 2 on
+    errors.
+    """
+    parser = argparse.ArgumentParser(
+        prog="staticguard", description="StaticGuard static security checks"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scan = sub.add_parser("scan", help="Run Bandit and print the findings as JSON")
+    _add_scan_options(scan)
+
+    evaluate = sub.add_parser(
+        "evaluate", help="Compare Bandit findings before and after a patch"
+    )
+    evaluate.add_argument("file", help="Original Python file")
+    evaluate.add_argument("patched", help="File with the full patched content")
+    evaluate.add_argument("--severity", help="Severity filter for both scans")
+    evaluate.add_argument("--test-id", help="Bandit test_id the patch targets")
+
+    report = sub.add_parser("report", help="Scan and write Markdown, SARIF or JSONL")
+    _add_scan_options(report)
+    report.add_argument(
+        "--output", default="staticguard_report", help="Output path without suffix"
+    )
+    report.add_argument(
+        "--format",
+        dest="formats",
+        action="append",
+        choices=FORMATS,
+        help="Report format; repeat for several (default: markdown)",
+    )
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "scan":
+            result = _scan(args)
+            _print_json(result)
+            return 1 if result["results"] else 0
+
+        if args.command == "evaluate":
+            eval_result = evaluate_patch(
+                file_path=args.file,
+                patched_content=load_file(args.patched),
+                severity_filter=args.severity,
+            )
+            eval_result["accepted"] = patch_accepted(eval_result, args.test_id)
+            _print_json(eval_result)
+            return 0 if eval_result["accepted"] else 1
+
+        with ReportWriter(args.output, formats=args.formats or ["markdown"]) as writer:
+            writer.add_scan(_scan(args))
+        for path in writer.close().values():
+            print(path)
+        return 0
+    except (BanditError, FileTooLargeError, OSError) as exc:
+        print(f"staticguard: {exc}", file=sys.stderr)
+        return 2
@@ -1,15 +1,22 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime
+from typing import Any, Dict, Optional
 from uuid import uuid4
 
+from google.adk.events import Event, EventActions
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.memory import InMemoryMemoryService
+from google.adk.sessions import Session
 from google.genai import types
 
 from staticguard_agent.agent import root_agent
+from staticguard_agent.persistence import SqliteMemoryService, create_session_service
+from staticguard_agent.sglib.history import (
+    build_run_summary,
+    default_history_path,
+    use_history_path,
+)
+from staticguard_agent.sglib.reporting import parse_markdown_report
 
 from pathlib import Path
 
@@ -18,12 +25,57 @@ APP_NAME = "staticguard_cli"
 USER_ID = "local_user"
 
 
-async def run_once(path: str) -> None:
-    """Run a single scan-and-fix pass and store a compact memory entry."""
+def _find_eval_result(session: Session) -> Optional[Dict[str, Any]]:
+    """Return the last evaluate_patch_tool response recorded in the session."""
+    for event in reversed(session.events):
+        for response in event.get_function_responses():
+            if response.name == "evaluate_patch_tool" and response.response:
+                return dict(response.response)
+    return None
+
+
+def _extract_run_summary(
+    path: str, session: Session, final_text: str
+) -> Dict[str, Any]:
+    """
+    Build the run_summary from the evaluation result of this run.
+
+    The evaluate_patch_tool response is used when the coordinator called it
+    directly; otherwise the counts are parsed back from the markdown report.
+    """
+    parsed = parse_markdown_report(final_text) or {}
+    eval_result = _find_eval_result(session) or (parsed or None)
+    return build_run_summary(
+        path=path,
+        eval_result=eval_result,
+        test_id=parsed.get("test_id"),
+        severity=parsed.get("severity"),
+        diff=parsed.get("diff", ""),
+    )
+
+
+async def run_once(
+    path: str,
+    db_path: Optional[str] = None,
+    user_id: str = USER_ID,
+) -> Dict[str, Any]:
+    """
+    Run a single scan-and-fix pass, store a compact memory entry and return
+    the run summary. user_id scopes sessions and memory (for example to one
+    tenant when run from the scheduler).
+
+    db_path is also used by the agent tools (previous fixes, findings
+    store) during the run, so lookups and writes go to the same database.
+    """
+    db_path = db_path or default_history_path()
+    with use_history_path(db_path):
+        return await _run_once(path, db_path, user_id)
 
-    # 1. Set up session and memory services (in-memory, dev friendly).
-    session_service = InMemorySessionService()
-    memory_service = InMemoryMemoryService()
+
+async def _run_once(path: str, db_path: str, user_id: str) -> Dict[str, Any]:
+    # 1. Set up session and memory services (SQLite, persistent across runs).
+    session_service = create_session_service(db_path)
+    memory_service = SqliteMemoryService(db_path)
 
     # 2. Create the Runner that ties agent + sessions + memory together.
     runner = Runner(
@@ -37,7 +89,7 @@ async def run_once(path: str) -> None:
     session_id = str(uuid4())
     await session_service.create_session(
         app_name=APP_NAME,
-        user_id=USER_ID,
+        user_id=user_id,
         session_id=session_id,
     )
 
@@ -57,7 +109,7 @@ async def run_once(path: str) -> None:
     # 5. Run the agent once and capture the final response text.
     final_text = ""
     async for event in runner.run_async(
-        user_id=USER_ID,
+        user_id=user_id,
         session_id=session_id,
         new_message=user_msg,
     ):
@@ -70,29 +122,30 @@ async def run_once(path: str) -> None:
     # 6. Retrieve the completed session object.
     session = await session_service.get_session(
         app_name=APP_NAME,
-        user_id=USER_ID,
+        user_id=user_id,
         session_id=session_id,
     )
 
-    # 7. Attach a compact summary to the session state.
-    #    (Later you can parse final_text to fill in exact counts.)
-    session.state["run_summary"] = {
-        "path": path,
-        "timestamp_utc": datetime.utcnow().isoformat(timespec="seconds"),
-        # placeholders for now; Step 5 will parse the real numbers
-        "bandit_findings_before": "unknown",
-        "bandit_findings_after": "unknown",
-        "patch_attempted": True,
-    }
+    # 7. Attach a compact summary with the real before/after counts to the
+    #    session state. It goes through an event so the session service
+    #    persists it.
+    run_summary = _extract_run_summary(path, session, final_text)
+    await session_service.append_event(
+        session,
+        Event(
+            author="staticguard_cli",
+            actions=EventActions(state_delta={"run_summary": run_summary}),
+        ),
+    )
 
     # 8. Add the session to the long-term memory store.
     await memory_service.add_session_to_memory(session)
-    print("\n[debug] Session added to InMemoryMemoryService")
+    print(f"\n[debug] Session added to run history at {db_path}")
 
     # 9. Optional: prove memory works by searching it immediately.
     search_result = await memory_service.search_memory(
         app_name=APP_NAME,
-        user_id=USER_ID,
+        user_id=user_id,
         query=path,
     )
 
@@ -101,6 +154,8 @@ async def run_once(path: str) -> None:
         if mem.content and mem.content.parts:
             print(f"  {i}.", mem.content.parts[0].text)
 
+    return run_summary
+
 
 async def main() -> None:
     path = input("Path to repo or file to scan: ").strip()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions import Session
+from google.adk.sessions.sqlite_session_service import SqliteSessionService
+from google.genai import types
+
+from .sglib.history import RunHistory, default_history_path, format_run_summary
+
+
+MAX_SEARCH_RESULTS = 10
+
+
+def create_session_service(db_path: Optional[str] = None) -> SqliteSessionService:
+    """
+    Create a durable session service backed by the StaticGuard history DB.
+
+    ADK's sessions/events tables live in the same SQLite file as the run
+    history table, so one file holds everything about past runs.
+    """
+    db_path = db_path or default_history_path()
+    # RunHistory creates the parent directory and switches the file to WAL.
+    RunHistory(db_path)
+    return SqliteSessionService(db_path)
+
+
+class SqliteMemoryService(BaseMemoryService):
+    """
+    Memory service that stores each session's run_summary in RunHistory.
+
+    Only the compact run_summary from session state is kept, not the full
+    event stream. search_memory uses the indexed path / test_id lookups of
+    RunHistory instead of scanning every stored event.
+    """
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self.history = RunHistory(db_path)
+
+    async def add_session_to_memory(self, session: Session) -> None:
+        summary = session.state.get("run_summary")
+        if not summary or not summary.get("path"):
+            return
+        await asyncio.to_thread(
+            self.history.record_run,
+            summary,
+            session_id=session.id,
+            app_name=session.app_name,
+            user_id=session.user_id,
+        )
+
+    async def search_memory(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        query: str,
+    ) -> SearchMemoryResponse:
+        rows = await asyncio.to_thread(
+            self.history.search,
+            query,
+            MAX_SEARCH_RESULTS,
+            app_name,
+            user_id,
+        )
+        return SearchMemoryResponse(
+            memories=[
+                MemoryEntry(
+                    content=types.Content(
+                        role="user",
+                        parts=[types.Part(text=format_run_summary(row))],
+                    ),
+                    author="staticguard",
+                    timestamp=row["timestamp_utc"],
+                    custom_metadata={
+                        "session_id": row["session_id"],
+                        "patch_accepted": row["patch_accepted"],
+                    },
+                )
+                for row in rows
+            ]
+        )
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+from .sglib.history import use_history_path
+from .sglib.job_queue import DEFAULT_LEASE_SECONDS, PRIORITIES, JobQueue
+from .sglib.reporting import _extract_counts
+from .sub_agents import scan_repo
+
+
+# Each job kind draws on one concurrency pool. Scans hold a Bandit worker;
+# scan-and-fix runs hold a model slot for as long as the agent runs.
+JOB_POOLS = {"scan": "bandit", "fix": "model"}
+
+DEFAULT_MAX_BANDIT_WORKERS = 2
+DEFAULT_MAX_MODEL_CALLS = 1
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+async def run_scan_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a 'scan' job: one run_bandit call, recorded in the findings store."""
+    params = job["params"]
+    result = await asyncio.to_thread(
+        scan_repo, job["path"], params.get("severity_filter")
+    )
+    if result.get("error"):
+        raise RuntimeError(result["error"])
+    total, high, medium, low = _extract_counts(result["summary"])
+    return {
+        "summary": {"total": total, "high": high, "medium": medium, "low": low},
+        "findings": len(result["results"]),
+        "skipped": len(result.get("skipped") or []),
+    }
+
+
+async def run_fix_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run a 'fix' job: one scan-and-fix pass of the agents (run_once).
+
+    The agents run on their own event loop in a worker thread. Their tools
+    call Bandit synchronously, which would otherwise block the scheduler's
+    loop for minutes, stalling other jobs and the lease heartbeat.
+    """
+    # Imported here so scan-only schedulers never load ADK.
+    from . import main_local
+
+    def fix() -> Dict[str, Any]:
+        return asyncio.run(main_local.run_once(job["path"], user_id=job["tenant"]))
+
+    return await asyncio.to_thread(fix)
+
+
+DEFAULT_HANDLERS: Dict[str, Handler] = {"scan": run_scan_job, "fix": run_fix_job}
+
+
+class Scheduler:
+    """
+    Runs jobs from a JobQueue with separate concurrency limits for Bandit
+    workers and model calls.
+
+    Jobs are claimed in queue order (priority, then per-tenant fair share)
+    whenever their pool has a free slot, so a long nightly scan never blocks
+    a PR gate scan once a Bandit worker frees up, and scans keep flowing
+    while every model slot is busy.
+
+    Several schedulers can share one database. Each claims jobs under its
+    own owner id and renews their leases while they run; jobs of a
+    scheduler that stopped renewing are requeued by the others.
+    """
+
+    def __init__(
+        self,
+        queue: Optional[JobQueue] = None,
+        max_bandit_workers: int = DEFAULT_MAX_BANDIT_WORKERS,
+        max_model_calls: int = DEFAULT_MAX_MODEL_CALLS,
+        handlers: Optional[Dict[str, Handler]] = None,
+        poll_interval: float = 1.0,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ) -> None:
+        self.queue = queue or JobQueue()
+        self.limits = {"bandit": max_bandit_workers, "model": max_model_calls}
+        self.handlers = handlers or DEFAULT_HANDLERS
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        try:
+            # Fix runs and their tools keep history in the queue's database.
+            with use_history_path(self.queue.db_path):
+                result = await self.handlers[job["kind"]](job)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            self.queue.fail(job["id"], error, owner=self.owner)
+        else:
+            self.queue.complete(job["id"], result, owner=self.owner)
+
+    async def run(self, stop_when_idle: bool = True) -> None:
+        """
+        Process jobs until the queue is empty (or forever, polling for new
+        jobs, with stop_when_idle=False). Leases of running jobs are renewed
+        every third of lease_seconds, and jobs whose lease expired (their
+        scheduler died) are requeued on the way.
+        """
+        active: Dict[asyncio.Task, str] = {}
+        in_use = {pool: 0 for pool in self.limits}
+        heartbeat = self.lease_seconds / 3
+        last_heartbeat = float("-inf")
+
+        while True:
+            if time.monotonic() - last_heartbeat >= heartbeat:
+                if active:
+                    self.queue.renew_leases(self.owner, self.lease_seconds)
+                self.queue.requeue_expired()
+                last_heartbeat = time.monotonic()
+
+            free_kinds = [
+                kind
+                for kind, pool in JOB_POOLS.items()
+                if kind in self.handlers and in_use[pool] < self.limits[pool]
+            ]
+            job = self.queue.claim_next(free_kinds, self.owner, self.lease_seconds)
+            if job is not None:
+                pool = JOB_POOLS[job["kind"]]
+                in_use[pool] += 1
+                active[asyncio.ensure_future(self._run_job(job))] = pool
+                continue
+
+            if not active:
+                if stop_when_idle:
+                    return
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            done, _ = await asyncio.wait(
+                active,
+                timeout=min(self.poll_interval, heartbeat),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                in_use[active.pop(task)] -= 1
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Command line entry point, for example:
+
+        python -m staticguard_agent.scheduler submit crm_helper --priority pr --tenant team-a
+        python -m staticguard_agent.scheduler submit big_repo --kind fix --priority backfill
+        python -m staticguard_agent.scheduler run --max-bandit-workers 4 --max-model-calls 2
+        python -m staticguard_agent.scheduler stats
+        python -m staticguard_agent.scheduler recover --all
+    """
+    parser = argparse.ArgumentParser(description="StaticGuard job scheduler")
+    parser.add_argument("--db", help="Path to the history database")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    submit = sub.add_parser("submit", help="Queue a job")
+    submit.add_argument("path")
+    submit.add_argument("--kind", choices=sorted(JOB_POOLS), default="scan")
+    submit.add_argument("--priority", choices=list(PRIORITIES), default="nightly")
+    submit.add_argument("--tenant", default="default")
+    submit.add_argument("--severity", help="Severity filter for scan jobs")
+
+    run = sub.add_parser("run", help="Process queued jobs")
+    run.add_argument("--max-bandit-workers", type=int, default=DEFAULT_MAX_BANDIT_WORKERS)
+    run.add_argument("--max-model-calls", type=int, default=DEFAULT_MAX_MODEL_CALLS)
+    run.add_argument(
+        "--forever", action="store_true", help="Keep polling for new jobs"
+    )
+
+    recover = sub.add_parser(
+        "recover", help="Requeue running jobs whose scheduler stopped"
+    )
+    recover.add_argument(
+        "--all",
+        action="store_true",
+        help="Requeue every running job, leased or not (no scheduler may be running)",
+    )
+
+    stats = sub.add_parser("stats", help="Queue depth and wait-time metrics")
+    stats.add_argument("--since", help="Only count waits of jobs started since then")
+
+    args = parser.parse_args(argv)
+    queue = JobQueue(args.db)
+
+    if args.command == "submit":
+        params = {"severity_filter": args.severity} if args.severity else {}
+        job_id = queue.submit(args.path, args.kind, args.priority, args.tenant, params)
+        print(job_id)
+        return 0
+
+    if args.command == "run":
+        scheduler = Scheduler(
+            queue,
+            max_bandit_workers=args.max_bandit_workers,
+            max_model_calls=args.max_model_calls,
+        )
+        asyncio.run(scheduler.run(stop_when_idle=not args.forever))
+        return 0
+
+    if args.command == "recover":
+        print(queue.requeue_running() if args.all else queue.requeue_expired())
+        return 0
+
+    json.dump(queue.stats(args.since), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
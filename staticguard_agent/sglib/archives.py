@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .limits import (
+    DEFAULT_FILE_TIMEOUT,
+    DEFAULT_MAX_AST_DEPTH,
+    DEFAULT_MAX_FILE_SIZE,
+    DEFAULT_SCAN_TIMEOUT,
+    check_source,
+    is_scannable_python_path,
+    memory_limiter,
+    skipped_entry,
+)
+
+
+# Wheels, eggs and zips are zip files; sdists are usually tarballs.
+ZIP_SUFFIXES = (".whl", ".zip", ".egg")
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# Findings in archive members are reported as '<archive>!<member>'.
+MEMBER_SEPARATOR = "!"
+
+# The worker runs with the package on its path, wherever the caller's cwd is.
+_PACKAGE_ROOT = str(Path(__file__).resolve().parents[2])
+
+
+class ArchiveScanError(Exception):
+    """Raised when an archive cannot be scanned at all."""
+
+
+def is_archive(path: str) -> bool:
+    """True if path is a file with a supported archive suffix."""
+    name = str(path).lower()
+    return Path(path).is_file() and name.endswith(ZIP_SUFFIXES + TAR_SUFFIXES)
+
+
+def iter_python_members(archive: str) -> Iterator[Tuple[str, int, IO[bytes]]]:
+    """
+    Yield (member name, size, readable stream) for each Python member.
+
+    Members are streamed straight from the archive and never extracted to
+    disk. Tarballs are read in stream mode, so each stream is only valid
+    until the next member is requested.
+    """
+    if str(archive).lower().endswith(ZIP_SUFFIXES):
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not is_scannable_python_path(info.filename):
+                    continue
+                with zf.open(info) as stream:
+                    yield info.filename, info.file_size, stream
+        return
+
+    with tarfile.open(archive, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile() or not is_scannable_python_path(member.name):
+                continue
+            stream = tf.extractfile(member)
+            if stream is not None:
+                yield member.name, member.size, stream
+
+
+def _python_member_names(archive: str) -> List[str]:
+    """Names of the Python members, read from the archive's headers only."""
+    if str(archive).lower().endswith(ZIP_SUFFIXES):
+        with zipfile.ZipFile(archive) as zf:
+            return [
+                info.filename
+                for info in zf.infolist()
+                if not info.is_dir() and is_scannable_python_path(info.filename)
+            ]
+    with tarfile.open(archive, mode="r|*") as tf:
+        return [
+            member.name
+            for member in tf
+            if member.isfile() and is_scannable_python_path(member.name)
+        ]
+
+
+# ----------------------------------------------------------------------
+# Worker side: runs in a subprocess, uses Bandit as a library
+# ----------------------------------------------------------------------
+
+
+class _MemberTimeout(BaseException):
+    """
+    Raised by the per-member alarm. Derives from BaseException because
+    Bandit catches Exception around each file.
+    """
+
+
+@contextmanager
+def _time_limit(seconds: Optional[float]) -> Iterator[None]:
+    if not seconds or not hasattr(signal, "setitimer"):
+        yield
+        return
+
+    def _expire(signum: int, frame: Any) -> None:
+        raise _MemberTimeout()
+
+    previous = signal.signal(signal.SIGALRM, _expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _emit(event: Dict[str, Any]) -> None:
+    sys.stdout.write(json.dumps(event) + "\n")
+    sys.stdout.flush()
+
+
+def scan_members(
+    members: Iterable[Tuple[str, int, IO[bytes]]],
+    file_timeout: Optional[float],
+    max_file_size: Optional[int],
+    max_ast_depth: Optional[int],
+    limit_policy: str,
+    emit: Callable[[Dict[str, Any]], None],
+) -> None:
+    """
+    Scan in-memory sources with Bandit as a library, emitting one event per
+    source (see iter_archive_scan for the event types).
+
+    members yields (filename, size, binary stream). Used by the archive
+    worker and by shard workers (see sharding.py). Must run in the main
+    thread of a worker process, since file_timeout uses SIGALRM.
+    """
+    try:
+        from bandit.core import config as b_config
+        from bandit.core import manager as b_manager
+    except ImportError:
+        emit({"type": "fatal", "message": "Bandit is not installed."})
+        raise SystemExit(2)
+
+    mgr = b_manager.BanditManager(b_config.BanditConfig(), "file", quiet=True)
+
+    for name, size, stream in members:
+        cache: Dict[str, bytes] = {}
+
+        def read(limit: Optional[int]) -> bytes:
+            if "data" not in cache:
+                cache["data"] = stream.read() if limit is None else stream.read(limit)
+            data = cache["data"]
+            return data if limit is None else data[:limit]
+
+        action, source, entry = check_source(
+            name, size, read, max_file_size, max_ast_depth, limit_policy
+        )
+        if entry is not None:
+            emit(dict(entry, type="skipped"))
+        if action == "skip":
+            continue
+        data = source.encode("utf-8") if source is not None else read(None)
+
+        try:
+            with _time_limit(file_timeout):
+                # _parse_file is Bandit's per-file entry point; it takes any
+                # binary file object, which lets members stay in memory.
+                mgr._parse_file(name, io.BytesIO(data), [name])
+        except _MemberTimeout:
+            emit(
+                dict(
+                    skipped_entry(
+                        name, "file_timeout", f"no result within {file_timeout:.1f}s"
+                    ),
+                    type="skipped",
+                )
+            )
+            continue
+        finally:
+            issues, mgr.results = mgr.results, []
+            errors, mgr.skipped = mgr.skipped, []
+
+        emit(
+            {
+                "type": "member",
+                "filename": name,
+                "results": [issue.as_dict(with_code=False) for issue in issues],
+                "errors": [
+                    {"filename": fname, "reason": reason} for fname, reason in errors
+                ],
+            }
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Worker entry point used by iter_archive_scan."""
+    parser = argparse.ArgumentParser(description="StaticGuard archive scan worker")
+    parser.add_argument("archive")
+    parser.add_argument("--file-timeout", type=float)
+    parser.add_argument("--max-file-size", type=int)
+    parser.add_argument("--max-ast-depth", type=int)
+    parser.add_argument("--limit-policy", default="skip")
+    args = parser.parse_args(argv)
+
+    members = (
+        (f"{args.archive}{MEMBER_SEPARATOR}{member}", size, stream)
+        for member, size, stream in iter_python_members(args.archive)
+    )
+    try:
+        scan_members(
+            members,
+            args.file_timeout,
+            args.max_file_size,
+            args.max_ast_depth,
+            args.limit_policy,
+            _emit,
+        )
+    except (OSError, zipfile.BadZipFile, tarfile.TarError) as exc:
+        _emit({"type": "fatal", "message": f"Cannot read archive: {exc}"})
+        return 2
+    return 0
+
+
+# ----------------------------------------------------------------------
+# Caller side
+# ----------------------------------------------------------------------
+
+
+def iter_archive_scan(
+    archive: str,
+    scan_timeout: Optional[float] = DEFAULT_SCAN_TIMEOUT,
+    file_timeout: Optional[float] = DEFAULT_FILE_TIMEOUT,
+    max_file_size: Optional[int] = DEFAULT_MAX_FILE_SIZE,
+    max_ast_depth: Optional[int] = DEFAULT_MAX_AST_DEPTH,
+    limit_policy: str = "skip",
+    max_memory_mb: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Scan an archive in a worker process and yield events as they arrive.
+
+    Each event is a dict with a "type":
+    - "member": one scanned member, with "filename" ('<archive>!<member>'),
+      raw Bandit "results" and "errors"
+    - "skipped": a run_bandit 'skipped' entry for a member. When the scan
+      budget runs out or the worker dies, every member without a result is
+      reported as 'scan_timeout' or 'worker_failed' (or the archive itself,
+      if its member list cannot be read)
+
+    Raises ArchiveScanError if Bandit is missing or the archive is unreadable.
+    """
+    cmd = [sys.executable, "-m", __name__, archive, "--limit-policy", limit_policy]
+    for flag, value in (
+        ("--file-timeout", file_timeout),
+        ("--max-file-size", max_file_size),
+        ("--max-ast-depth", max_ast_depth),
+    ):
+        if value is not None:
+            cmd += [flag, str(value)]
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (_PACKAGE_ROOT, env.get("PYTHONPATH")) if p
+    )
+
+    # stderr only carries Bandit's log lines; a small temp file avoids a
+    # pipe deadlock without a reader thread.
+    with tempfile.TemporaryFile(mode="w+") as stderr:
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            text=True,
+            env=env,
+            preexec_fn=memory_limiter(max_memory_mb),
+        )
+        timed_out = threading.Event()
+
+        def _kill_on_deadline() -> None:
+            timed_out.set()
+            proc.kill()
+
+        timer = None
+        if scan_timeout is not None:
+            timer = threading.Timer(scan_timeout, _kill_on_deadline)
+            timer.start()
+        done: Set[str] = set()
+        truncated = False
+        try:
+            assert proc.stdout is not None
+            for line in proc.stdout:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # Killed mid-write, by the deadline or its memory limit.
+                    truncated = True
+                    break
+                if event["type"] == "fatal":
+                    raise ArchiveScanError(event["message"])
+                if event["type"] == "member" or event.get("action") == "skipped":
+                    done.add(event["filename"])
+                yield event
+            if truncated:
+                proc.kill()
+            returncode = proc.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+        if returncode == 0 and not truncated:
+            return
+        if timed_out.is_set():
+            reason, detail = "scan_timeout", "scan time budget exhausted"
+        else:
+            stderr.seek(0)
+            reason = "worker_failed"
+            detail = (
+                f"worker exited with code {returncode}: "
+                f"{stderr.read()[-500:].strip()}"
+            )
+
+    try:
+        pending = [
+            name
+            for name in (
+                f"{archive}{MEMBER_SEPARATOR}{member}"
+                for member in _python_member_names(archive)
+            )
+            if name not in done
+        ]
+    except (OSError, zipfile.BadZipFile, tarfile.TarError):
+        yield dict(
+            skipped_entry(archive, reason, f"{detail} after {len(done)} members"),
+            type="skipped",
+        )
+        return
+    for name in pending:
+        yield dict(skipped_entry(name, reason, detail), type="skipped")
+
+
+def scan_archive(archive: str, **limits: Any) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Scan an archive and collect the events into Bandit-shaped JSON.
+
+    Returns
+    -------
+    tuple
+        (data, skipped): data has Bandit's "metrics._totals", "results",
+        "errors" and "generated_at" keys; skipped is the run_bandit
+        'skipped' list.
+    """
+    totals: Dict[str, int] = {
+        f"SEVERITY.{level}": 0 for level in ("UNDEFINED", "LOW", "MEDIUM", "HIGH")
+    }
+    results: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    skipped: List[Dict[str, Any]] = []
+
+    for event in iter_archive_scan(archive, **limits):
+        kind = event.pop("type")
+        if kind == "skipped":
+            skipped.append(event)
+            continue
+        for issue in event["results"]:
+            key = f"SEVERITY.{issue.get('issue_severity')}"
+            totals[key] = totals.get(key, 0) + 1
+        results.extend(event["results"])
+        errors.extend(event["errors"])
+
+    data = {
+        "metrics": {"_totals": totals},
+        "results": results,
+        "errors": errors,
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    return data, skipped
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
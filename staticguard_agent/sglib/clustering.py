@@ -0,0 +1,467 @@
+from __future__ import annotations
+
+import ast
+import copy
+import difflib
+import hashlib
+import io
+import textwrap
+import tokenize
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .patches import unified_diff
+from .tools import evaluate_patches, load_file, patch_accepted
+
+
+class _Normalizer(ast.NodeTransformer):
+    """
+    Replace identifiers and string/number literals with placeholders.
+
+    Attribute names, keyword argument names and True/False/None are kept:
+    they decide which API is called and how (`subprocess.call(..., shell=True)`),
+    which is what a Bandit finding is about.
+    """
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        return ast.copy_location(ast.Name(id="_", ctx=node.ctx), node)
+
+    def visit_arg(self, node: ast.arg) -> ast.AST:
+        self.generic_visit(node)
+        node.arg = "_"
+        return node
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if node.value is None or isinstance(node.value, bool):
+            return node
+        return ast.copy_location(ast.Constant(value=type(node.value).__name__), node)
+
+
+def _statement_at(tree: ast.Module, line: int) -> Optional[ast.stmt]:
+    """Return the innermost statement whose lines include `line`."""
+    found: Optional[ast.stmt] = None
+    body: List[ast.stmt] = list(tree.body)
+    while body:
+        for stmt in body:
+            if stmt.lineno <= line <= (stmt.end_lineno or stmt.lineno):
+                found = stmt
+                body = [
+                    child
+                    for child in ast.iter_child_nodes(stmt)
+                    if isinstance(child, ast.stmt)
+                ]
+                break
+        else:
+            break
+    return found
+
+
+def statement_shape(stmt: ast.stmt) -> str:
+    """Return a stable hash of a statement's normalized AST."""
+    normalized = _Normalizer().visit(copy.deepcopy(stmt))
+    dump = ast.dump(normalized, annotate_fields=False, include_attributes=False)
+    return hashlib.sha1(dump.encode("utf-8")).hexdigest()[:16]
+
+
+def cluster_findings(
+    results: List[Dict[str, Any]],
+    read_source: Callable[[str], str] = load_file,
+) -> List[Dict[str, Any]]:
+    """
+    Group run_bandit findings by test_id and normalized AST shape.
+
+    Findings whose statement has the same structure, up to variable names
+    and literal values, land in one cluster. Findings in files that cannot
+    be read or parsed get a cluster of their own.
+
+    Returns
+    -------
+    list
+        Clusters, largest first:
+        {
+          "cluster_id": "B602:3f2a...",
+          "test_id": "B602",
+          "shape": "3f2a..." or None,
+          "members": [finding, ...]   # run_bandit result entries
+        }
+    """
+    trees: Dict[str, Optional[ast.Module]] = {}
+    clusters: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+
+    for finding in results:
+        filename = str(finding.get("filename"))
+        if filename not in trees:
+            try:
+                trees[filename] = ast.parse(read_source(filename))
+            except (OSError, SyntaxError, ValueError):
+                trees[filename] = None
+        tree = trees[filename]
+        stmt = _statement_at(tree, int(finding.get("line_number") or 0)) if tree else None
+        if stmt is None:
+            shape = f"unparsed:{filename}:{finding.get('line_number')}"
+        else:
+            shape = statement_shape(stmt)
+        clusters[(str(finding.get("test_id")), shape)].append(finding)
+
+    ordered = sorted(clusters.items(), key=lambda item: (-len(item[1]), item[0]))
+    return [
+        {
+            "cluster_id": f"{test_id}:{shape}",
+            "test_id": test_id,
+            "shape": None if shape.startswith("unparsed:") else shape,
+            "members": members,
+        }
+        for (test_id, shape), members in ordered
+    ]
+
+
+# ----------------------------------------------------------------------
+# Fix templates
+# ----------------------------------------------------------------------
+
+
+def _statement_lines(stmt: ast.stmt) -> Tuple[int, int]:
+    """0-based [start, end) line range of a statement, with decorators."""
+    start = min(
+        [stmt.lineno] + [d.lineno for d in getattr(stmt, "decorator_list", [])]
+    )
+    return start - 1, stmt.end_lineno or stmt.lineno
+
+
+def _map_range(
+    opcodes: List[Tuple[str, int, int, int, int]], start: int, end: int
+) -> Tuple[int, int]:
+    """Map an original line range to the patched lines that replace it."""
+    new_start, new_end = None, None
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            if i1 <= start < i2 and new_start is None:
+                new_start = j1 + (start - i1)
+            if i1 < end <= i2:
+                new_end = j1 + (end - i1)
+        else:
+            # A change overlapping or touching the statement belongs to it.
+            if new_start is None and i1 <= start <= i2:
+                new_start = j1
+            if i1 <= end <= i2 and (i2 > start or i1 == i2):
+                new_end = j2
+    if new_start is None or new_end is None:
+        raise ValueError("statement range not found in the patch")
+    return new_start, max(new_start, new_end)
+
+
+def _added_imports(original: ast.Module, patched: ast.Module) -> List[str]:
+    """Top-level import statements present only in the patched module."""
+    imports = (ast.Import, ast.ImportFrom)
+    before = {ast.unparse(n) for n in original.body if isinstance(n, imports)}
+    return [
+        ast.unparse(n)
+        for n in patched.body
+        if isinstance(n, imports) and ast.unparse(n) not in before
+    ]
+
+
+def build_fix_template(
+    finding: Dict[str, Any],
+    original_source: str,
+    patched_source: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Turn an accepted fix of one finding into a reusable template.
+
+    The template holds the statement containing the finding before and after
+    the fix, plus any top-level imports the fix added. Changes elsewhere in
+    the file are not part of the template.
+
+    Returns None if either version does not parse or the statement cannot be
+    matched in the patched file.
+    """
+    try:
+        original_tree = ast.parse(original_source)
+        patched_tree = ast.parse(patched_source)
+    except SyntaxError:
+        return None
+    stmt = _statement_at(original_tree, int(finding.get("line_number") or 0))
+    if stmt is None:
+        return None
+
+    original_lines = original_source.splitlines(keepends=True)
+    patched_lines = patched_source.splitlines(keepends=True)
+    start, end = _statement_lines(stmt)
+    opcodes = difflib.SequenceMatcher(
+        None, original_lines, patched_lines, autojunk=False
+    ).get_opcodes()
+    try:
+        new_start, new_end = _map_range(opcodes, start, end)
+    except ValueError:
+        return None
+
+    before = textwrap.dedent("".join(original_lines[start:end]))
+    after = textwrap.dedent("".join(patched_lines[new_start:new_end]))
+    try:
+        ast.parse(before)
+    except SyntaxError:
+        return None
+    return {
+        "test_id": finding.get("test_id"),
+        "shape": statement_shape(stmt),
+        "before": before,
+        "after": after,
+        "imports": _added_imports(original_tree, patched_tree),
+    }
+
+
+def _bind(template_stmt: ast.AST, stmt: ast.AST, source: str) -> Optional[Dict[str, Any]]:
+    """
+    Match two statements of the same shape node by node and return how the
+    template's names and literals map to this statement's, or None if the
+    same template name would have to map to two different names.
+    """
+    names: Dict[str, str] = {}
+    literals: Dict[Tuple[type, Any], Tuple[str, Any]] = {}
+    for a, b in zip(ast.walk(template_stmt), ast.walk(stmt)):
+        if type(a) is not type(b):
+            return None
+        if isinstance(a, ast.Name) or isinstance(a, ast.arg):
+            key_a = a.id if isinstance(a, ast.Name) else a.arg
+            key_b = b.id if isinstance(b, ast.Name) else b.arg  # type: ignore[union-attr]
+            if names.setdefault(key_a, key_b) != key_b:
+                return None
+        elif isinstance(a, ast.Constant) and not (
+            a.value is None or isinstance(a.value, bool)
+        ):
+            segment = ast.get_source_segment(source, b)
+            if segment is None:
+                return None
+            literals.setdefault((type(a.value), a.value), (segment, b.value))  # type: ignore[union-attr]
+    return {"names": names, "literals": literals}
+
+
+def _render(after: str, binding: Dict[str, Any]) -> Optional[str]:
+    """
+    Substitute a binding's names and literals into the template's after text.
+
+    Returns None when the fix drops a name or literal that differs in this
+    statement: the template would then silently replace the statement's own
+    values with the ones of the original fix.
+    """
+    lines = after.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(after).readline))
+    except (tokenize.TokenError, SyntaxError):
+        return None
+
+    literal_tokens: Dict[int, Tuple[type, Any]] = {}
+    for i, tok in enumerate(tokens):
+        if tok.type in (tokenize.STRING, tokenize.NUMBER):
+            try:
+                value = ast.literal_eval(tok.string)
+            except (ValueError, SyntaxError):
+                continue
+            literal_tokens[i] = (type(value), value)
+
+    kept_names = {tok.string for tok in tokens if tok.type == tokenize.NAME}
+    for name, target in binding["names"].items():
+        if name not in kept_names and target != name:
+            return None
+    kept_literals = set(literal_tokens.values())
+    for key, (_, value) in binding["literals"].items():
+        if key not in kept_literals and value != key[1]:
+            return None
+
+    edits: List[Tuple[int, int, str]] = []
+    for i, tok in enumerate(tokens):
+        replacement = None
+        if tok.type == tokenize.NAME and tok.string in binding["names"]:
+            replacement = binding["names"][tok.string]
+        elif i in literal_tokens and literal_tokens[i] in binding["literals"]:
+            replacement = binding["literals"][literal_tokens[i]][0]
+        if replacement is not None and replacement != tok.string:
+            start = offsets[tok.start[0] - 1] + tok.start[1]
+            end = offsets[tok.end[0] - 1] + tok.end[1]
+            edits.append((start, end, replacement))
+
+    for start, end, replacement in sorted(edits, reverse=True):
+        after = after[:start] + replacement + after[end:]
+    return after
+
+
+def _insert_imports(source: str, imports: List[str]) -> str:
+    """Add missing top-level imports after the module's existing imports."""
+    tree = ast.parse(source)
+    present = {
+        ast.unparse(n) for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))
+    }
+    missing = [imp for imp in imports if imp not in present]
+    if not missing:
+        return source
+
+    line = 0
+    for i, node in enumerate(tree.body):
+        is_docstring = (
+            i == 0
+            and isinstance(node, ast.Expr)
+            and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str)
+        )
+        if isinstance(node, (ast.Import, ast.ImportFrom)) or is_docstring:
+            line = node.end_lineno or node.lineno
+        elif line:
+            break
+    lines = source.splitlines(keepends=True)
+    if line and line <= len(lines) and not lines[line - 1].endswith("\n"):
+        lines[line - 1] += "\n"
+    lines[line:line] = [imp + "\n" for imp in missing]
+    return "".join(lines)
+
+
+def apply_fix_template(
+    template: Dict[str, Any],
+    source: str,
+    findings: List[Dict[str, Any]],
+) -> Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Apply a fix template to every given finding of one file.
+
+    Returns
+    -------
+    tuple
+        (patched source, applied findings, findings the template did not
+        fit). A finding does not fit when its statement has another shape
+        or its names cannot be mapped consistently.
+    """
+    tree = ast.parse(source)
+    template_stmt = ast.parse(template["before"]).body[0]
+    lines = source.splitlines(keepends=True)
+
+    edits: Dict[Tuple[int, int], str] = {}
+    applied: List[Dict[str, Any]] = []
+    failed: List[Dict[str, Any]] = []
+    for finding in findings:
+        stmt = _statement_at(tree, int(finding.get("line_number") or 0))
+        if stmt is None or statement_shape(stmt) != template["shape"]:
+            failed.append(finding)
+            continue
+        start, end = _statement_lines(stmt)
+        if (start, end) in edits:
+            applied.append(finding)
+            continue
+        binding = _bind(template_stmt, stmt, source)
+        rendered = _render(template["after"], binding) if binding else None
+        if rendered is None:
+            failed.append(finding)
+            continue
+        original = "".join(lines[start:end])
+        indent = original[: len(original) - len(original.lstrip())]
+        edits[(start, end)] = textwrap.indent(rendered, indent)
+        applied.append(finding)
+
+    for (start, end), text in sorted(edits.items(), reverse=True):
+        lines[start:end] = [text]
+    patched = "".join(lines)
+    if applied and template["imports"]:
+        patched = _insert_imports(patched, template["imports"])
+    return patched, applied, failed
+
+
+def fix_cluster(
+    cluster: Dict[str, Any],
+    template: Dict[str, Any],
+    severity_filter: Optional[str] = None,
+    read_source: Callable[[str], str] = load_file,
+) -> Dict[str, Any]:
+    """
+    Apply a fix template to every member of a cluster and evaluate all the
+    patched files with one Bandit run (see evaluate_patches).
+
+    Returns
+    -------
+    dict
+        {
+          "cluster_id": ...,
+          "test_id": ...,
+          "files": [
+            {"path", "patched_content", "diff", "eval_result", "accepted",
+             "findings": [...]},
+            ...
+          ],
+          "unfixed": [finding, ...]   # members that still need a model fix
+        }
+    """
+    by_file: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for finding in cluster["members"]:
+        by_file[str(finding.get("filename"))].append(finding)
+
+    patches: Dict[str, str] = {}
+    originals: Dict[str, str] = {}
+    fixed: Dict[str, List[Dict[str, Any]]] = {}
+    unfixed: List[Dict[str, Any]] = []
+    for path, findings in by_file.items():
+        try:
+            originals[path] = read_source(path)
+            patched, applied, failed = apply_fix_template(
+                template, originals[path], findings
+            )
+        except (OSError, SyntaxError, ValueError):
+            unfixed.extend(findings)
+            continue
+        unfixed.extend(failed)
+        if applied and patched != originals[path]:
+            patches[path] = patched
+            fixed[path] = applied
+        else:
+            unfixed.extend(applied)
+
+    evaluations = evaluate_patches(patches, severity_filter) if patches else {}
+
+    files = []
+    for path, patched in patches.items():
+        eval_result = evaluations[path]
+        accepted = patch_accepted(eval_result, cluster["test_id"])
+        if not accepted:
+            unfixed.extend(fixed[path])
+        files.append(
+            {
+                "path": path,
+                "patched_content": patched,
+                "diff": unified_diff(originals[path], patched, path),
+                "eval_result": eval_result,
+                "accepted": accepted,
+                "findings": fixed[path],
+            }
+        )
+
+    return {
+        "cluster_id": cluster["cluster_id"],
+        "test_id": cluster["test_id"],
+        "files": files,
+        "unfixed": unfixed,
+    }
+
+
+def combine_evaluations(path: str, outcome: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    One evaluate_patch-shaped result for a whole fix_cluster outcome, with
+    summaries and deltas summed over the files that could be evaluated, so
+    a template application is recorded as one patch attempt. "accepted" is
+    true only when every evaluated file was accepted. None if no file could
+    be evaluated.
+    """
+    entries = [e for e in outcome["files"] if not e["eval_result"].get("error")]
+    if not entries:
+        return None
+
+    combined: Dict[str, Any] = {"original_path": path}
+    for key in ("original_summary", "patched_summary", "delta", "test_id_delta"):
+        totals: Dict[str, int] = defaultdict(int)
+        for entry in entries:
+            for name, value in (entry["eval_result"].get(key) or {}).items():
+                totals[name] += int(value or 0)
+        combined[key] = dict(totals)
+    combined["files"] = len(entries)
+    combined["accepted"] = all(entry["accepted"] for entry in entries)
+    return combined
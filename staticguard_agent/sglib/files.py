@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+
+# Largest file read_text loads in full. Larger files can still be read by
+# line range with read_lines.
+DEFAULT_MAX_LOAD_SIZE = 8 * 1024 * 1024
+
+# Files kept open (memory-mapped) in the shared cache.
+CACHE_SIZE = 256
+
+
+class FileTooLargeError(ValueError):
+    """Raised when a file is over the size limit for loading it in full."""
+
+
+def _decode(data: bytes) -> str:
+    """Decode UTF-8 with universal newlines, like Path.read_text."""
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+class _CachedFile:
+    """
+    One memory-mapped file with its content hash, and (built on first use)
+    its decoded text and line offset index.
+    """
+
+    def __init__(self, path: Path, signature: Tuple[int, int, int]) -> None:
+        self.signature = signature
+        with open(path, "rb") as f:
+            if signature[0]:
+                self.data: Union[mmap.mmap, bytes] = mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            else:
+                self.data = b""  # empty files cannot be mapped
+        self.sha1 = hashlib.sha1(self.data).hexdigest()
+        self._text: Optional[str] = None
+        self._offsets: Optional[array] = None
+        self._lock = threading.Lock()
+
+    def text(self) -> str:
+        with self._lock:
+            if self._text is None:
+                self._text = _decode(bytes(self.data))
+            return self._text
+
+    def offsets(self) -> array:
+        """Byte offset of the start of every line, plus the end of the file."""
+        with self._lock:
+            if self._offsets is None:
+                offsets = array("q", [0])
+                pos = self.data.find(b"\n")
+                while pos != -1:
+                    offsets.append(pos + 1)
+                    pos = self.data.find(b"\n", pos + 1)
+                if offsets[-1] != len(self.data):
+                    offsets.append(len(self.data))
+                self._offsets = offsets
+            return self._offsets
+
+
+_cache: "OrderedDict[str, _CachedFile]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _get(path: str, max_size: Optional[int] = None) -> _CachedFile:
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"File does not exist: {path}")
+    if not p.is_file():
+        raise IsADirectoryError(f"Expected a file, got a directory: {path}")
+    stat = p.stat()
+    if max_size is not None and stat.st_size > max_size:
+        raise FileTooLargeError(
+            f"File is too large to load: {path} is {stat.st_size} bytes, the "
+            f"limit is {max_size}. Read a line range with read_lines instead."
+        )
+
+    key = str(p.resolve())
+    signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached.signature == signature:
+            _cache.move_to_end(key)
+            return cached
+
+    entry = _CachedFile(p, signature)
+    with _cache_lock:
+        if cached is not None and cached.sha1 == entry.sha1:
+            # Touched but not changed: keep the decoded text and index.
+            cached.signature = signature
+            entry = cached
+        _cache[key] = entry
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return entry
+
+
+def read_text(path: str, max_size: Optional[int] = DEFAULT_MAX_LOAD_SIZE) -> str:
+    """
+    Content of a UTF-8 text file, from the shared cache.
+
+    Cached entries are reused while the file's size, mtime and inode are
+    unchanged. When those change, the file is hashed again and the decoded
+    text is only rebuilt if the content hash differs.
+
+    Raises FileNotFoundError or IsADirectoryError for invalid paths, and
+    FileTooLargeError for files over max_size bytes (None disables the
+    limit).
+    """
+    return _get(path, max_size).text()
+
+
+def read_bytes(path: str, limit: Optional[int] = None, cache: bool = True) -> bytes:
+    """
+    The first `limit` bytes of a file, or all of them (from the cache) for
+    None. A head is read directly, without hashing, mapping or caching the
+    whole file, so checking a size limit on a huge file stays cheap.
+
+    cache=False reads the whole file directly too, for throwaway files (such
+    as temporary copies) that would only push real sources out of the cache.
+    """
+    if limit is None and cache:
+        return bytes(_get(path).data)
+    with open(path, "rb") as f:
+        return f.read(limit)
+
+
+def read_lines(path: str, start: int, end: Optional[int] = None) -> str:
+    """
+    Lines start to end (1-based, inclusive; end=None for one line) of a
+    UTF-8 text file, with their line endings.
+
+    Only the requested byte range is decoded, using a line offset index
+    built once per file version over the memory-mapped content, so this
+    works for files of any size. Lines are split on '\\n', and '\\r\\n' line
+    endings are returned as '\\n', as in read_text. A range past the end of
+    the file is cut short.
+    """
+    if start < 1:
+        raise ValueError(f"Line numbers start at 1, got {start}")
+    end = start if end is None else end
+    if end < start:
+        raise ValueError(f"End line {end} is before start line {start}")
+    entry = _get(path)
+    offsets = entry.offsets()
+    last = len(offsets) - 1
+    if start > last:
+        return ""
+    return _decode(bytes(entry.data[offsets[start - 1] : offsets[min(end, last)]]))
+
+
+def line_count(path: str) -> int:
+    """Number of lines in a file."""
+    return len(_get(path).offsets()) - 1
+
+
+def file_digest(path: str) -> str:
+    """SHA-1 of a file's content, from the cache."""
+    return _get(path).sha1
+
+
+def clear_cache() -> None:
+    """Drop all cached files."""
+    with _cache_lock:
+        _cache.clear()
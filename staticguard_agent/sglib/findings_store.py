@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from .history import _SqliteStore
+from .reporting import _extract_counts
+from .tools import patch_accepted
+
+
+# Raw scans are kept as one compact row each. Everything the trend queries
+# read lives in the rollup_* tables, which are updated incrementally on
+# ingestion, so queries never have to touch raw reports.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    timestamp_utc TEXT NOT NULL,
+    severity_filter TEXT,
+    high INTEGER NOT NULL,
+    medium INTEGER NOT NULL,
+    low INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    errors INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scans_path ON scans (path, timestamp_utc);
+
+CREATE TABLE IF NOT EXISTS patch_evals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    timestamp_utc TEXT NOT NULL,
+    test_id TEXT,
+    delta_high INTEGER NOT NULL,
+    delta_medium INTEGER NOT NULL,
+    delta_low INTEGER NOT NULL,
+    accepted INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_patch_evals_path ON patch_evals (path, timestamp_utc);
+
+CREATE TABLE IF NOT EXISTS finding_lifetimes (
+    fingerprint TEXT NOT NULL,
+    path TEXT NOT NULL,
+    filename TEXT,
+    test_id TEXT,
+    severity TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    fixed_at TEXT,
+    PRIMARY KEY (path, fingerprint, first_seen)
+);
+CREATE INDEX IF NOT EXISTS idx_lifetimes_open
+    ON finding_lifetimes (path, fixed_at);
+
+CREATE TABLE IF NOT EXISTS rollup_severity_daily (
+    day TEXT NOT NULL,
+    path TEXT NOT NULL,
+    high INTEGER NOT NULL,
+    medium INTEGER NOT NULL,
+    low INTEGER NOT NULL,
+    scans INTEGER NOT NULL,
+    PRIMARY KEY (day, path)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_fix_time (
+    test_id TEXT PRIMARY KEY,
+    fixed INTEGER NOT NULL,
+    total_seconds REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS rollup_patch_acceptance (
+    test_id TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    accepted INTEGER NOT NULL
+);
+"""
+
+_UNKNOWN_TEST_ID = "UNKNOWN"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _seconds_between(start: str, end: str) -> float:
+    return (
+        datetime.fromisoformat(end) - datetime.fromisoformat(start)
+    ).total_seconds()
+
+
+def _fingerprints(results: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Key findings by a line-independent fingerprint.
+
+    Line numbers move whenever code above a finding changes, so the fingerprint
+    uses filename, test_id and issue text, plus an occurrence index to keep
+    repeated identical findings in one file apart.
+    """
+    seen: Counter = Counter()
+    keyed: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        base = "|".join(
+            str(result.get(k) or "") for k in ("filename", "test_id", "issue_text")
+        )
+        seen[base] += 1
+        digest = hashlib.sha1(base.encode("utf-8")).hexdigest()[:16]
+        keyed[f"{digest}#{seen[base]}"] = result
+    return keyed
+
+
+class FindingsStore(_SqliteStore):
+    """
+    Append-only store of run_bandit results and evaluate_patch deltas with
+    precomputed rollups for trend queries.
+
+    Tables live in the same SQLite file as RunHistory by default.
+    """
+
+    _schema = _SCHEMA
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def record_scan(
+        self,
+        result: Dict[str, Any],
+        timestamp_utc: Optional[str] = None,
+    ) -> int:
+        """
+        Append one run_bandit result and update the rollups.
+
+        Finding lifetimes (used for time-to-fix) are only tracked for
+        unfiltered scans, since a severity filtered result would make every
+        other finding look fixed. For the same reason, findings in files the
+        scan skipped or only partially scanned stay open.
+        """
+        ts = timestamp_utc or _now()
+        path = str(Path(result["path"]))
+        summary = result.get("summary") or {}
+        total, high, medium, low = _extract_counts(summary)
+        severity_filter = result.get("severity_filter")
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO scans (path, timestamp_utc, severity_filter, "
+                "high, medium, low, total, errors) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    path,
+                    ts,
+                    severity_filter,
+                    high,
+                    medium,
+                    low,
+                    total,
+                    len(result.get("errors") or []),
+                ),
+            )
+            scan_id = int(cursor.lastrowid)
+
+            # Latest scan of the day wins, so the trend is a daily snapshot.
+            conn.execute(
+                "INSERT INTO rollup_severity_daily "
+                "(day, path, high, medium, low, scans) "
+                "VALUES (?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT (day, path) DO UPDATE SET "
+                "high = excluded.high, medium = excluded.medium, "
+                "low = excluded.low, scans = scans + 1",
+                (ts[:10], path, high, medium, low),
+            )
+
+            if not severity_filter:
+                self._update_lifetimes(
+                    conn,
+                    path,
+                    result.get("results") or [],
+                    {entry["filename"] for entry in result.get("skipped") or []},
+                    ts,
+                )
+
+        return scan_id
+
+    def _update_lifetimes(
+        self,
+        conn: sqlite3.Connection,
+        path: str,
+        results: Sequence[Dict[str, Any]],
+        skipped_files: Set[str],
+        ts: str,
+    ) -> None:
+        current = _fingerprints(results)
+        open_rows = conn.execute(
+            "SELECT fingerprint, filename, test_id, first_seen "
+            "FROM finding_lifetimes WHERE path = ? AND fixed_at IS NULL",
+            (path,),
+        ).fetchall()
+        open_ids = {row["fingerprint"] for row in open_rows}
+
+        fixed = [
+            row
+            for row in open_rows
+            if row["fingerprint"] not in current
+            and row["filename"] not in skipped_files
+        ]
+        conn.executemany(
+            "UPDATE finding_lifetimes SET fixed_at = ? "
+            "WHERE path = ? AND fingerprint = ? AND fixed_at IS NULL",
+            [(ts, path, row["fingerprint"]) for row in fixed],
+        )
+        conn.executemany(
+            "INSERT INTO rollup_fix_time (test_id, fixed, total_seconds) "
+            "VALUES (?, 1, ?) "
+            "ON CONFLICT (test_id) DO UPDATE SET "
+            "fixed = fixed + 1, total_seconds = total_seconds + excluded.total_seconds",
+            [
+                (
+                    row["test_id"] or _UNKNOWN_TEST_ID,
+                    max(0.0, _seconds_between(row["first_seen"], ts)),
+                )
+                for row in fixed
+            ],
+        )
+
+        conn.executemany(
+            "UPDATE finding_lifetimes SET last_seen = ? "
+            "WHERE path = ? AND fingerprint = ? AND fixed_at IS NULL",
+            [(ts, path, fp) for fp in current if fp in open_ids],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO finding_lifetimes "
+            "(fingerprint, path, filename, test_id, severity, first_seen, last_seen) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    fp,
+                    path,
+                    r.get("filename"),
+                    r.get("test_id"),
+                    r.get("issue_severity"),
+                    ts,
+                    ts,
+                )
+                for fp, r in current.items()
+                if fp not in open_ids
+            ],
+        )
+
+    def record_patch_eval(
+        self,
+        eval_result: Dict[str, Any],
+        test_id: Optional[str] = None,
+        timestamp_utc: Optional[str] = None,
+        accepted: Optional[bool] = None,
+    ) -> Optional[int]:
+        """
+        Append one evaluate_patch result and update the acceptance rollup.
+
+        When test_id is not given, the test_id whose count dropped the most is
+        taken as the target. accepted defaults to patch_accepted() of the
+        result. Failed evaluations are not recorded.
+        """
+        if not eval_result or eval_result.get("error"):
+            return None
+
+        ts = timestamp_utc or _now()
+        delta = eval_result.get("delta") or {}
+        test_id_delta = eval_result.get("test_id_delta") or {}
+        if not test_id and test_id_delta:
+            candidate = min(test_id_delta, key=lambda k: test_id_delta[k])
+            if test_id_delta[candidate] < 0:
+                test_id = candidate
+        test_id = test_id.upper() if test_id else None
+        if accepted is None:
+            accepted = patch_accepted(eval_result, test_id)
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO patch_evals (path, timestamp_utc, test_id, "
+                "delta_high, delta_medium, delta_low, accepted) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(Path(eval_result.get("original_path") or "")),
+                    ts,
+                    test_id,
+                    int(delta.get("SEVERITY.HIGH", 0) or 0),
+                    int(delta.get("SEVERITY.MEDIUM", 0) or 0),
+                    int(delta.get("SEVERITY.LOW", 0) or 0),
+                    int(accepted),
+                ),
+            )
+            conn.execute(
+                "INSERT INTO rollup_patch_acceptance (test_id, attempts, accepted) "
+                "VALUES (?, 1, ?) "
+                "ON CONFLICT (test_id) DO UPDATE SET "
+                "attempts = attempts + 1, accepted = accepted + excluded.accepted",
+                (test_id or _UNKNOWN_TEST_ID, int(accepted)),
+            )
+            return int(cursor.lastrowid)
+
+    # ------------------------------------------------------------------
+    # Trend queries (read only the rollup tables)
+    # ------------------------------------------------------------------
+
+    def severity_trend(
+        self,
+        path: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Findings per severity per day, summed over the latest scan of each
+        path on that day. Dates are 'YYYY-MM-DD' and inclusive.
+        """
+        where: List[str] = ["1 = 1"]
+        params: List[Any] = []
+        if path:
+            where.append("path = ?")
+            params.append(str(Path(path)))
+        if since:
+            where.append("day >= ?")
+            params.append(since[:10])
+        if until:
+            where.append("day <= ?")
+            params.append(until[:10])
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT day, SUM(high) AS high, SUM(medium) AS medium, "
+                "SUM(low) AS low, SUM(scans) AS scans "
+                f"FROM rollup_severity_daily WHERE {' AND '.join(where)} "
+                "GROUP BY day ORDER BY day",
+                params,
+            ).fetchall()
+        return [
+            {
+                "day": row["day"],
+                "SEVERITY.HIGH": row["high"],
+                "SEVERITY.MEDIUM": row["medium"],
+                "SEVERITY.LOW": row["low"],
+                "scans": row["scans"],
+            }
+            for row in rows
+        ]
+
+    def mean_time_to_fix(self, test_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Mean seconds from first detection to disappearance, per test_id."""
+        where = ""
+        params: List[Any] = []
+        if test_id:
+            where, params = "WHERE test_id = ?", [test_id.upper()]
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT test_id, fixed, total_seconds FROM rollup_fix_time "
+                f"{where} ORDER BY test_id",
+                params,
+            ).fetchall()
+        return [
+            {
+                "test_id": row["test_id"],
+                "fixed": row["fixed"],
+                "mean_seconds": row["total_seconds"] / row["fixed"],
+            }
+            for row in rows
+            if row["fixed"]
+        ]
+
+    def patch_acceptance(self, test_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Patch attempts, accepted patches and acceptance rate per test_id."""
+        where = ""
+        params: List[Any] = []
+        if test_id:
+            where, params = "WHERE test_id = ?", [test_id.upper()]
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT test_id, attempts, accepted FROM rollup_patch_acceptance "
+                f"{where} ORDER BY test_id",
+                params,
+            ).fetchall()
+        return [
+            {
+                "test_id": row["test_id"],
+                "attempts": row["attempts"],
+                "accepted": row["accepted"],
+                "rate": row["accepted"] / row["attempts"] if row["attempts"] else 0.0,
+            }
+            for row in rows
+        ]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Command line entry point for trend queries, for example:
+
+        python -m staticguard_agent.sglib.findings_store severity --since 2025-01-01
+        python -m staticguard_agent.sglib.findings_store time-to-fix
+        python -m staticguard_agent.sglib.findings_store acceptance --test-id B602
+    """
+    parser = argparse.ArgumentParser(description="StaticGuard findings trends")
+    parser.add_argument("--db", help="Path to the history database")
+    sub = parser.add_subparsers(dest="query", required=True)
+
+    severity = sub.add_parser("severity", help="Findings per severity per day")
+    severity.add_argument("--path")
+    severity.add_argument("--since")
+    severity.add_argument("--until")
+
+    ttf = sub.add_parser("time-to-fix", help="Mean time-to-fix per test_id")
+    ttf.add_argument("--test-id")
+
+    acceptance = sub.add_parser("acceptance", help="Patch acceptance per test_id")
+    acceptance.add_argument("--test-id")
+
+    args = parser.parse_args(argv)
+    store = FindingsStore(args.db)
+
+    if args.query == "severity":
+        rows = store.severity_trend(args.path, args.since, args.until)
+    elif args.query == "time-to-fix":
+        rows = store.mean_time_to_fix(args.test_id)
+    else:
+        rows = store.patch_acceptance(args.test_id)
+
+    json.dump(rows, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .reporting import _extract_counts
+from .tools import patch_accepted
+
+
+DEFAULT_HISTORY_PATH = ".staticguard/history.db"
+HISTORY_PATH_ENV = "STATICGUARD_HISTORY_DB"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT UNIQUE,
+    app_name TEXT NOT NULL DEFAULT '',
+    user_id TEXT NOT NULL DEFAULT '',
+    path TEXT NOT NULL,
+    timestamp_utc TEXT NOT NULL,
+    test_id TEXT,
+    severity TEXT,
+    before_total INTEGER,
+    before_high INTEGER,
+    before_medium INTEGER,
+    before_low INTEGER,
+    after_total INTEGER,
+    after_high INTEGER,
+    after_medium INTEGER,
+    after_low INTEGER,
+    patch_attempted INTEGER NOT NULL DEFAULT 0,
+    patch_accepted INTEGER NOT NULL DEFAULT 0,
+    diff TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_runs_path ON runs (path, timestamp_utc);
+CREATE INDEX IF NOT EXISTS idx_runs_test_id ON runs (test_id, timestamp_utc);
+CREATE INDEX IF NOT EXISTS idx_runs_severity ON runs (severity, timestamp_utc);
+CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs (timestamp_utc);
+"""
+
+_COLUMNS = (
+    "session_id",
+    "app_name",
+    "user_id",
+    "path",
+    "timestamp_utc",
+    "test_id",
+    "severity",
+    "before_total",
+    "before_high",
+    "before_medium",
+    "before_low",
+    "after_total",
+    "after_high",
+    "after_medium",
+    "after_low",
+    "patch_attempted",
+    "patch_accepted",
+    "diff",
+)
+
+
+# History database chosen for the current run (see use_history_path). A
+# context variable, so concurrent runs in one process each keep their own.
+_history_path: ContextVar[Optional[str]] = ContextVar(
+    "staticguard_history_path", default=None
+)
+
+
+def default_history_path() -> str:
+    """
+    Return the history database path: the one set by use_history_path for
+    the current run, else STATICGUARD_HISTORY_DB, else the default.
+    """
+    return (
+        _history_path.get()
+        or os.environ.get(HISTORY_PATH_ENV)
+        or DEFAULT_HISTORY_PATH
+    )
+
+
+@contextmanager
+def use_history_path(db_path: Optional[str]) -> Iterator[None]:
+    """
+    Make db_path the default history database inside the block, for every
+    store opened without an explicit path (for example by agent tools).
+    Asyncio tasks and to_thread calls started inside the block inherit it.
+    """
+    token = _history_path.set(db_path)
+    try:
+        yield
+    finally:
+        _history_path.reset(token)
+
+
+def build_run_summary(
+    path: str,
+    eval_result: Optional[Dict[str, Any]] = None,
+    test_id: Optional[str] = None,
+    severity: Optional[str] = None,
+    diff: str = "",
+    timestamp_utc: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Build the compact run_summary stored in session state and run history.
+
+    Parameters
+    ----------
+    path:
+        The scanned file or directory.
+    eval_result:
+        Result dict from evaluate_patch() (or parse_markdown_report()). When
+        missing or failed, the before/after counts are left as None.
+    test_id, severity:
+        The Bandit finding the patch targeted, if known.
+    diff:
+        Unified diff of the proposed patch.
+    timestamp_utc:
+        ISO timestamp of the run. Defaults to now.
+
+    Returns
+    -------
+    dict
+        {
+          "path": ..., "timestamp_utc": ..., "test_id": ..., "severity": ...,
+          "bandit_findings_before": {"total", "high", "medium", "low"} or None,
+          "bandit_findings_after": {...} or None,
+          "patch_attempted": bool,
+          "patch_accepted": bool,   # see tools.patch_accepted
+          "diff": "..."
+        }
+    """
+    before: Optional[Dict[str, int]] = None
+    after: Optional[Dict[str, int]] = None
+    if eval_result and not eval_result.get("error"):
+        before = _counts_dict(eval_result.get("original_summary") or {})
+        after = _counts_dict(eval_result.get("patched_summary") or {})
+
+    return {
+        "path": str(Path(path)),
+        "timestamp_utc": timestamp_utc
+        or datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "test_id": test_id,
+        "severity": severity.upper() if severity else None,
+        "bandit_findings_before": before,
+        "bandit_findings_after": after,
+        "patch_attempted": eval_result is not None,
+        "patch_accepted": bool(before)
+        and patch_accepted(eval_result or {}, test_id),
+        "diff": diff or "",
+    }
+
+
+def _counts_dict(summary: Dict[str, Any]) -> Dict[str, int]:
+    total, high, medium, low = _extract_counts(summary)
+    return {"total": total, "high": high, "medium": medium, "low": low}
+
+
+class _SqliteStore:
+    """
+    Base for the SQLite backed stores that share the history database.
+
+    Subclasses set _schema. A single connection is kept open for ':memory:',
+    since every new connection would otherwise see an empty database.
+    """
+
+    _schema = ""
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self.db_path = db_path or default_history_path()
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._memory_conn: Optional[sqlite3.Connection] = None
+        with self._connect() as conn:
+            if self.db_path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self._schema)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if self.db_path == ":memory:":
+            if self._memory_conn is None:
+                self._memory_conn = sqlite3.connect(":memory:")
+                self._memory_conn.row_factory = sqlite3.Row
+            with self._memory_conn:
+                yield self._memory_conn
+            return
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        # WAL keeps readers unblocked; NORMAL sync is durable enough for run
+        # metadata and keeps many small writes per day cheap.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+class RunHistory(_SqliteStore):
+    """
+    SQLite store of run summaries, indexed by path, test_id, severity and
+    timestamp so lookups stay fast after thousands of runs.
+    """
+
+    _schema = _SCHEMA
+
+    def record_run(
+        self,
+        summary: Dict[str, Any],
+        session_id: Optional[str] = None,
+        app_name: str = "",
+        user_id: str = "",
+    ) -> int:
+        """
+        Store a run summary (see build_run_summary) and return its row id.
+
+        Recording the same session_id twice replaces the earlier row, so a
+        session can be added to memory more than once.
+        """
+        before = summary.get("bandit_findings_before") or {}
+        after = summary.get("bandit_findings_after") or {}
+        test_id = summary.get("test_id")
+        row = {
+            "session_id": session_id,
+            "app_name": app_name,
+            "user_id": user_id,
+            "path": str(Path(summary["path"])),
+            "timestamp_utc": summary.get("timestamp_utc")
+            or datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "test_id": test_id.upper() if test_id else None,
+            "severity": summary.get("severity"),
+            "before_total": before.get("total"),
+            "before_high": before.get("high"),
+            "before_medium": before.get("medium"),
+            "before_low": before.get("low"),
+            "after_total": after.get("total"),
+            "after_high": after.get("high"),
+            "after_medium": after.get("medium"),
+            "after_low": after.get("low"),
+            "patch_attempted": int(bool(summary.get("patch_attempted"))),
+            "patch_accepted": int(bool(summary.get("patch_accepted"))),
+            "diff": summary.get("diff") or "",
+        }
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"INSERT OR REPLACE INTO runs ({', '.join(_COLUMNS)}) "
+                f"VALUES ({placeholders})",
+                [row[c] for c in _COLUMNS],
+            )
+            return int(cursor.lastrowid)
+
+    def runs_for_path(
+        self,
+        path: str,
+        limit: int = 10,
+        app_name: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the most recent runs for a path, newest first."""
+        return self._select(
+            "path = ?", [str(Path(path))], limit, app_name, user_id
+        )
+
+    def runs_for_test_id(
+        self,
+        test_id: str,
+        limit: int = 10,
+        app_name: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the most recent runs that targeted a Bandit test_id."""
+        return self._select(
+            "test_id = ?", [test_id.upper()], limit, app_name, user_id
+        )
+
+    def previous_fixes(
+        self,
+        path: Optional[str] = None,
+        test_id: Optional[str] = None,
+        limit: int = 5,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return accepted patches, newest first, for a file and/or a test_id.
+
+        These can be shown to the fixer agent so a patch that was accepted
+        before is reused instead of generated again.
+        """
+        where = ["patch_accepted = 1", "diff != ''"]
+        params: List[Any] = []
+        if path:
+            where.append("path = ?")
+            params.append(str(Path(path)))
+        if test_id:
+            where.append("test_id = ?")
+            params.append(test_id.upper())
+        return self._select(" AND ".join(where), params, limit)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        app_name: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search runs by exact path or test_id (indexed), falling back to a
+        substring match on the path.
+        """
+        query = query.strip()
+        if not query:
+            return []
+        rows = self.runs_for_path(query, limit, app_name, user_id)
+        if not rows:
+            rows = self.runs_for_test_id(query, limit, app_name, user_id)
+        if not rows:
+            escaped = (
+                query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            rows = self._select(
+                "path LIKE ? ESCAPE '\\'",
+                [f"%{escaped}%"],
+                limit,
+                app_name,
+                user_id,
+            )
+        return rows
+
+    def _select(
+        self,
+        where: str,
+        params: List[Any],
+        limit: int,
+        app_name: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        params = list(params)
+        if app_name is not None:
+            where += " AND app_name = ?"
+            params.append(app_name)
+        if user_id is not None:
+            where += " AND user_id = ?"
+            params.append(user_id)
+        params.append(int(limit))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM runs WHERE {where} "
+                "ORDER BY timestamp_utc DESC, id DESC LIMIT ?",
+                params,
+            ).fetchall()
+        return [_row_to_summary(row) for row in rows]
+
+
+def _row_to_summary(row: sqlite3.Row) -> Dict[str, Any]:
+    def counts(prefix: str) -> Optional[Dict[str, int]]:
+        if row[f"{prefix}_total"] is None:
+            return None
+        return {
+            key: row[f"{prefix}_{key}"]
+            for key in ("total", "high", "medium", "low")
+        }
+
+    return {
+        "id": row["id"],
+        "session_id": row["session_id"],
+        "path": row["path"],
+        "timestamp_utc": row["timestamp_utc"],
+        "test_id": row["test_id"],
+        "severity": row["severity"],
+        "bandit_findings_before": counts("before"),
+        "bandit_findings_after": counts("after"),
+        "patch_attempted": bool(row["patch_attempted"]),
+        "patch_accepted": bool(row["patch_accepted"]),
+        "diff": row["diff"],
+    }
+
+
+def format_run_summary(summary: Dict[str, Any]) -> str:
+    """Render a run summary as one line of text for memory search results."""
+
+    def counts(value: Optional[Dict[str, int]]) -> str:
+        if not value:
+            return "unknown"
+        return (
+            f"{value['total']} (High: {value['high']}, "
+            f"Medium: {value['medium']}, Low: {value['low']})"
+        )
+
+    target = ""
+    if summary.get("test_id"):
+        target = f" {summary['test_id']}"
+        if summary.get("severity"):
+            target += f" ({summary['severity']})"
+    status = "accepted" if summary.get("patch_accepted") else "not accepted"
+    return (
+        f"[{summary.get('timestamp_utc')}] {summary.get('path')}{target}: "
+        f"findings before {counts(summary.get('bandit_findings_before'))}, "
+        f"after {counts(summary.get('bandit_findings_after'))}; "
+        f"patch {status}"
+    )
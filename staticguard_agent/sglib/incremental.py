@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import ast
+import difflib
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+# Scans a complete module source and returns all its findings, or None when
+# the scan was not complete (errors or skipped files).
+ScanSource = Callable[[str], Optional[List[Dict[str, Any]]]]
+
+
+def _bound_names(node: ast.AST) -> Set[str]:
+    """Names bound by the import statements in a module-level statement."""
+    names: Set[str] = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Import):
+            for alias in child.names:
+                names.add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(child, ast.ImportFrom):
+            for alias in child.names:
+                names.add(alias.asname or alias.name)
+    return names
+
+
+def split_segments(source: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Split a module into its top-level statements.
+
+    Returns
+    -------
+    list or None
+        One dict per statement (statements sharing a line are merged):
+        {"name", "start", "end", "text", "imports", "uses"}, where start/end
+        are 1-based line numbers including decorators, imports are the names
+        the statement binds by importing (definitions excluded, their imports
+        are local) and uses the names it reads. None if the source does not
+        parse.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    lines = source.splitlines()
+
+    segments: List[Dict[str, Any]] = []
+    for node in tree.body:
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        end = node.end_lineno or node.lineno
+        is_definition = isinstance(
+            node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+        )
+        segment = {
+            "name": node.name if is_definition else f"<line {start}>",
+            "start": start,
+            "end": end,
+            "imports": set() if is_definition else _bound_names(node),
+            "uses": {n.id for n in ast.walk(node) if isinstance(n, ast.Name)},
+        }
+        if segments and start <= segments[-1]["end"]:
+            last = segments[-1]
+            last["end"] = max(last["end"], end)
+            last["imports"] |= segment["imports"]
+            last["uses"] |= segment["uses"]
+            continue
+        segments.append(segment)
+
+    for segment in segments:
+        segment["text"] = "\n".join(lines[segment["start"] - 1 : segment["end"]])
+    return segments
+
+
+def _segment_at(segments: List[Dict[str, Any]], line: int) -> Optional[int]:
+    for index, segment in enumerate(segments):
+        if segment["start"] <= line <= segment["end"]:
+            return index
+    return None
+
+
+def incremental_rescan(
+    original: str,
+    patched: str,
+    original_results: List[Dict[str, Any]],
+    scan_source: ScanSource,
+) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """
+    Findings of the patched source, re-analyzing only what the patch changed.
+
+    Top-level statements of both versions are matched by their text. The
+    findings of unchanged statements are reused (moved to their new line
+    numbers). Changed statements are scanned in a copy of the patched source
+    where every other statement is blanked out, except the module-level
+    imports that bind names they use, so Bandit still resolves calls like
+    subprocess.call. Unchanged statements that use a name whose import was
+    changed or removed are re-analyzed too.
+
+    Parameters
+    ----------
+    original, patched:
+        The two module sources.
+    original_results:
+        All findings of the original source (any severity).
+    scan_source:
+        Scans a module source and returns its findings, or None if the scan
+        was incomplete.
+
+    Returns
+    -------
+    tuple or None
+        (results, info) with info = {"reanalyzed": [names], "reused_findings": n},
+        or None when the patch cannot be handled incrementally (a version
+        does not parse, or a finding does not belong to any statement); the
+        caller then scans the patched source in full.
+    """
+    old_segments = split_segments(original)
+    new_segments = split_segments(patched)
+    if old_segments is None or new_segments is None:
+        return None
+
+    matcher = difflib.SequenceMatcher(
+        None,
+        [s["text"] for s in old_segments],
+        [s["text"] for s in new_segments],
+        autojunk=False,
+    )
+    unchanged: Dict[int, int] = {}  # new index -> old index
+    changed_imports: Set[str] = set()
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            unchanged.update(zip(range(j1, j2), range(i1, i2)))
+            continue
+        for segment in old_segments[i1:i2] + new_segments[j1:j2]:
+            changed_imports |= segment["imports"]
+
+    for new_index in list(unchanged):
+        if new_segments[new_index]["uses"] & changed_imports:
+            del unchanged[new_index]
+    changed = [i for i in range(len(new_segments)) if i not in unchanged]
+
+    # Findings of unchanged statements, moved to their new position.
+    results: List[Dict[str, Any]] = []
+    for finding in original_results:
+        old_index = _segment_at(old_segments, int(finding.get("line_number") or 0))
+        if old_index is None:
+            return None
+        new_index = next((n for n, o in unchanged.items() if o == old_index), None)
+        if new_index is None:
+            continue
+        shift = new_segments[new_index]["start"] - old_segments[old_index]["start"]
+        results.append(dict(finding, line_number=finding["line_number"] + shift))
+    reused = len(results)
+
+    if changed:
+        used: Set[str] = set()
+        for index in changed:
+            used |= new_segments[index]["uses"]
+        keep = set(changed) | {
+            i for i, segment in enumerate(new_segments) if segment["imports"] & used
+        }
+        lines = patched.splitlines()
+        for index, segment in enumerate(new_segments):
+            if index not in keep:
+                for line in range(segment["start"] - 1, segment["end"]):
+                    lines[line] = ""
+        partial = scan_source("\n".join(lines) + "\n")
+        if partial is None:
+            return None
+        for finding in partial:
+            index = _segment_at(new_segments, int(finding.get("line_number") or 0))
+            if index in changed:
+                results.append(finding)
+
+    results.sort(key=lambda r: int(r.get("line_number") or 0))
+    info = {
+        "reanalyzed": [new_segments[i]["name"] for i in changed],
+        "reused_findings": reused,
+    }
+    return results, info
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from .history import _SqliteStore
+
+
+# Lower value runs first. A queued PR gate job always goes before nightly
+# and backfill work, whatever the tenant.
+PRIORITIES = {"pr": 0, "nightly": 1, "backfill": 2}
+
+# How long a claimed job stays with its scheduler without a heartbeat.
+DEFAULT_LEASE_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    params TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',
+    submitted_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    -- The scheduler running the job, and until when its claim holds unless
+    -- renewed (see renew_leases).
+    owner TEXT,
+    lease_expires TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority, submitted_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (status, finished_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (status, lease_expires);
+
+-- Per-tenant bookkeeping for fair sharing: how many jobs a tenant has
+-- running and when it last got a slot.
+CREATE TABLE IF NOT EXISTS job_tenants (
+    tenant TEXT PRIMARY KEY,
+    running INTEGER NOT NULL DEFAULT 0,
+    last_started_at TEXT
+);
+"""
+
+
+def _now(offset_seconds: float = 0.0) -> str:
+    moment = datetime.now(timezone.utc) + timedelta(seconds=offset_seconds)
+    return moment.isoformat(timespec="milliseconds")
+
+
+# Recount running jobs per tenant after jobs were taken away from their
+# schedulers.
+_RECOUNT_TENANTS = """
+UPDATE job_tenants SET running = (
+    SELECT COUNT(*) FROM jobs
+    WHERE jobs.tenant = job_tenants.tenant AND jobs.status = 'running'
+)
+"""
+
+
+def _row_to_job(row: Any) -> Dict[str, Any]:
+    job = dict(row)
+    job["params"] = json.loads(job["params"] or "{}")
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["priority"] = next(
+        (name for name, value in PRIORITIES.items() if value == job["priority"]),
+        job["priority"],
+    )
+    return job
+
+
+class JobQueue(_SqliteStore):
+    """
+    Persistent priority queue of scan and scan-and-fix jobs.
+
+    Jobs are picked by priority class first (see PRIORITIES). Within a class,
+    the tenant with the fewest running jobs goes first, and among those the
+    one that least recently got a slot, so one tenant's backlog cannot starve
+    the others. Each tenant's own jobs run in submission order.
+
+    The queue lives in the history database. A claimed job is leased to its
+    scheduler, which renews the lease while the job runs; jobs whose lease
+    ran out (their scheduler died) are put back in the queue by
+    requeue_expired(). Jobs of live schedulers are never touched.
+    """
+
+    _schema = _SCHEMA
+
+    def submit(
+        self,
+        path: str,
+        kind: str = "scan",
+        priority: str = "nightly",
+        tenant: str = "default",
+        params: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """Queue a job and return its id."""
+        if priority not in PRIORITIES:
+            raise ValueError(
+                f"Unknown priority {priority!r}; expected one of {sorted(PRIORITIES)}"
+            )
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO job_tenants (tenant) VALUES (?)", (tenant,)
+            )
+            cur = conn.execute(
+                """
+                INSERT INTO jobs (tenant, kind, path, priority, params, submitted_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    tenant,
+                    kind,
+                    path,
+                    PRIORITIES[priority],
+                    json.dumps(params or {}),
+                    _now(),
+                ),
+            )
+            return int(cur.lastrowid)
+
+    def claim_next(
+        self,
+        kinds: Sequence[str],
+        owner: Optional[str] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Mark the next job of one of the given kinds as running, leased to
+        owner for lease_seconds, and return it, or return None if no such
+        job is queued.
+        """
+        if not kinds:
+            return None
+        placeholders = ",".join("?" for _ in kinds)
+        with self._connect() as conn:
+            # IMMEDIATE takes the write lock up front, so two schedulers on
+            # the same database never claim the same job.
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"""
+                SELECT j.id, j.tenant FROM jobs j
+                JOIN job_tenants t ON t.tenant = j.tenant
+                WHERE j.status = 'queued' AND j.kind IN ({placeholders})
+                ORDER BY j.priority, t.running, t.last_started_at, j.submitted_at, j.id
+                LIMIT 1
+                """,
+                list(kinds),
+            ).fetchone()
+            if row is None:
+                return None
+            now = _now()
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'running', started_at = ?,
+                    attempts = attempts + 1, owner = ?, lease_expires = ?
+                WHERE id = ?
+                """,
+                (now, owner, _now(lease_seconds), row["id"]),
+            )
+            conn.execute(
+                """
+                UPDATE job_tenants SET running = running + 1, last_started_at = ?
+                WHERE tenant = ?
+                """,
+                (now, row["tenant"]),
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            return _row_to_job(job)
+
+    def complete(
+        self,
+        job_id: int,
+        result: Optional[Dict[str, Any]] = None,
+        owner: Optional[str] = None,
+    ) -> None:
+        """
+        Mark a running job as done and store its (JSON) result. With owner,
+        nothing happens if the job was meanwhile requeued and claimed by
+        someone else.
+        """
+        encoded = json.dumps(result) if result is not None else None
+        self._finish(job_id, "done", encoded, None, owner)
+
+    def fail(self, job_id: int, error: str, owner: Optional[str] = None) -> None:
+        """Mark a running job as failed (see complete for owner)."""
+        self._finish(job_id, "failed", None, error, owner)
+
+    def _finish(
+        self,
+        job_id: int,
+        status: str,
+        result: Optional[str],
+        error: Optional[str],
+        owner: Optional[str],
+    ) -> None:
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?,
+                    lease_expires = NULL
+                WHERE id = ? AND status = 'running' AND (? IS NULL OR owner = ?)
+                """,
+                (status, _now(), result, error, job_id, owner, owner),
+            )
+            if cur.rowcount:
+                conn.execute(
+                    """
+                    UPDATE job_tenants SET running = MAX(running - 1, 0)
+                    WHERE tenant = (SELECT tenant FROM jobs WHERE id = ?)
+                    """,
+                    (job_id,),
+                )
+
+    def renew_leases(
+        self, owner: str, lease_seconds: float = DEFAULT_LEASE_SECONDS
+    ) -> int:
+        """Extend the lease of every job owner is running; returns how many."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                UPDATE jobs SET lease_expires = ?
+                WHERE status = 'running' AND owner = ?
+                """,
+                (_now(lease_seconds), owner),
+            )
+            return cur.rowcount
+
+    def requeue_expired(self) -> int:
+        """
+        Put running jobs whose lease ran out back in the queue and return how
+        many there were. Safe to call while other schedulers are running.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute(
+                """
+                UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL,
+                    lease_expires = NULL
+                WHERE status = 'running'
+                    AND (lease_expires IS NULL OR lease_expires < ?)
+                """,
+                (_now(),),
+            )
+            if cur.rowcount:
+                conn.execute(_RECOUNT_TENANTS)
+            return cur.rowcount
+
+    def requeue_running(self) -> int:
+        """
+        Put every running job back in the queue, whatever its lease, and
+        return how many there were. Only for recovery when no scheduler is
+        running on this database.
+        """
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL,
+                    lease_expires = NULL
+                WHERE status = 'running'
+                """
+            )
+            conn.execute(_RECOUNT_TENANTS)
+            return cur.rowcount
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Return one job, or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def stats(self, since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue metrics.
+
+        Returns
+        -------
+        dict
+            {
+              "queued": {"pr": 2, "nightly": 10, "backfill": 0},
+              "queued_by_tenant": {"team-a": 7, ...},
+              "running": {"scan": 2, "fix": 1},
+              "oldest_queued_seconds": {"pr": 1.5, ...},
+              "wait_seconds": {            # jobs started since `since`
+                "pr": {"count": 40, "mean": 0.8, "max": 3.2}, ...
+              }
+            }
+        """
+        names = {value: name for name, value in PRIORITIES.items()}
+        now = _now()
+        with self._connect() as conn:
+            queued = conn.execute(
+                """
+                SELECT priority, COUNT(*) AS n,
+                    MAX((julianday(?) - julianday(submitted_at)) * 86400.0) AS oldest
+                FROM jobs WHERE status = 'queued' GROUP BY priority
+                """,
+                (now,),
+            ).fetchall()
+            by_tenant = conn.execute(
+                """
+                SELECT tenant, COUNT(*) AS n FROM jobs
+                WHERE status = 'queued' GROUP BY tenant ORDER BY tenant
+                """
+            ).fetchall()
+            running = conn.execute(
+                """
+                SELECT kind, COUNT(*) AS n FROM jobs
+                WHERE status = 'running' GROUP BY kind ORDER BY kind
+                """
+            ).fetchall()
+            waits = conn.execute(
+                """
+                SELECT priority, COUNT(*) AS n,
+                    AVG((julianday(started_at) - julianday(submitted_at)) * 86400.0) AS mean,
+                    MAX((julianday(started_at) - julianday(submitted_at)) * 86400.0) AS max
+                FROM jobs
+                WHERE started_at IS NOT NULL AND (? IS NULL OR started_at >= ?)
+                GROUP BY priority
+                """,
+                (since, since),
+            ).fetchall()
+
+        return {
+            "queued": {
+                name: next((r["n"] for r in queued if r["priority"] == value), 0)
+                for name, value in PRIORITIES.items()
+            },
+            "queued_by_tenant": {r["tenant"]: r["n"] for r in by_tenant},
+            "running": {r["kind"]: r["n"] for r in running},
+            "oldest_queued_seconds": {
+                names.get(r["priority"], r["priority"]): round(r["oldest"], 3)
+                for r in queued
+            },
+            "wait_seconds": {
+                names.get(r["priority"], r["priority"]): {
+                    "count": r["n"],
+                    "mean": round(r["mean"], 3),
+                    "max": round(r["max"], 3),
+                }
+                for r in waits
+            },
+        }
+
+    def jobs(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recently submitted jobs, optionally with one status."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT * FROM jobs WHERE (? IS NULL OR status = ?)
+                ORDER BY id DESC LIMIT ?
+                """,
+                (status, status, limit),
+            ).fetchall()
+        return [_row_to_job(r) for r in rows]
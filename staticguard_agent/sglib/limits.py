@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import ast
+import fnmatch
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .files import read_bytes
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore[assignment]
+
+
+DEFAULT_SCAN_TIMEOUT = 600.0
+DEFAULT_FILE_TIMEOUT = 60.0
+DEFAULT_MAX_FILE_SIZE = 2 * 1024 * 1024
+DEFAULT_MAX_AST_DEPTH = 100
+
+# What to do with a file over max_file_size or max_ast_depth:
+#   skip:    leave it out of the scan entirely.
+#   partial: scan the part of the file that fits within the limits.
+LIMIT_POLICIES = ("skip", "partial")
+
+# Same default exclusions as `bandit -r`.
+_INCLUDED_GLOBS = ("*.py", "*.pyw")
+_EXCLUDED_PATHS = (".svn", "CVS", ".bzr", ".hg", ".git", "__pycache__", ".tox", ".eggs")
+_EXCLUDED_GLOBS = ("*.egg",)
+
+
+def discover_python_files(target: Path) -> List[str]:
+    """
+    List the files Bandit would scan for a target, in sorted order.
+
+    A single file is returned as is. Directories are walked like
+    `bandit -r`, so the returned names match Bandit's filenames.
+    """
+    if not target.is_dir():
+        return [str(target)]
+
+    files: List[str] = []
+    for root, _, names in os.walk(target):
+        for name in names:
+            path = os.path.join(root, name)
+            if is_scannable_python_path(path):
+                files.append(path)
+    return sorted(files)
+
+
+def is_scannable_python_path(path: str) -> bool:
+    """True if `bandit -r` would pick up a file at this path."""
+    if not any(fnmatch.fnmatch(path, g) for g in _INCLUDED_GLOBS):
+        return False
+    if any(x in path for x in _EXCLUDED_PATHS):
+        return False
+    return not any(fnmatch.fnmatch(path, g) for g in _EXCLUDED_GLOBS)
+
+
+def ast_depth(node: ast.AST) -> int:
+    """Return the nesting depth of an AST, without recursion."""
+    depth = 0
+    stack = [(node, 1)]
+    while stack:
+        current, level = stack.pop()
+        depth = max(depth, level)
+        stack.extend((child, level + 1) for child in ast.iter_child_nodes(current))
+    return depth
+
+
+def skipped_entry(
+    filename: str,
+    reason: str,
+    detail: str,
+    action: str = "skipped",
+) -> Dict[str, Any]:
+    """Build one entry of the 'skipped' section of a run_bandit result."""
+    return {
+        "filename": filename,
+        "reason": reason,
+        "action": action,
+        "detail": detail,
+    }
+
+
+def _truncate_to_size(source: bytes, max_file_size: int) -> str:
+    """
+    Keep the longest prefix of whole top-level statements within the size
+    limit. Line numbers of the kept part are unchanged.
+    """
+    text = source[:max_file_size].decode("utf-8", errors="ignore")
+    lines = text.splitlines(keepends=True)
+    if len(source) > max_file_size and lines:
+        lines.pop()  # the last line may be cut in the middle
+    # Cut before the last line starting at column 0, since the statement it
+    # opens may continue past the limit.
+    for i in range(len(lines) - 1, -1, -1):
+        line = lines[i]
+        if line[:1] and not line[:1].isspace() and line[:1] not in "#)]}":
+            return "".join(lines[:i])
+    return ""
+
+
+def _drop_deep_statements(
+    source: str, tree: ast.Module, max_ast_depth: int
+) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Blank out top-level statements deeper than max_ast_depth.
+
+    Blank lines are left in their place so the line numbers of the remaining
+    findings still match the original file.
+    """
+    lines = source.splitlines(keepends=True)
+    removed: List[Tuple[int, int]] = []
+    for stmt in tree.body:
+        # +1 for the Module node itself
+        if ast_depth(stmt) + 1 <= max_ast_depth:
+            continue
+        start = min(
+            [stmt.lineno]
+            + [d.lineno for d in getattr(stmt, "decorator_list", [])]
+        )
+        end = stmt.end_lineno or stmt.lineno
+        for i in range(start - 1, min(end, len(lines))):
+            lines[i] = "\n"
+        removed.append((start, end))
+    return "".join(lines), removed
+
+
+def check_file(
+    path: str,
+    max_file_size: Optional[int],
+    max_ast_depth: Optional[int],
+    policy: str = "skip",
+    cache: bool = True,
+) -> Tuple[str, Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Check a file against the size and AST depth limits before scanning.
+
+    The file is only read (through the shared file cache, unless cache is
+    False) when a limit needs its content.
+
+    Returns
+    -------
+    tuple
+        (action, source, skipped) where action is:
+        - "scan": scan the file as is (source and skipped are None)
+        - "partial": scan `source` instead of the file; skipped describes
+          what was left out
+        - "skip": do not scan the file; skipped says why
+    """
+
+    return check_source(
+        path,
+        os.path.getsize(path),
+        lambda limit: read_bytes(path, limit, cache),
+        max_file_size,
+        max_ast_depth,
+        policy,
+    )
+
+
+def check_source(
+    filename: str,
+    size: int,
+    read: Callable[[Optional[int]], bytes],
+    max_file_size: Optional[int],
+    max_ast_depth: Optional[int],
+    policy: str = "skip",
+) -> Tuple[str, Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Same as check_file, for content that is not a plain file on disk (for
+    example an archive member). `read(n)` returns the first n bytes, or all
+    of them for n=None.
+    """
+    if policy not in LIMIT_POLICIES:
+        raise ValueError(f"Unknown limit policy: {policy!r}")
+
+    partial = policy == "partial"
+    source: Optional[str] = None
+    details: List[str] = []
+    reasons: List[str] = []
+
+    if max_file_size is not None and size > max_file_size:
+        detail = f"{size} bytes > max_file_size {max_file_size}"
+        if not partial:
+            return "skip", None, skipped_entry(filename, "max_file_size", detail)
+        source = _truncate_to_size(read(max_file_size + 1), max_file_size)
+        reasons.append("max_file_size")
+        details.append(f"{detail}; scanned the first {source.count(chr(10))} lines")
+
+    if max_ast_depth is not None:
+        if source is None:
+            try:
+                text = read(None).decode("utf-8")
+            except UnicodeDecodeError:
+                # Bandit reports undecodable files as scan errors.
+                return "scan", None, None
+        else:
+            text = source
+        try:
+            tree = ast.parse(text)
+        except SyntaxError:
+            # Bandit reports syntax errors itself; a truncated prefix that no
+            # longer parses is skipped instead.
+            if source is None:
+                return "scan", None, None
+            return "skip", None, skipped_entry(
+                filename, "max_file_size", details[0] + "; prefix does not parse"
+            )
+        except (RecursionError, MemoryError):
+            return "skip", None, skipped_entry(
+                filename,
+                "max_ast_depth",
+                f"too deeply nested to parse (max_ast_depth {max_ast_depth})",
+            )
+
+        depth = ast_depth(tree)
+        if depth > max_ast_depth:
+            detail = f"AST depth {depth} > max_ast_depth {max_ast_depth}"
+            if not partial:
+                return "skip", None, skipped_entry(filename, "max_ast_depth", detail)
+            source, removed = _drop_deep_statements(text, tree, max_ast_depth)
+            ranges = ", ".join(f"{a}-{b}" for a, b in removed)
+            reasons.append("max_ast_depth")
+            details.append(f"{detail}; left out lines {ranges}")
+
+    if source is None:
+        return "scan", None, None
+    return "partial", source, skipped_entry(
+        filename, ",".join(reasons), "; ".join(details), action="partial"
+    )
+
+
+def memory_limiter(max_memory_mb: Optional[int]) -> Optional[Callable[[], None]]:
+    """
+    Return a preexec_fn that caps the address space of a scan worker, or
+    None when no limit is set or the platform has no `resource` module.
+    """
+    if max_memory_mb is None or resource is None:
+        return None
+    limit = int(max_memory_mb) * 1024 * 1024
+
+    def _apply() -> None:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    return _apply
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import difflib
+from typing import Any, Dict, Optional
+
+
+def unified_diff(original: str, patched: str, path: str) -> str:
+    """Unified diff between two versions of a file, as 'a/<path>' and 'b/<path>'."""
+    return "".join(
+        difflib.unified_diff(
+            original.splitlines(keepends=True),
+            patched.splitlines(keepends=True),
+            fromfile=f"a/{path}",
+            tofile=f"b/{path}",
+        )
+    )
+
+
+def check_syntax(content: str, filename: str = "<patched>") -> Optional[Dict[str, Any]]:
+    """
+    Compile content without running it and return None if it is valid Python.
+
+    Compiling (rather than only parsing) also catches errors such as
+    'return' outside a function. It takes microseconds to milliseconds, so
+    broken candidates are rejected long before a Bandit run.
+
+    Returns
+    -------
+    dict or None
+        {"type", "message", "line", "column", "end_line", "end_column", "text"}
+        with 1-based positions as reported by the compiler (any may be None).
+    """
+    try:
+        compile(content, filename, "exec", dont_inherit=True)
+    except SyntaxError as exc:
+        return {
+            "type": type(exc).__name__,
+            "message": exc.msg,
+            "line": exc.lineno,
+            "column": exc.offset,
+            "end_line": getattr(exc, "end_lineno", None),
+            "end_column": getattr(exc, "end_offset", None),
+            "text": (exc.text or "").rstrip("\n") or None,
+        }
+    except (ValueError, RecursionError, MemoryError) as exc:
+        # Null bytes in the source, or expressions nested or chained too
+        # deeply for the compiler (see limits.max_ast_depth).
+        return {
+            "type": type(exc).__name__,
+            "message": str(exc) or "source is too deeply nested to compile",
+            "line": None,
+            "column": None,
+            "end_line": None,
+            "end_column": None,
+            "text": None,
+        }
+    return None
+
+
+def describe_syntax_error(error: Dict[str, Any]) -> str:
+    """One-line description of a check_syntax error, for 'error' fields."""
+    where = ""
+    if error.get("line") is not None:
+        where = f" at line {error['line']}"
+        if error.get("column") is not None:
+            where += f", column {error['column']}"
+    text = f": {error['text'].strip()}" if error.get("text") else ""
+    return f"Patched content is not valid Python ({error['type']}{where}: {error['message']}){text}"
+
+
+def prepare_patch(original: str, patched: str, path: str) -> Dict[str, Any]:
+    """
+    Check a candidate patch and compute its diff, without running Bandit.
+
+    Returns
+    -------
+    dict
+        {
+          "path": "<path>",
+          "valid": true,              # patched content compiles
+          "syntax_error": null,       # check_syntax result when it does not
+          "changed": true,            # patched differs from the original
+          "diff": "--- a/...",        # unified diff, for build_markdown_report
+        }
+    """
+    error = check_syntax(patched, path)
+    return {
+        "path": path,
+        "valid": error is None,
+        "syntax_error": error,
+        "changed": patched != original,
+        "diff": unified_diff(original, patched, path),
+    }
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from itertools import groupby
+from pathlib import Path
+from typing import IO, Any, Dict, List, Optional, Sequence
+
+from .reporting import _extract_counts, build_markdown_report
+from .tools import patch_accepted
+
+
+FORMATS = ("markdown", "sarif", "jsonl")
+SUFFIXES = {"markdown": ".md", "sarif": ".sarif", "jsonl": ".jsonl"}
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+_SARIF_LEVELS = {"HIGH": "error", "MEDIUM": "warning", "LOW": "note"}
+
+
+def _umask() -> int:
+    # Linux exposes the umask without having to change it; os.umask() briefly
+    # sets it for the whole process, which races with other threads.
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+def _match_mode(tmp_path: str, target: Path) -> None:
+    """
+    Give a mkstemp file (always 0600) the mode a plain open() would leave:
+    the existing target's mode, or 0666 minus the umask for a new file.
+    """
+    try:
+        mode = target.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_umask()
+    os.chmod(tmp_path, mode)
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    """
+    Write text to path through a temp file in the same directory, so readers
+    never see a half-written file.
+    """
+    target = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        _match_mode(tmp, target)
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class _Sink:
+    """One output file, written to a temp file and renamed on commit."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        fd, self.tmp_path = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+        )
+        self.file: IO[str] = os.fdopen(fd, "w", encoding="utf-8")
+
+    def commit(self) -> None:
+        self.file.close()
+        _match_mode(self.tmp_path, self.path)
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self) -> None:
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.unlink(self.tmp_path)
+
+
+class ReportWriter:
+    """
+    Streaming report writer for multi-file runs.
+
+    Scan results and patch evaluations are appended as they are produced and
+    each enabled format is written from the same events:
+
+    - markdown: one section per file, like build_markdown_report
+    - sarif: SARIF 2.1.0 log with one result per Bandit finding
+    - jsonl: one JSON object per line ("finding", "scan", "evaluation")
+
+    Nothing is held in memory apart from the SARIF rule table. Output goes to
+    temp files next to the targets, which are renamed into place by close(),
+    so a crashed run never leaves a truncated report behind.
+
+    Example
+    -------
+    with ReportWriter("out/staticguard", formats=FORMATS) as writer:
+        writer.add_scan(run_bandit("src"))
+        writer.add_evaluation("src/app.py", eval_result, diff, conclusion)
+    # -> out/staticguard.md, out/staticguard.sarif, out/staticguard.jsonl
+    """
+
+    def __init__(self, base_path: str, formats: Sequence[str] = ("markdown",)) -> None:
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown report formats: {sorted(unknown)}")
+
+        base = Path(base_path)
+        if base.suffix in SUFFIXES.values():
+            base = base.with_suffix("")
+        base.parent.mkdir(parents=True, exist_ok=True)
+
+        self._sinks: Dict[str, _Sink] = {}
+        try:
+            for fmt in formats:
+                self._sinks[fmt] = _Sink(Path(f"{base}{SUFFIXES[fmt]}"))
+        except BaseException:
+            self.abort()
+            raise
+
+        self._rules: Dict[str, Dict[str, Any]] = {}
+        self._sarif_results = 0
+        self._closed = False
+
+        if "markdown" in self._sinks:
+            self._sinks["markdown"].file.write("# StaticGuard report\n")
+        if "sarif" in self._sinks:
+            # Results are streamed first; the tool section with the rule
+            # table is written on close, once every rule has been seen.
+            self._sinks["sarif"].file.write('{"runs": [{"results": [')
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+
+    def add_scan(self, result: Dict[str, Any]) -> None:
+        """Append a run_bandit result, as one section per scanned file."""
+        results = sorted(
+            result.get("results") or [],
+            key=lambda r: (str(r.get("filename")), r.get("line_number") or 0),
+        )
+        for filename, findings in groupby(results, key=lambda r: r.get("filename")):
+            self.add_findings(str(filename), list(findings))
+
+        total, high, medium, low = _extract_counts(result.get("summary") or {})
+        self._write_jsonl(
+            {
+                "type": "scan",
+                "path": result.get("path"),
+                "summary": {"total": total, "high": high, "medium": medium, "low": low},
+                "skipped": result.get("skipped") or [],
+                "errors": result.get("errors") or [],
+                "generated_at": result.get("generated_at"),
+            }
+        )
+        skipped = result.get("skipped") or []
+        if skipped and "markdown" in self._sinks:
+            lines = ["", f"## Not fully scanned in `{result.get('path')}`", ""]
+            for entry in skipped:
+                lines.append(
+                    f"- `{entry.get('filename')}`: {entry.get('action')} "
+                    f"({entry.get('reason')}: {entry.get('detail')})"
+                )
+            self._sinks["markdown"].file.write("\n".join(lines) + "\n")
+
+    def add_findings(self, filename: str, findings: List[Dict[str, Any]]) -> None:
+        """Append the findings of one file (compact run_bandit entries)."""
+        if not findings:
+            return
+        if "markdown" in self._sinks:
+            lines = [
+                "",
+                f"## Findings in `{filename}`",
+                "",
+                "| Line | Severity | Test | Issue |",
+                "| --- | --- | --- | --- |",
+            ]
+            for f in findings:
+                text = str(f.get("issue_text") or "").replace("|", "\\|")
+                lines.append(
+                    f"| {f.get('line_number')} | {f.get('issue_severity')} | "
+                    f"{f.get('test_id')} | {text} |"
+                )
+            self._sinks["markdown"].file.write("\n".join(lines) + "\n")
+
+        for f in findings:
+            self._write_jsonl(dict(f, type="finding"))
+            self._write_sarif_result(f)
+
+    def add_evaluation(
+        self,
+        path: str,
+        eval_result: Dict[str, Any],
+        diff: str,
+        conclusion: str,
+        test_id: Optional[str] = None,
+        severity: Optional[str] = None,
+    ) -> None:
+        """Append one scan-and-fix attempt (see build_markdown_report)."""
+        if "markdown" in self._sinks:
+            section = build_markdown_report(
+                path=path,
+                eval_result=eval_result,
+                diff=diff,
+                conclusion=conclusion,
+                test_id=test_id,
+                severity=severity,
+            )
+            # Nest the per-file report under the document title.
+            section = "\n".join(
+                "#" + line if line.startswith("#") else line
+                for line in section.splitlines()
+            )
+            self._sinks["markdown"].file.write("\n" + section + "\n")
+
+        self._write_jsonl(
+            {
+                "type": "evaluation",
+                "path": path,
+                "test_id": test_id,
+                "severity": severity.upper() if severity else None,
+                "error": eval_result.get("error"),
+                "original_summary": eval_result.get("original_summary") or {},
+                "patched_summary": eval_result.get("patched_summary") or {},
+                "delta": eval_result.get("delta") or {},
+                "accepted": patch_accepted(eval_result, test_id),
+                "diff": diff,
+                "conclusion": conclusion,
+            }
+        )
+
+    # ------------------------------------------------------------------
+    # Completion
+    # ------------------------------------------------------------------
+
+    def close(self) -> Dict[str, str]:
+        """Finish every format, move the files into place, return their paths."""
+        if self._closed:
+            return {fmt: str(sink.path) for fmt, sink in self._sinks.items()}
+        if "sarif" in self._sinks:
+            tool = {
+                "driver": {
+                    "name": "StaticGuard",
+                    "informationUri": "https://bandit.readthedocs.io/",
+                    "rules": sorted(self._rules.values(), key=lambda r: r["id"]),
+                }
+            }
+            self._sinks["sarif"].file.write(
+                f'], "tool": {json.dumps(tool)}}}], '
+                f'"version": "2.1.0", "$schema": "{SARIF_SCHEMA}"}}\n'
+            )
+        for sink in self._sinks.values():
+            sink.commit()
+        self._closed = True
+        return {fmt: str(sink.path) for fmt, sink in self._sinks.items()}
+
+    def abort(self) -> None:
+        """Drop all temp files without touching existing reports."""
+        for sink in self._sinks.values():
+            sink.discard()
+        self._closed = True
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    # ------------------------------------------------------------------
+    # Format helpers
+    # ------------------------------------------------------------------
+
+    def _write_jsonl(self, record: Dict[str, Any]) -> None:
+        if "jsonl" in self._sinks:
+            self._sinks["jsonl"].file.write(json.dumps(record) + "\n")
+
+    def _write_sarif_result(self, finding: Dict[str, Any]) -> None:
+        if "sarif" not in self._sinks:
+            return
+        rule_id = finding.get("test_id") or "UNKNOWN"
+        self._rules.setdefault(
+            rule_id,
+            {"id": rule_id, "shortDescription": {"text": rule_id}},
+        )
+        result = {
+            "ruleId": rule_id,
+            "level": _SARIF_LEVELS.get(str(finding.get("issue_severity")), "none"),
+            "message": {"text": finding.get("issue_text") or ""},
+            "locations": [
+                {
+                    "physicalLocation": {
+                        "artifactLocation": {"uri": str(finding.get("filename"))},
+                        "region": {"startLine": int(finding.get("line_number") or 1)},
+                    }
+                }
+            ],
+        }
+        prefix = ", " if self._sarif_results else ""
+        self._sinks["sarif"].file.write(prefix + json.dumps(result))
+        self._sarif_results += 1
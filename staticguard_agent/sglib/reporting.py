@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Tuple
+import re
+from typing import Any, Dict, Optional, Tuple
 
 
 def _extract_counts(summary: Dict[str, Any]) -> Tuple[int, int, int, int]:
@@ -23,6 +24,8 @@ def build_markdown_report(
     eval_result: Dict[str, Any],
     diff: str,
     conclusion: str,
+    test_id: Optional[str] = None,
+    severity: Optional[str] = None,
 ) -> str:
     """
     Build a compact markdown report for a single scan-and-fix attempt.
@@ -41,6 +44,10 @@ def build_markdown_report(
     conclusion:
         Short natural language conclusion from the LLM describing whether the
         patch improved, worsened, or did not change the situation.
+    test_id:
+        Optional Bandit test_id of the finding the patch targets, eg 'B602'.
+    severity:
+        Optional severity of the targeted finding.
 
     Returns
     -------
@@ -78,6 +85,11 @@ def build_markdown_report(
 
     lines.append(f"# StaticGuard evaluation for `{path}`\n")
     lines.append("## Summary\n")
+    if test_id:
+        target = f"- Target finding: `{test_id}`"
+        if severity:
+            target += f" ({severity.upper()})"
+        lines.append(target)
     lines.append(
         f"- Bandit findings before: **{total_before}** "
         f"(High: {high_before}, Medium: {med_before}, Low: {low_before})"
@@ -112,3 +124,62 @@ def build_markdown_report(
         )
 
     return "\n".join(lines) + "\n"
+
+
+_COUNTS_PATTERN = (
+    r"\*\*(\d+)\*\* \(High: (\d+), Medium: (\d+), Low: (\d+)\)"
+)
+_BEFORE_RE = re.compile(r"- Bandit findings before: " + _COUNTS_PATTERN)
+_AFTER_RE = re.compile(r"- After patch: " + _COUNTS_PATTERN)
+_TARGET_RE = re.compile(r"- Target finding: `([^`]+)`(?: \((\w+)\))?")
+_DIFF_RE = re.compile(r"```diff\n(.*?)\n```", re.DOTALL)
+
+
+def _summary_from_match(match: "re.Match[str]") -> Dict[str, int]:
+    _, high, medium, low = (int(g) for g in match.groups())
+    return {
+        "SEVERITY.HIGH": high,
+        "SEVERITY.MEDIUM": medium,
+        "SEVERITY.LOW": low,
+    }
+
+
+def parse_markdown_report(report: str) -> Optional[Dict[str, Any]]:
+    """
+    Recover the structured data from a report built by build_markdown_report.
+
+    This is used when only the final markdown text of a run is available (for
+    example the coordinator's final answer), so run summaries can still store
+    the real before/after counts.
+
+    Returns
+    -------
+    dict or None
+        None if the text does not contain the before/after summary lines.
+        Otherwise an evaluate_patch-like dict with "original_summary",
+        "patched_summary" and "delta", plus "test_id", "severity" and "diff"
+        (None or "" when absent from the report).
+    """
+    before = _BEFORE_RE.search(report or "")
+    after = _AFTER_RE.search(report or "")
+    if not before or not after:
+        return None
+
+    original_summary = _summary_from_match(before)
+    patched_summary = _summary_from_match(after)
+    delta = {
+        key: patched_summary[key] - original_summary[key]
+        for key in original_summary
+    }
+
+    target = _TARGET_RE.search(report)
+    diff = _DIFF_RE.search(report)
+
+    return {
+        "original_summary": original_summary,
+        "patched_summary": patched_summary,
+        "delta": delta,
+        "test_id": target.group(1) if target else None,
+        "severity": target.group(2) if target and target.group(2) else None,
+        "diff": diff.group(1) if diff else "",
+    }
@@ -2,11 +2,16 @@ from __future__ import annotations
 
 from pathlib import Path
 
+from .report_writer import atomic_write_text
+
 
 def save_report(path: str, report: str) -> str:
     """
     Save the report string to a text file.
 
+    The file is replaced atomically, so an existing report is never left
+    half-written.
+
     Parameters
     ----------
     path: str
@@ -21,5 +26,5 @@ def save_report(path: str, report: str) -> str:
         A short status message with the path.
     """
     p = Path(path)
-    p.write_text(report, encoding="utf-8")
+    atomic_write_text(str(p), report)
     return f"Report saved to {p}"
\ No newline at end of file
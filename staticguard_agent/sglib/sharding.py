@@ -0,0 +1,520 @@
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from .archives import scan_members
+from .files import file_digest, read_bytes
+from .limits import (
+    DEFAULT_FILE_TIMEOUT,
+    DEFAULT_MAX_AST_DEPTH,
+    DEFAULT_MAX_FILE_SIZE,
+    DEFAULT_SCAN_TIMEOUT,
+    discover_python_files,
+    memory_limiter,
+    skipped_entry,
+)
+
+
+SHARDS_PER_WORKER = 4
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Extra time a worker gets per shard on top of file_timeout per file, for
+# process start-up and Bandit's own set-up.
+_SHARD_OVERHEAD = 30.0
+
+_PACKAGE_ROOT = str(Path(__file__).resolve().parents[2])
+_LEVELS = ("UNDEFINED", "LOW", "MEDIUM", "HIGH")
+
+# A worker is either a number of local processes or a list of commands, one
+# per node, each starting `python -m staticguard_agent.sglib.sharding worker`
+# there (for example through ssh).
+Workers = Union[int, Sequence[Sequence[str]]]
+
+
+class ShardScanError(Exception):
+    """Raised when a sharded scan cannot run at all."""
+
+
+def local_worker_command() -> List[str]:
+    """Command that starts a shard worker on this machine."""
+    return [sys.executable, "-m", __name__, "worker"]
+
+
+# ----------------------------------------------------------------------
+# Planning and merging
+# ----------------------------------------------------------------------
+
+
+def plan_shards(files: Sequence[str], num_shards: int) -> List[Dict[str, Any]]:
+    """
+    Split files into shards by content hash.
+
+    A file always lands in the same shard for the same content and shard
+    count, whatever other files are in the run or the order they are listed
+    in. The shard_id is derived from the content hashes of its files, so an
+    unchanged shard keeps its id across runs.
+
+    Returns
+    -------
+    list
+        Non-empty shards: {"shard_id", "files": [{"name", "sha1"}, ...]}
+    """
+    buckets: List[List[Dict[str, str]]] = [[] for _ in range(max(1, num_shards))]
+    for name in files:
+        digest = file_digest(name)
+        buckets[int(digest[:8], 16) % len(buckets)].append({"name": name, "sha1": digest})
+
+    shards = []
+    for bucket in buckets:
+        if not bucket:
+            continue
+        bucket.sort(key=lambda entry: entry["name"])
+        shard_id = hashlib.sha1(
+            "".join(f"{e['name']}\0{e['sha1']}\n" for e in bucket).encode("utf-8")
+        ).hexdigest()[:16]
+        shards.append({"shard_id": shard_id, "files": bucket})
+    return shards
+
+
+def merge_partials(
+    partials: Sequence[Dict[str, Any]],
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Merge shard partial results into Bandit-shaped JSON and a skipped list.
+
+    Every file belongs to exactly one shard, so totals add up exactly and
+    findings are only concatenated (then ordered by filename, keeping
+    Bandit's order within a file).
+    """
+    totals = {f"SEVERITY.{level}": 0 for level in _LEVELS}
+    results: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    skipped: List[Dict[str, Any]] = []
+    for partial in partials:
+        for key, value in partial["totals"].items():
+            totals[key] = totals.get(key, 0) + int(value)
+        results.extend(partial["results"])
+        errors.extend(partial["errors"])
+        skipped.extend(partial["skipped"])
+
+    results.sort(key=lambda r: str(r.get("filename")))
+    errors.sort(key=lambda e: str(e.get("filename")))
+    skipped.sort(key=lambda s: str(s.get("filename")))
+    data = {
+        "metrics": {"_totals": totals},
+        "results": results,
+        "errors": errors,
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    return data, skipped
+
+
+# ----------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------
+
+
+def scan_shard(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Scan one shard request and return its partial result.
+
+    The request carries file contents, so the worker needs no access to the
+    coordinator's file system. The partial result only keeps the fields
+    run_bandit reports, plus per-severity totals.
+    """
+    limits = request.get("limits", {})
+    members = []
+    for entry in request["files"]:
+        data = base64.b64decode(entry["content"])
+        members.append((entry["name"], len(data), io.BytesIO(data)))
+
+    totals = {f"SEVERITY.{level}": 0 for level in _LEVELS}
+    results: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    skipped: List[Dict[str, Any]] = []
+
+    def collect(event: Dict[str, Any]) -> None:
+        kind = event.pop("type")
+        if kind == "fatal":
+            raise ShardScanError(event["message"])
+        if kind == "skipped":
+            skipped.append(event)
+            return
+        for issue in event["results"]:
+            key = f"SEVERITY.{issue.get('issue_severity')}"
+            totals[key] = totals.get(key, 0) + 1
+            results.append(
+                {
+                    "filename": issue.get("filename"),
+                    "line_number": issue.get("line_number"),
+                    "issue_severity": issue.get("issue_severity"),
+                    "issue_text": issue.get("issue_text"),
+                    "test_id": issue.get("test_id"),
+                }
+            )
+        errors.extend(event["errors"])
+
+    scan_members(
+        members,
+        limits.get("file_timeout"),
+        limits.get("max_file_size"),
+        limits.get("max_ast_depth"),
+        limits.get("limit_policy", "skip"),
+        collect,
+    )
+    return {
+        "shard_id": request["shard_id"],
+        "totals": totals,
+        "results": results,
+        "errors": errors,
+        "skipped": skipped,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Shard worker entry point: reads one JSON shard request per line on
+    stdin and writes one JSON partial result per line on stdout.
+    """
+    parser = argparse.ArgumentParser(description="StaticGuard shard worker")
+    parser.add_argument("mode", choices=["worker"])
+    parser.parse_args(argv)
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        try:
+            response = scan_shard(request)
+        except ShardScanError as exc:
+            response = {"shard_id": request.get("shard_id"), "fatal": str(exc)}
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+    return 0
+
+
+# ----------------------------------------------------------------------
+# Coordinator side
+# ----------------------------------------------------------------------
+
+
+class _WorkerFailed(Exception):
+    """A worker died, timed out or returned garbage for a shard."""
+
+
+class _WorkerProcess:
+    """One worker process, fed shard requests over its stdin."""
+
+    def __init__(self, command: Sequence[str], max_memory_mb: Optional[int]) -> None:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            p for p in (_PACKAGE_ROOT, env.get("PYTHONPATH")) if p
+        )
+        self.command = list(command)
+        self.stderr = tempfile.TemporaryFile(mode="w+")
+        self.proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self.stderr,
+            text=True,
+            env=env,
+            preexec_fn=memory_limiter(max_memory_mb),
+        )
+        self.lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self) -> None:
+        assert self.proc.stdout is not None
+        for line in self.proc.stdout:
+            self.lines.put(line)
+        self.lines.put(None)
+
+    def request(self, message: str, timeout: Optional[float]) -> Dict[str, Any]:
+        try:
+            assert self.proc.stdin is not None
+            self.proc.stdin.write(message + "\n")
+            self.proc.stdin.flush()
+        except OSError as exc:
+            raise _WorkerFailed(f"cannot send shard: {exc}") from exc
+        try:
+            line = self.lines.get(timeout=timeout)
+        except queue.Empty:
+            raise _WorkerFailed(f"no result within {timeout:.1f}s") from None
+        if line is None:
+            self.stderr.seek(0)
+            raise _WorkerFailed(
+                f"worker exited with code {self.proc.wait()}: "
+                f"{self.stderr.read()[-500:].strip()}"
+            )
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise _WorkerFailed(f"unreadable worker output: {exc}") from exc
+
+    def close(self) -> None:
+        try:
+            if self.proc.stdin is not None:
+                self.proc.stdin.close()
+            self.proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+            self.proc.wait()
+        self.stderr.close()
+
+    def kill(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+
+
+class _ShardBoard:
+    """
+    Shared state of a sharded scan: the shards still to run, which workers
+    already tried each one, and which workers are still alive.
+    """
+
+    def __init__(
+        self,
+        shards: List[Dict[str, Any]],
+        workers: Sequence[int],
+        max_attempts: int,
+        deadline: Optional[float],
+    ) -> None:
+        self.cond = threading.Condition()
+        self.pending: Deque[Dict[str, Any]] = deque(
+            dict(shard, tried=set(), attempts=0, error="") for shard in shards
+        )
+        self.outstanding = len(shards)
+        self.alive: Set[int] = set(workers)
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.partials: List[Dict[str, Any]] = []
+        self.failed: List[Tuple[Dict[str, Any], str, str]] = []
+
+    def take(self, worker: int) -> Optional[Dict[str, Any]]:
+        """Next shard this worker has not tried yet, or None when done."""
+        with self.cond:
+            while True:
+                if self.outstanding == 0 or worker not in self.alive:
+                    return None
+                if self.deadline is not None and time.monotonic() >= self.deadline:
+                    return None
+                self._give_up_exhausted()
+                for shard in self.pending:
+                    if worker not in shard["tried"]:
+                        self.pending.remove(shard)
+                        return shard
+                self.cond.wait(timeout=1.0)
+
+    def _give_up_exhausted(self) -> None:
+        for shard in list(self.pending):
+            if shard["attempts"] >= self.max_attempts or self.alive <= shard["tried"]:
+                self.pending.remove(shard)
+                self._fail(shard, "worker_failed", shard["error"])
+
+    def _fail(self, shard: Dict[str, Any], reason: str, detail: str) -> None:
+        self.failed.append((shard, reason, detail))
+        self.outstanding -= 1
+        self.cond.notify_all()
+
+    def fail(self, shard: Dict[str, Any], reason: str, detail: str) -> None:
+        """Give up on a shard without retrying it."""
+        with self.cond:
+            self._fail(shard, reason, detail)
+
+    def done(self, partial: Dict[str, Any]) -> None:
+        with self.cond:
+            self.partials.append(partial)
+            self.outstanding -= 1
+            self.cond.notify_all()
+
+    def retry(self, shard: Dict[str, Any], worker: int, error: str) -> None:
+        """Put a shard back for a worker that has not tried it yet."""
+        with self.cond:
+            shard["tried"].add(worker)
+            shard["attempts"] += 1
+            shard["error"] = error
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                self._fail(shard, "scan_timeout", "scan time budget exhausted")
+                return
+            self.pending.append(shard)
+            self.cond.notify_all()
+
+    def retire(self, worker: int) -> None:
+        """Stop handing shards to a worker that cannot start or keeps failing."""
+        with self.cond:
+            self.alive.discard(worker)
+            self.cond.notify_all()
+
+    def leftovers(self) -> List[Tuple[Dict[str, Any], str, str]]:
+        """Shards that never finished, with the reason, once all workers stopped."""
+        timed_out = self.deadline is not None and time.monotonic() >= self.deadline
+        reason = "scan_timeout" if timed_out else "worker_failed"
+        detail = "scan time budget exhausted" if timed_out else "no worker left"
+        return self.failed + [
+            (shard, reason, shard["error"] or detail) for shard in self.pending
+        ]
+
+
+def scan_sharded(
+    path: str,
+    workers: Workers = 2,
+    num_shards: Optional[int] = None,
+    scan_timeout: Optional[float] = DEFAULT_SCAN_TIMEOUT,
+    file_timeout: Optional[float] = DEFAULT_FILE_TIMEOUT,
+    max_file_size: Optional[int] = DEFAULT_MAX_FILE_SIZE,
+    max_ast_depth: Optional[int] = DEFAULT_MAX_AST_DEPTH,
+    limit_policy: str = "skip",
+    max_memory_mb: Optional[int] = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Scan a directory by spreading content-hash shards over worker processes.
+
+    Parameters
+    ----------
+    workers:
+        Number of local worker processes, or one command per worker (for
+        example ['ssh', 'node1', 'python', '-m',
+        'staticguard_agent.sglib.sharding', 'worker']). File contents are
+        sent with each shard, so nodes need no shared file system.
+    num_shards:
+        Defaults to SHARDS_PER_WORKER shards per worker.
+    max_attempts:
+        A shard that fails is retried on a worker that has not tried it yet,
+        at most this many times in total. The failing worker process is
+        restarted, since the shard itself (a file that hits the memory limit
+        or the timeout) is the most likely cause. A worker that fails this
+        many shards in a row, or cannot be started, is dropped.
+
+    The remaining parameters are the run_bandit limits. Files of shards that
+    could not be scanned are reported in 'skipped' as 'worker_failed',
+    'scan_timeout' or 'read_error' (a file could not be read anymore).
+
+    Returns
+    -------
+    tuple
+        (data, skipped), as for scan_archive.
+    """
+    commands = (
+        [local_worker_command() for _ in range(workers)]
+        if isinstance(workers, int)
+        else [list(c) for c in workers]
+    )
+    if not commands:
+        raise ShardScanError("A sharded scan needs at least one worker.")
+
+    deadline = None if scan_timeout is None else time.monotonic() + scan_timeout
+    shards = plan_shards(
+        discover_python_files(Path(path)),
+        num_shards or SHARDS_PER_WORKER * len(commands),
+    )
+    limits = {
+        "file_timeout": file_timeout,
+        "max_file_size": max_file_size,
+        "max_ast_depth": max_ast_depth,
+        "limit_policy": limit_policy,
+    }
+    board = _ShardBoard(shards, range(len(commands)), max_attempts, deadline)
+
+    def shard_timeout(shard: Dict[str, Any]) -> Optional[float]:
+        budgets = []
+        if file_timeout is not None:
+            budgets.append(file_timeout * len(shard["files"]) + _SHARD_OVERHEAD)
+        if deadline is not None:
+            budgets.append(max(0.0, deadline - time.monotonic()))
+        return min(budgets) if budgets else None
+
+    def run_worker(index: int) -> None:
+        worker: Optional[_WorkerProcess] = None
+        failures = 0
+        try:
+            while True:
+                if worker is None:
+                    try:
+                        worker = _WorkerProcess(commands[index], max_memory_mb)
+                    except OSError:
+                        board.retire(index)
+                        return
+                shard = board.take(index)
+                if shard is None:
+                    return
+                try:
+                    files = []
+                    for entry in shard["files"]:
+                        content = base64.b64encode(read_bytes(entry["name"]))
+                        files.append(
+                            {"name": entry["name"], "content": content.decode("ascii")}
+                        )
+                except OSError as exc:
+                    # The file changed on disk after planning; no worker can
+                    # do better, so the shard is not retried.
+                    board.fail(shard, "read_error", f"cannot read shard file: {exc}")
+                    continue
+                try:
+                    message = json.dumps(
+                        {"shard_id": shard["shard_id"], "files": files, "limits": limits}
+                    )
+                    partial = worker.request(message, shard_timeout(shard))
+                    if "fatal" in partial:
+                        raise _WorkerFailed(partial["fatal"])
+                    if partial.get("shard_id") != shard["shard_id"]:
+                        raise _WorkerFailed("worker answered for another shard")
+                except Exception as exc:
+                    # _WorkerFailed, or anything unexpected: never leave the
+                    # shard taken, or the other workers wait for it forever.
+                    # The process is replaced before the next shard.
+                    worker.kill()
+                    worker.close()
+                    worker = None
+                    board.retry(shard, index, f"{' '.join(commands[index][:3])}: {exc}")
+                    failures += 1
+                    if failures >= max_attempts:
+                        board.retire(index)
+                        return
+                    continue
+                failures = 0
+                board.done(partial)
+        finally:
+            if worker is not None:
+                worker.close()
+
+    threads = [
+        threading.Thread(target=run_worker, args=(i,), daemon=True)
+        for i in range(len(commands))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    data, skipped = merge_partials(board.partials)
+    for shard, reason, detail in board.leftovers():
+        for entry in shard["files"]:
+            skipped.append(
+                skipped_entry(
+                    entry["name"], reason, f"shard {shard['shard_id']}: {detail}"
+                )
+            )
+    skipped.sort(key=lambda s: str(s.get("filename")))
+    return data, skipped
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .tools import patch_accepted
+
+
+DEFAULT_CANDIDATES = 3
+DEFAULT_MAX_PARALLEL_CALLS = 3
+CANDIDATES_ENV = "STATICGUARD_PATCH_CANDIDATES"
+MAX_PARALLEL_CALLS_ENV = "STATICGUARD_MAX_PARALLEL_MODEL_CALLS"
+
+# Candidate i uses STRATEGIES[i % len(STRATEGIES)], so candidates differ in
+# both sampling temperature and the kind of fix they are asked for.
+STRATEGIES: List[Dict[str, Any]] = [
+    {
+        "name": "minimal",
+        "temperature": 0.0,
+        "hint": "Change as few lines as possible.",
+    },
+    {
+        "name": "safe_api",
+        "temperature": 0.4,
+        "hint": "Replace the unsafe call with its safe standard library "
+        "equivalent.",
+    },
+    {
+        "name": "validate_input",
+        "temperature": 0.8,
+        "hint": "Keep the call but validate or constrain its inputs so the "
+        "finding no longer applies.",
+    },
+]
+
+_CODE_FENCE = re.compile(r"```[a-zA-Z0-9_+-]*\n(.*?)```", re.DOTALL)
+
+
+def speculation_budget(
+    candidates: Optional[int] = None,
+    max_parallel_calls: Optional[int] = None,
+) -> Tuple[int, int]:
+    """
+    Return (candidates, max_parallel_calls), falling back to
+    STATICGUARD_PATCH_CANDIDATES and STATICGUARD_MAX_PARALLEL_MODEL_CALLS,
+    then to the defaults. Both are at least 1.
+    """
+    if candidates is None:
+        candidates = int(os.environ.get(CANDIDATES_ENV) or DEFAULT_CANDIDATES)
+    if max_parallel_calls is None:
+        max_parallel_calls = int(
+            os.environ.get(MAX_PARALLEL_CALLS_ENV) or DEFAULT_MAX_PARALLEL_CALLS
+        )
+    return max(1, candidates), max(1, max_parallel_calls)
+
+
+def strategy_for(index: int) -> Dict[str, Any]:
+    """Return the prompting strategy for candidate `index`."""
+    return STRATEGIES[index % len(STRATEGIES)]
+
+
+def build_patch_prompt(
+    source: str,
+    file_path: str,
+    finding: Dict[str, Any],
+    strategy: Dict[str, Any],
+) -> str:
+    """
+    Build the model prompt for one candidate patch.
+
+    finding holds the compact run_bandit fields of the target finding
+    (line_number, issue_severity, test_id, issue_text); missing ones are
+    left out.
+    """
+    details = "\n".join(
+        f"- {label}: {finding[key]}"
+        for key, label in (
+            ("line_number", "line"),
+            ("issue_severity", "severity"),
+            ("test_id", "Bandit test_id"),
+            ("issue_text", "issue"),
+        )
+        if finding.get(key) is not None
+    )
+    return (
+        f"Fix this Bandit finding in `{file_path}`:\n"
+        f"{details}\n\n"
+        f"{strategy['hint']} Only modify the region that contains the problem "
+        "and do not introduce other security issues.\n"
+        "Reply with the FULL patched file in a single ```python code block "
+        "and nothing else.\n\n"
+        f"```python\n{source}\n```\n"
+    )
+
+
+def extract_code(text: str) -> str:
+    """Return the first fenced code block of a model reply, or the reply."""
+    match = _CODE_FENCE.search(text)
+    return match.group(1) if match else text.strip() + "\n"
+
+
+async def first_acceptable_patch(
+    generate: Callable[[int], Awaitable[str]],
+    evaluate: Callable[[str], Dict[str, Any]],
+    test_id: Optional[str] = None,
+    candidates: Optional[int] = None,
+    max_parallel_calls: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Generate candidate patches concurrently and keep the first acceptable one.
+
+    Candidates are evaluated as they arrive, one at a time. The first one
+    that passes patch_accepted (no new HIGH findings, and the target test_id,
+    or else the total, goes down) wins: every other candidate still being
+    generated is cancelled and no further evaluation is started, so no
+    Bandit run is left going once the winner is known. Identical candidates
+    are evaluated only once. A candidate whose generate or evaluate call
+    raises (quota, network, ...) counts as failed, with status "error".
+
+    Parameters
+    ----------
+    generate:
+        Async callable returning the full patched file for candidate i.
+    evaluate:
+        Blocking callable returning an evaluate_patch result for a patched
+        file; it is run in a worker thread.
+    test_id:
+        Bandit test_id of the target finding.
+    candidates, max_parallel_calls:
+        Number of candidates and the maximum number of generate calls in
+        flight at once (see speculation_budget).
+
+    Returns
+    -------
+    dict
+        {
+          "accepted": bool,
+          "candidate": int or None,
+          "strategy": str or None,
+          "patched_content": str or None,
+          "eval_result": dict or None,
+          "attempts": [{"candidate", "strategy", "status", ...}, ...]
+        }
+        status is one of "accepted", "rejected", "error" or "cancelled".
+    """
+    candidates, max_parallel_calls = speculation_budget(candidates, max_parallel_calls)
+    calls = asyncio.Semaphore(max_parallel_calls)
+    evaluating = asyncio.Lock()
+    evaluations: Dict[str, asyncio.Future] = {}
+    stopped = False
+
+    async def evaluate_once(content: str) -> Optional[Dict[str, Any]]:
+        nonlocal stopped
+        async with evaluating:
+            if stopped:
+                return None
+            eval_result = await asyncio.to_thread(evaluate, content)
+            # Decided before the lock is released, so the next candidate in
+            # line never starts its evaluation after a winner.
+            if patch_accepted(eval_result, test_id):
+                stopped = True
+            return eval_result
+
+    async def run_candidate(index: int) -> Dict[str, Any]:
+        attempt: Dict[str, Any] = {
+            "candidate": index,
+            "strategy": strategy_for(index)["name"],
+        }
+        try:
+            async with calls:
+                content = await generate(index)
+            key = hashlib.sha1(content.encode("utf-8")).hexdigest()
+            if key not in evaluations:
+                evaluations[key] = asyncio.ensure_future(evaluate_once(content))
+            # Shielded so that cancelling one candidate does not cancel an
+            # evaluation an identical candidate is waiting on.
+            eval_result = await asyncio.shield(evaluations[key])
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            return dict(attempt, status="error", error=str(exc))
+        if eval_result is None:
+            # Another candidate won while this one waited for its evaluation.
+            return dict(attempt, status="cancelled")
+
+        accepted = patch_accepted(eval_result, test_id)
+        return dict(
+            attempt,
+            status="accepted" if accepted else "rejected",
+            patched_content=content,
+            eval_result=eval_result,
+        )
+
+    tasks = [asyncio.ensure_future(run_candidate(i)) for i in range(candidates)]
+    attempts: List[Dict[str, Any]] = []
+    winner: Optional[Dict[str, Any]] = None
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            attempt = await next_done
+            attempts.append(attempt)
+            if attempt["status"] == "accepted":
+                winner = attempt
+                break
+    finally:
+        stopped = True
+        pending = [t for t in tasks if not t.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    finished = {a["candidate"] for a in attempts}
+    for index, task in enumerate(tasks):
+        if index in finished:
+            continue
+        if task.cancelled():
+            attempts.append(
+                {
+                    "candidate": index,
+                    "strategy": strategy_for(index)["name"],
+                    "status": "cancelled",
+                }
+            )
+        else:
+            # Finished in the same loop iteration as the winner.
+            attempts.append(task.result())
+
+    summary = [
+        {
+            "candidate": a["candidate"],
+            "strategy": a["strategy"],
+            "status": a["status"],
+            **({"error": a["error"]} if "error" in a else {}),
+            **(
+                {"delta": (a["eval_result"] or {}).get("delta")}
+                if "eval_result" in a
+                else {}
+            ),
+        }
+        for a in sorted(attempts, key=lambda a: a["candidate"])
+    ]
+    return {
+        "accepted": winner is not None,
+        "candidate": winner["candidate"] if winner else None,
+        "strategy": winner["strategy"] if winner else None,
+        "patched_content": winner["patched_content"] if winner else None,
+        "eval_result": winner["eval_result"] if winner else None,
+        "attempts": summary,
+    }
@@ -1,33 +1,273 @@
 from __future__ import annotations
 
 import json
+import os
 import subprocess
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import tempfile
 
+from .archives import ArchiveScanError, is_archive, scan_archive
+from .files import DEFAULT_MAX_LOAD_SIZE, file_digest, read_text
+from .incremental import incremental_rescan
+from .patches import check_syntax, describe_syntax_error
+from .sharding import ShardScanError, Workers, scan_sharded
+from .limits import (
+    DEFAULT_FILE_TIMEOUT,
+    DEFAULT_MAX_AST_DEPTH,
+    DEFAULT_MAX_FILE_SIZE,
+    DEFAULT_SCAN_TIMEOUT,
+    check_file,
+    discover_python_files,
+    memory_limiter,
+    skipped_entry,
+)
+
+
+# Files per Bandit process. Keeps command lines short on large trees and
+# bounds how much work a timeout throws away.
+BATCH_SIZE = 200
+
+# Original-file scans kept for evaluate_patch, keyed by path and content hash.
+SCAN_CACHE_SIZE = 64
+VERIFY_INCREMENTAL_ENV = "STATICGUARD_VERIFY_INCREMENTAL"
+
+_scan_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+_scan_cache_lock = threading.Lock()
 
 
 class BanditError(Exception):
     """Raised when the Bandit scan fails in a non recoverable way."""
 
-def load_file(path: str) -> str:
+def load_file(path: str, max_size: Optional[int] = DEFAULT_MAX_LOAD_SIZE) -> str:
+    """
+    Load the content of a text file through the shared file cache.
+
+    Raises FileNotFoundError or IsADirectoryError for invalid paths, and
+    FileTooLargeError for files over max_size bytes (None disables the
+    limit).
+    """
+    return read_text(path, max_size)
+
+
+class _WorkerFailed(Exception):
+    """A Bandit worker died (for example on its memory limit)."""
+
+
+def _run_bandit_batch(
+    files: List[str],
+    timeout: Optional[float],
+    max_memory_mb: Optional[int],
+) -> Dict[str, Any]:
+    """
+    Run one Bandit process on a list of files and return its parsed JSON.
+
+    Raises subprocess.TimeoutExpired when the time budget runs out; the
+    process is killed by subprocess.run.
+    """
+    cmd = ["bandit", "-f", "json", *files]
+
+    try:
+        completed = subprocess.run(
+            cmd,
+            check=False,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            preexec_fn=memory_limiter(max_memory_mb),
+        )
+    except FileNotFoundError as exc:
+        # bandit CLI not installed or not on PATH
+        raise BanditError(
+            "Bandit executable not found. "
+            "Make sure 'bandit' is installed in this virtual environment."
+        ) from exc
+
+    # Bandit exits with code 1 when issues are found, and 0 when none are found.
+    # Codes > 1 indicate an error. With a memory limit set, a crash is most
+    # likely the worker hitting it, so it is isolated like a timeout.
+    if completed.returncode not in (0, 1):
+        message = (
+            f"Bandit failed with exit code {completed.returncode}: "
+            f"{completed.stderr.strip()}"
+        )
+        if max_memory_mb is not None:
+            raise _WorkerFailed(message)
+        raise BanditError(message)
+
+    try:
+        return json.loads(completed.stdout)
+    except json.JSONDecodeError as exc:
+        if max_memory_mb is not None:
+            raise _WorkerFailed("Bandit produced no JSON output.") from exc
+        raise BanditError("Failed to parse Bandit JSON output.") from exc
+
+
+def _scan_isolating(
+    batches: List[List[str]],
+    deadline: Optional[float],
+    file_timeout: Optional[float],
+    max_memory_mb: Optional[int],
+    outputs: List[Dict[str, Any]],
+    skipped: List[Dict[str, Any]],
+) -> None:
+    """
+    Scan batches of files, isolating files that blow a budget.
+
+    Each batch gets file_timeout per file, and at most half the time left
+    until the scan deadline while other files are waiting, so one hung file
+    cannot use up the whole scan. A batch that times out (or whose worker dies) is
+    split in half and both halves are queued behind the other batches, down
+    to single files, which are then added to `skipped`. Files are only
+    reported as scan_timeout once the scan deadline has passed.
     """
-    Load the content of a text file.
+    pending = deque(batches)
+    while pending:
+        files = pending.popleft()
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            for f in [f for batch in (files, *pending) for f in batch]:
+                skipped.append(
+                    skipped_entry(f, "scan_timeout", "scan time budget exhausted")
+                )
+            return
+
+        budget = remaining
+        if remaining is not None and (len(files) > 1 or pending):
+            budget = remaining / 2
+        if file_timeout is not None:
+            batch_budget = file_timeout * len(files)
+            budget = batch_budget if budget is None else min(budget, batch_budget)
+
+        try:
+            outputs.append(_run_bandit_batch(files, budget, max_memory_mb))
+            continue
+        except subprocess.TimeoutExpired:
+            if deadline is not None and time.monotonic() >= deadline:
+                pending.appendleft(files)
+                continue
+            if len(files) == 1:
+                skipped.append(
+                    skipped_entry(
+                        files[0], "file_timeout", f"no result within {budget:.1f}s"
+                    )
+                )
+                continue
+        except _WorkerFailed as exc:
+            if len(files) == 1:
+                skipped.append(skipped_entry(files[0], "worker_failed", str(exc)))
+                continue
+
+        middle = len(files) // 2
+        pending.extend((files[:middle], files[middle:]))
 
-    Raises FileNotFoundError or IsADirectoryError for invalid paths.
+
+def _merge_bandit_outputs(outputs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge the JSON of several Bandit runs into one Bandit-shaped dict."""
+    totals: Dict[str, int] = {
+        f"SEVERITY.{level}": 0 for level in ("UNDEFINED", "LOW", "MEDIUM", "HIGH")
+    }
+    results: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    generated_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    for data in outputs:
+        for key, value in data.get("metrics", {}).get("_totals", {}).items():
+            if key.startswith("SEVERITY."):
+                try:
+                    totals[key] = totals.get(key, 0) + int(value)
+                except (TypeError, ValueError):
+                    continue
+        results.extend(data.get("results", []))
+        errors.extend(data.get("errors", []))
+        generated_at = data.get("generated_at") or generated_at
+    return {
+        "metrics": {"_totals": totals},
+        "results": results,
+        "errors": errors,
+        "generated_at": generated_at,
+    }
+
+
+def _scan_path(
+    target: Path,
+    scan_timeout: Optional[float],
+    file_timeout: Optional[float],
+    max_file_size: Optional[int],
+    max_ast_depth: Optional[int],
+    limit_policy: str,
+    max_memory_mb: Optional[int],
+    cache_files: bool = True,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
     """
-    p = Path(path)
-    if not p.exists():
-        raise FileNotFoundError(f"File does not exist: {path}")
-    if not p.is_file():
-        raise IsADirectoryError(f"Expected a file, got a directory: {path}")
-    return p.read_text(encoding="utf-8")
+    Scan a file or directory within the limits and return (Bandit-shaped
+    JSON, skipped entries).
+    """
+    deadline = None if scan_timeout is None else time.monotonic() + scan_timeout
+    skipped: List[Dict[str, Any]] = []
+    outputs: List[Dict[str, Any]] = []
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Files are passed to Bandit one by one, which names them
+        # './<path>', and partial scans run on temp copies. Map both back to
+        # the names a plain `bandit -r <dir>` or `bandit <file>` run reports.
+        display_names: Dict[str, str] = {}
+        to_scan: List[str] = []
+        for i, filename in enumerate(discover_python_files(target)):
+            shown = filename if target.is_dir() else os.path.join(".", filename)
+            display_names[filename] = shown
+            action, source, entry = check_file(
+                filename, max_file_size, max_ast_depth, limit_policy, cache_files
+            )
+            if entry is not None:
+                skipped.append(entry)
+            if action == "skip":
+                continue
+            scan_path = filename
+            if action == "partial":
+                scan_path = str(Path(tmpdir) / f"{i}_{Path(filename).name}")
+                Path(scan_path).write_text(source or "", encoding="utf-8")
+            display_names[scan_path] = shown
+            display_names[os.path.join(".", scan_path)] = shown
+            to_scan.append(scan_path)
+
+        _scan_isolating(
+            [
+                to_scan[start:start + BATCH_SIZE]
+                for start in range(0, len(to_scan), BATCH_SIZE)
+            ],
+            deadline,
+            file_timeout,
+            max_memory_mb,
+            outputs,
+            skipped,
+        )
+
+    for entry in skipped:
+        entry["filename"] = display_names.get(entry["filename"], entry["filename"])
+
+    data = _merge_bandit_outputs(outputs)
+    for item in data["results"] + data["errors"]:
+        name = item.get("filename")
+        item["filename"] = display_names.get(name, name)
+
+    return data, skipped
 
 
 def run_bandit(
     path: str,
     severity_filter: Optional[str] = None,
+    scan_timeout: Optional[float] = DEFAULT_SCAN_TIMEOUT,
+    file_timeout: Optional[float] = DEFAULT_FILE_TIMEOUT,
+    max_file_size: Optional[int] = DEFAULT_MAX_FILE_SIZE,
+    max_ast_depth: Optional[int] = DEFAULT_MAX_AST_DEPTH,
+    limit_policy: str = "skip",
+    max_memory_mb: Optional[int] = None,
+    workers: Optional[Workers] = None,
+    cache_files: bool = True,
 ) -> Dict[str, Any]:
     """
     Run the Bandit Python security analyzer on a file or directory.
@@ -35,11 +275,37 @@ def run_bandit(
     Parameters
     ----------
     path:
-        Path to a single .py file or a directory containing Python code.
+        Path to a single .py file, a directory containing Python code, or an
+        archive (.whl, .zip, .egg, .tar, .tar.gz, .tgz, ...). Archive members
+        are scanned from memory and reported as '<archive>!<member>'.
     severity_filter:
         Optional severity filter: 'LOW', 'MEDIUM', or 'HIGH'.
         If provided, only results with that issue_severity are returned.
         Summary counts are still computed for all severities.
+    scan_timeout:
+        Time budget in seconds for the whole scan. Files not scanned when it
+        runs out are reported in 'skipped'. None disables it.
+    file_timeout:
+        Time budget in seconds per file. Files that exceed it are isolated
+        and reported in 'skipped'. None disables it.
+    max_file_size:
+        Maximum file size in bytes. None disables the check.
+    max_ast_depth:
+        Maximum AST nesting depth. None disables the check (and the extra
+        parse it needs).
+    limit_policy:
+        What to do with files over max_file_size / max_ast_depth: 'skip'
+        leaves them out, 'partial' scans the part within the limits.
+    max_memory_mb:
+        Address space limit for each Bandit worker process (POSIX only).
+    workers:
+        Spread a directory scan over shard workers: a number of local
+        processes, or one command per worker node (see
+        sharding.scan_sharded). None scans in this process tree as usual.
+    cache_files:
+        Read files for the limit checks through the shared file cache. Pass
+        False when scanning temporary copies, which would only push real
+        sources out of the cache.
 
     Returns
     -------
@@ -50,7 +316,12 @@ def run_bandit(
         - results: list of findings with filename, line_number,
                    issue_severity, issue_text, and test_id
         - errors: list of Bandit errors, if any
+        - skipped: list of files that were not (fully) scanned, with
+                   filename, reason, action ('skipped' or 'partial') and
+                   detail
         - generated_at: timestamp string from Bandit
+        - severity_filter: the normalized filter, or None if results are
+                           complete
 
     Notes
     -----
@@ -62,40 +333,44 @@ def run_bandit(
     if not target.exists():
         raise BanditError(f"Target path does not exist: {path}")
 
-    # Build the Bandit command.
-    # For directories, we use recursive mode (-r).
-    # For single files, we pass the file path directly.
-    if target.is_dir():
-        cmd = ["bandit", "-r", str(target), "-f", "json"]
+    if is_archive(path):
+        try:
+            data, skipped = scan_archive(
+                str(target),
+                scan_timeout=scan_timeout,
+                file_timeout=file_timeout,
+                max_file_size=max_file_size,
+                max_ast_depth=max_ast_depth,
+                limit_policy=limit_policy,
+                max_memory_mb=max_memory_mb,
+            )
+        except ArchiveScanError as exc:
+            raise BanditError(str(exc)) from exc
+    elif workers and target.is_dir():
+        try:
+            data, skipped = scan_sharded(
+                str(target),
+                workers,
+                scan_timeout=scan_timeout,
+                file_timeout=file_timeout,
+                max_file_size=max_file_size,
+                max_ast_depth=max_ast_depth,
+                limit_policy=limit_policy,
+                max_memory_mb=max_memory_mb,
+            )
+        except ShardScanError as exc:
+            raise BanditError(str(exc)) from exc
     else:
-        cmd = ["bandit", str(target), "-f", "json"]
-
-    try:
-        completed = subprocess.run(
-            cmd,
-            check=False,
-            capture_output=True,
-            text=True,
+        data, skipped = _scan_path(
+            target,
+            scan_timeout,
+            file_timeout,
+            max_file_size,
+            max_ast_depth,
+            limit_policy,
+            max_memory_mb,
+            cache_files,
         )
-    except FileNotFoundError as exc:
-        # bandit CLI not installed or not on PATH
-        raise BanditError(
-            "Bandit executable not found. "
-            "Make sure 'bandit' is installed in this virtual environment."
-        ) from exc
-
-    # Bandit exits with code 1 when issues are found, and 0 when none are found.
-    # Codes > 1 indicate an error. 
-    if completed.returncode not in (0, 1):
-        raise BanditError(
-            f"Bandit failed with exit code {completed.returncode}: "
-            f"{completed.stderr.strip()}"
-        )
-
-    try:
-        data = json.loads(completed.stdout)
-    except json.JSONDecodeError as exc:
-        raise BanditError("Failed to parse Bandit JSON output.") from exc
 
     # Example JSON shape from the official docs: metrics._totals and results[]. 
     metrics = data.get("metrics", {})
@@ -141,13 +416,104 @@ def run_bandit(
         "summary": summary,
         "results": compact_results,
         "errors": errors,
+        "skipped": skipped,
         "generated_at": generated_at,
+        "severity_filter": severity_filter_normalized,
     }
 
+def _scan_content(content: str, name: str) -> Dict[str, Any]:
+    """run_bandit on content written to a temporary file named `name`."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp_file = Path(tmpdir) / name
+        tmp_file.write_text(content, encoding="utf-8")
+        return run_bandit(path=str(tmp_file), cache_files=False)
+
+
+def _complete(scan: Dict[str, Any]) -> bool:
+    return not scan.get("errors") and not scan.get("skipped")
+
+
+def _cached_scan(file_path: str) -> Dict[str, Any]:
+    """
+    Unfiltered run_bandit result of file_path, reused while its content
+    (hashed) is unchanged. Incomplete scans are not cached.
+    """
+    key = (str(Path(file_path).resolve()), file_digest(file_path))
+    with _scan_cache_lock:
+        if key in _scan_cache:
+            _scan_cache.move_to_end(key)
+            return _scan_cache[key]
+    scan = run_bandit(path=file_path)
+    if _complete(scan):
+        with _scan_cache_lock:
+            _scan_cache[key] = scan
+            while len(_scan_cache) > SCAN_CACHE_SIZE:
+                _scan_cache.popitem(last=False)
+    return scan
+
+
+def _severity_summary(results: List[Dict[str, Any]]) -> Dict[str, int]:
+    summary = {f"SEVERITY.{level}": 0 for level in ("UNDEFINED", "LOW", "MEDIUM", "HIGH")}
+    for issue in results:
+        key = f"SEVERITY.{issue.get('issue_severity')}"
+        summary[key] = summary.get(key, 0) + 1
+    return summary
+
+
+def _finding_key(issue: Dict[str, Any]) -> Tuple[int, str, str, str]:
+    return (
+        int(issue.get("line_number") or 0),
+        str(issue.get("test_id")),
+        str(issue.get("issue_severity")),
+        str(issue.get("issue_text")),
+    )
+
+
+def _patched_scan(
+    file_path: str,
+    original_content: str,
+    original: Dict[str, Any],
+    patched_content: str,
+    incremental: bool,
+    verify: bool,
+) -> Tuple[Dict[str, int], List[Dict[str, Any]], Dict[str, Any]]:
+    """Summary, unfiltered findings and rescan info of the patched content."""
+    name = Path(file_path).name
+    outcome = None
+    if incremental and _complete(original):
+
+        def scan_source(source: str) -> Optional[List[Dict[str, Any]]]:
+            scan = _scan_content(source, name)
+            return scan["results"] if _complete(scan) else None
+
+        outcome = incremental_rescan(
+            original_content, patched_content, original["results"], scan_source
+        )
+
+    if outcome is None:
+        patched = _scan_content(patched_content, name)
+        return patched.get("summary", {}), patched.get("results", []), {"mode": "full"}
+
+    results, info = outcome
+    info = dict(info, mode="incremental")
+    if verify:
+        full = _scan_content(patched_content, name)
+        info["verified"] = sorted(map(_finding_key, results)) == sorted(
+            map(_finding_key, full.get("results", []))
+        )
+        if not info["verified"]:
+            # Trust the full rescan and keep the mismatch visible.
+            info["mode"] = "full"
+            return full.get("summary", {}), full.get("results", []), info
+    return _severity_summary(results), results, info
+
+
 def evaluate_patch(
     file_path: str,
     patched_content: str,
     severity_filter: Optional[str] = None,
+    incremental: bool = True,
+    verify: Optional[bool] = None,
 ) -> Dict[str, Any]:
     """
     Evaluate a patch by comparing Bandit results before and after.
@@ -161,6 +527,17 @@ def evaluate_patch(
     severity_filter:
         Optional severity filter ('LOW', 'MEDIUM', 'HIGH') passed through to
         run_bandit for both before and after scans.
+    incremental:
+        Only re-analyze the top-level definitions the patch changed and reuse
+        the original findings for the rest (see
+        incremental.incremental_rescan). The original scan is cached by
+        content hash, so repeated evaluations of the same file run Bandit
+        once each, on a mostly blanked copy.
+    verify:
+        Also run a full rescan of the patched content and compare. On a
+        mismatch the full rescan wins and the 'rescan' info says
+        "verified": false. Defaults to the STATICGUARD_VERIFY_INCREMENTAL
+        environment variable.
 
     Returns
     -------
@@ -172,30 +549,78 @@ def evaluate_patch(
           "delta": {                    # patched - original per severity key
              "SEVERITY.HIGH": -1,
              ...
+          },
+          "test_id_delta": {            # patched - original per test_id
+             "B602": -1,
+             ...
+          },
+          "rescan": {                   # how the patched content was scanned
+             "mode": "incremental",     # or "full"
+             "reanalyzed": ["backup"],
+             "reused_findings": 3
           }
         }
 
+    Patched content that does not compile is rejected without running
+    Bandit: the result then only has "original_path", "error" and
+    "syntax_error" (see patches.check_syntax).
+
     Notes
     -----
     This function does not execute the target program. It only runs Bandit on
     the original file path and on a temporary file containing the patched
     content.
     """
+    if verify is None:
+        verify = os.environ.get(VERIFY_INCREMENTAL_ENV, "").lower() in ("1", "true", "yes")
+    severity_filter_normalized = severity_filter.upper() if severity_filter else None
 
-    # 1. Bandit on original file
-    original = run_bandit(path=file_path, severity_filter=severity_filter)
-    original_summary = original.get("summary", {})
+    # 0. Reject patched content that does not compile before any Bandit run
+    syntax_error = check_syntax(patched_content, file_path)
+    if syntax_error is not None:
+        return {
+            "original_path": str(Path(file_path)),
+            "error": describe_syntax_error(syntax_error),
+            "syntax_error": syntax_error,
+        }
 
-    # 2. Write patched content to a temporary file and run Bandit again
-    original_path = Path(file_path)
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_file = Path(tmpdir) / original_path.name
-        tmp_file.write_text(patched_content, encoding="utf-8")
+    # 1. Bandit on the original file (cached while its content is unchanged)
+    original_content = load_file(file_path)
+    original = _cached_scan(file_path)
 
-        patched = run_bandit(path=str(tmp_file), severity_filter=severity_filter)
-        patched_summary = patched.get("summary", {})
+    # 2. Bandit on the patched content, incrementally where possible
+    patched_summary, patched_results, rescan = _patched_scan(
+        file_path, original_content, original, patched_content, incremental, verify
+    )
 
-    # 3. Compute delta: patched - original per severity key
+    def _filtered(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            r
+            for r in results
+            if severity_filter_normalized is None
+            or r.get("issue_severity") == severity_filter_normalized
+        ]
+
+    evaluation = _compare_scans(
+        str(Path(file_path)),
+        original.get("summary", {}),
+        patched_summary,
+        _filtered(original.get("results", [])),
+        _filtered(patched_results),
+    )
+    evaluation["rescan"] = rescan
+    return evaluation
+
+
+def _compare_scans(
+    original_path: str,
+    original_summary: Dict[str, int],
+    patched_summary: Dict[str, int],
+    original_results: List[Dict[str, Any]],
+    patched_results: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Build an evaluate_patch result from the before and after scans."""
+    # Delta: patched - original per severity key
     all_keys = set(original_summary.keys()) | set(patched_summary.keys())
     delta: Dict[str, int] = {}
     for key in all_keys:
@@ -203,9 +628,140 @@ def evaluate_patch(
         after = int(patched_summary.get(key, 0))
         delta[key] = after - before
 
+    # Per test_id delta, so callers can tell which findings went away
+    before_ids = Counter(r.get("test_id") for r in original_results)
+    after_ids = Counter(r.get("test_id") for r in patched_results)
+    test_id_delta: Dict[str, int] = {}
+    for test_id in set(before_ids) | set(after_ids):
+        if test_id:
+            test_id_delta[test_id] = after_ids[test_id] - before_ids[test_id]
+
     return {
-        "original_path": str(original_path),
+        "original_path": original_path,
         "original_summary": original_summary,
         "patched_summary": patched_summary,
         "delta": delta,
-    }
\ No newline at end of file
+        "test_id_delta": test_id_delta,
+    }
+
+
+def evaluate_patches(
+    patches: Dict[str, str],
+    severity_filter: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Evaluate patches to many files with a single Bandit run.
+
+    The originals and patched versions are copied side by side into one
+    temporary tree and scanned together, instead of two Bandit runs per
+    file as with evaluate_patch.
+
+    Parameters
+    ----------
+    patches:
+        Mapping of original file path to the full patched content.
+    severity_filter:
+        Same as for evaluate_patch.
+
+    Returns
+    -------
+    dict
+        Mapping of each original file path to an evaluate_patch result. A
+        file that could not be fully scanned, or whose patched content does
+        not compile, gets an 'error' field instead.
+    """
+    severity_filter_normalized = severity_filter.upper() if severity_filter else None
+    evaluations: Dict[str, Dict[str, Any]] = {}
+    for file_path, content in patches.items():
+        syntax_error = check_syntax(content, file_path)
+        if syntax_error is not None:
+            evaluations[file_path] = {
+                "original_path": file_path,
+                "error": describe_syntax_error(syntax_error),
+                "syntax_error": syntax_error,
+            }
+    paths = [file_path for file_path in patches if file_path not in evaluations]
+    if not paths:
+        return evaluations
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        copies: Dict[str, Tuple[int, str]] = {}
+        for i, file_path in enumerate(paths):
+            name = Path(file_path).name
+            for side, content in (
+                ("before", load_file(file_path)),
+                ("after", patches[file_path]),
+            ):
+                copy = Path(tmpdir) / side / str(i) / name
+                copy.parent.mkdir(parents=True)
+                copy.write_text(content, encoding="utf-8")
+                copies[str(copy)] = (i, side)
+
+        scan = run_bandit(path=tmpdir, cache_files=False)
+
+        def _side(filename: str) -> Optional[Tuple[int, str]]:
+            return copies.get(str(Path(filename)))
+
+        levels = ("UNDEFINED", "LOW", "MEDIUM", "HIGH")
+        summaries = {
+            key: {f"SEVERITY.{level}": 0 for level in levels} for key in copies.values()
+        }
+        results: Dict[Tuple[int, str], List[Dict[str, Any]]] = {
+            key: [] for key in copies.values()
+        }
+        for issue in scan["results"]:
+            key = _side(issue["filename"])
+            if key is None:
+                continue
+            sev_key = f"SEVERITY.{issue.get('issue_severity')}"
+            summaries[key][sev_key] = summaries[key].get(sev_key, 0) + 1
+            if (
+                severity_filter_normalized is None
+                or issue.get("issue_severity") == severity_filter_normalized
+            ):
+                results[key].append(issue)
+
+        incomplete: Dict[int, str] = {}
+        for entry in scan["skipped"]:
+            key = _side(entry["filename"])
+            if key is not None:
+                incomplete[key[0]] = f"{key[1]} scan incomplete: {entry['reason']}"
+        for error in scan["errors"]:
+            key = _side(str(error.get("filename")))
+            if key is not None:
+                incomplete[key[0]] = f"{key[1]} scan failed: {error.get('reason')}"
+
+    for i, file_path in enumerate(paths):
+        if i in incomplete:
+            evaluations[file_path] = {"original_path": file_path, "error": incomplete[i]}
+            continue
+        evaluations[file_path] = _compare_scans(
+            file_path,
+            summaries[(i, "before")],
+            summaries[(i, "after")],
+            results[(i, "before")],
+            results[(i, "after")],
+        )
+    return {file_path: evaluations[file_path] for file_path in patches}
+
+
+def patch_accepted(
+    eval_result: Dict[str, Any],
+    test_id: Optional[str] = None,
+) -> bool:
+    """
+    Decide whether an evaluate_patch result counts as an accepted patch.
+
+    A patch is accepted when it does not add HIGH findings and either removes
+    a finding of the targeted test_id (when known and a per test_id delta is
+    available) or lowers the total number of findings.
+    """
+    if not eval_result or eval_result.get("error"):
+        return False
+    delta = eval_result.get("delta") or {}
+    if int(delta.get("SEVERITY.HIGH", 0) or 0) > 0:
+        return False
+    test_id_delta = eval_result.get("test_id_delta")
+    if test_id and test_id_delta is not None:
+        return int(test_id_delta.get(test_id.upper(), 0) or 0) < 0
+    return sum(int(v or 0) for k, v in delta.items() if k.startswith("SEVERITY.")) < 0
\ No newline at end of file
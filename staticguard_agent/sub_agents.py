@@ -1,12 +1,57 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
-
-from google.adk.agents.llm_agent import Agent
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 from .sglib.tools import run_bandit, evaluate_patch, load_file, BanditError
 from .sglib.reporting import build_markdown_report
+from .sglib.history import RunHistory
+from .sglib.findings_store import FindingsStore
 from .sglib.save_report import save_report
+from .sglib.files import read_lines
+from .sglib.patches import prepare_patch, unified_diff
+from .sglib.clustering import (
+    build_fix_template,
+    cluster_findings,
+    combine_evaluations,
+    fix_cluster,
+)
+from .sglib.speculative import (
+    build_patch_prompt,
+    extract_code,
+    first_acceptable_patch,
+    strategy_for,
+)
+
+if TYPE_CHECKING:
+    from google.adk.agents.llm_agent import Agent
+
+
+def record_scan(result: Dict[str, Any]) -> None:
+    """
+    Append a run_bandit result to the findings store. Recording is best
+    effort: a locked or unwritable database must not fail the scan itself.
+    """
+    try:
+        FindingsStore().record_scan(result)
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def record_patch_eval(
+    eval_result: Dict[str, Any],
+    test_id: Optional[str],
+    accepted: Optional[bool] = None,
+) -> None:
+    """Append an evaluate_patch result to the findings store (best effort)."""
+    try:
+        FindingsStore().record_patch_eval(
+            eval_result, test_id=test_id, accepted=accepted
+        )
+    except (sqlite3.Error, OSError):
+        pass
 
 
 def scan_repo(path: str, severity_filter: Optional[str] = None) -> Dict[str, Any]:
@@ -15,7 +60,7 @@ def scan_repo(path: str, severity_filter: Optional[str] = None) -> Dict[str, Any
     Returns an 'error' field instead of raising on failure.
     """
     try:
-        return run_bandit(path=path, severity_filter=severity_filter)
+        result = run_bandit(path=path, severity_filter=severity_filter)
     except BanditError as e:
         return {
             "path": path,
@@ -23,74 +68,305 @@ def scan_repo(path: str, severity_filter: Optional[str] = None) -> Dict[str, Any
             "summary": {},
             "results": [],
         }
+    record_scan(result)
+    return result
 
 
 def evaluate_patch_tool(
     file_path: str,
     patched_content: str,
     severity_filter: Optional[str] = None,
+    test_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Shared tool wrapper for patch evaluation, for use by the fixer agent.
+    test_id is the Bandit test_id of the finding the patch targets.
     """
-    return evaluate_patch(
+    result = evaluate_patch(
         file_path=file_path,
         patched_content=patched_content,
         severity_filter=severity_filter,
     )
+    record_patch_eval(result, test_id)
+    return result
 
 
-def load_file_tool(path: str) -> str:
+def cluster_findings_tool(
+    path: str,
+    severity_filter: Optional[str] = None,
+) -> Dict[str, Any]:
     """
-    Wrapper around load_file for use as an ADK tool.
+    Tool: Scan a path and group the findings into clusters of the same
+    Bandit test_id and code shape, largest first. One accepted fix for a
+    cluster can be reused for all its members with apply_fix_template_tool.
     """
+    result = scan_repo(path=path, severity_filter=severity_filter)
+    if result.get("error"):
+        return result
+    clusters = cluster_findings(result["results"])
+    return {
+        "path": result["path"],
+        "summary": result["summary"],
+        "skipped": result.get("skipped", []),
+        "clusters": [
+            {
+                "cluster_id": c["cluster_id"],
+                "test_id": c["test_id"],
+                "size": len(c["members"]),
+                "example": c["members"][0],
+                "locations": [
+                    {"filename": m["filename"], "line_number": m["line_number"]}
+                    for m in c["members"]
+                ],
+            }
+            for c in clusters
+        ],
+    }
+
+
+def apply_fix_template_tool(
+    path: str,
+    file_path: str,
+    line_number: int,
+    test_id: str,
+    patched_content: str,
+) -> Dict[str, Any]:
+    """
+    Tool: Reuse an accepted fix for one finding on every other finding of its
+    cluster under path, and evaluate all the patched files in one Bandit run.
+
+    file_path, line_number and test_id identify the fixed finding and
+    patched_content is the full accepted patched file. Findings the fix does
+    not fit are returned under 'unfixed'.
+    """
+    try:
+        result = run_bandit(path=path)
+    except BanditError as e:
+        return {"path": path, "error": str(e)}
+
+    target = Path(file_path).resolve()
+    test_id = test_id.upper()
+    clusters = cluster_findings(result["results"])
+    for cluster in clusters:
+        exemplar = next(
+            (
+                m
+                for m in cluster["members"]
+                if m["test_id"] == test_id
+                and m["line_number"] == line_number
+                and Path(str(m["filename"])).resolve() == target
+            ),
+            None,
+        )
+        if exemplar is not None:
+            break
+    else:
+        return {
+            "path": path,
+            "error": f"No {test_id} finding at {file_path}:{line_number} in {path}.",
+        }
+
+    template = build_fix_template(exemplar, load_file(file_path), patched_content)
+    if template is None:
+        return {"path": path, "error": "Could not derive a fix template from the patch."}
+
+    # The fixed file is already evaluated unless other members live in it;
+    # then the template is applied to all of them, the fixed one included.
+    others = [m for m in cluster["members"] if m is not exemplar]
+    if not any(m["filename"] == exemplar["filename"] for m in others):
+        cluster = dict(cluster, members=others)
+
+    outcome = fix_cluster(cluster, template)
+    # One template application is one patch attempt, however many files it
+    # touched, so it does not outweigh single-file fixes in the rollup.
+    combined = combine_evaluations(path, outcome)
+    if combined is not None:
+        record_patch_eval(combined, test_id, accepted=combined["accepted"])
+    return {
+        "path": path,
+        "cluster_id": outcome["cluster_id"],
+        "test_id": outcome["test_id"],
+        "files": [
+            {
+                "path": entry["path"],
+                "accepted": entry["accepted"],
+                "fixed": len(entry["findings"]),
+                "delta": entry["eval_result"].get("delta"),
+                "error": entry["eval_result"].get("error"),
+                "diff": entry["diff"],
+            }
+            for entry in outcome["files"]
+        ],
+        "unfixed": outcome["unfixed"],
+    }
+
+
+def load_file_tool(
+    path: str,
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None,
+) -> str:
+    """
+    Wrapper around load_file for use as an ADK tool. With start_line (and
+    optionally end_line, both 1-based and inclusive) only those lines are
+    returned, which also works for files too large to load in full.
+    """
+    if start_line is not None:
+        return read_lines(path, start_line, end_line)
     return load_file(path)
 
 
-scanner_agent = Agent(
-    model="gemini-2.5-flash",
-    name="scanner_agent",
-    description="StaticGuard scanner that triages Bandit findings.",
-    instruction=(
-        "You are a static analysis triage assistant.\n"
-        "When the user (coordinator agent) asks you to analyze a Python "
-        "repository or file path, do the following:\n"
-        "1) Call the scan_repo tool on the given path (optionally filtering "
-        "for HIGH severity).\n"
-        "2) Inspect the Bandit results and choose exactly ONE high severity "
-        "finding to focus on. If there is no HIGH severity issue, choose one "
-        "MEDIUM severity finding.\n"
-        "3) Return a concise textual 'task' description for a fixer agent, "
-        "including:\n"
-        "   - file path\n"
-        "   - line number\n"
-        "   - severity\n"
-        "   - Bandit test_id\n"
-        "   - short issue summary\n"
-        "Do NOT propose code changes yourself. Your sole job is to select and "
-        "describe a single issue.\n"
-        "If the scan_repo tool response contains an 'error' field, do not try to pick a finding; instead, explain the error to the caller.\n"
-    ),
-    tools=[scan_repo],
-)
+@lru_cache(maxsize=None)
+def build_scanner_agent() -> "Agent":
+    """
+    Build the scanner agent on first use, so importing the tools does not
+    load ADK.
+    """
+    from google.adk.agents.llm_agent import Agent
+
+    return Agent(
+        model="gemini-2.5-flash",
+        name="scanner_agent",
+        description="StaticGuard scanner that triages Bandit findings.",
+        instruction=(
+            "You are a static analysis triage assistant.\n"
+            "When the user (coordinator agent) asks you to analyze a Python "
+            "repository or file path, do the following:\n"
+            "1) Call the cluster_findings_tool on the given path (optionally "
+            "filtering for HIGH severity). It scans the path and groups repeated "
+            "findings into clusters.\n"
+            "2) Inspect the clusters and choose exactly ONE high severity "
+            "finding to focus on, preferring the example of the largest cluster. "
+            "If there is no HIGH severity issue, choose one MEDIUM severity "
+            "finding.\n"
+            "3) Return a concise textual 'task' description for a fixer agent, "
+            "including:\n"
+            "   - file path\n"
+            "   - line number\n"
+            "   - severity\n"
+            "   - Bandit test_id\n"
+            "   - short issue summary\n"
+            "   - the scanned path and the size of the finding's cluster\n"
+            "Do NOT propose code changes yourself. Your sole job is to select and "
+            "describe a single issue.\n"
+            "If the tool response contains an 'error' field, do not try to pick a finding; instead, explain the error to the caller.\n"
+        ),
+        tools=[cluster_findings_tool, scan_repo],
+    )
+
+
+def check_patch_tool(file_path: str, patched_content: str) -> Dict[str, Any]:
+    """
+    Tool: Check that the full patched content compiles and compute its
+    unified diff against the original file, without running Bandit.
+    A syntax error comes with its line and column.
+    """
+    return prepare_patch(load_file(file_path), patched_content, file_path)
 
 
 def build_report_tool(
     path: str,
     eval_result: Dict[str, Any],
-    diff: str,
     conclusion: str,
+    patched_content: Optional[str] = None,
+    diff: str = "",
+    test_id: Optional[str] = None,
+    severity: Optional[str] = None,
 ) -> str:
     """
     Wrapper around build_markdown_report so the fixer agent can produce a
-    clean markdown report string.
+    clean markdown report string. When patched_content is given, the diff
+    is computed from the original file instead of taken from diff.
     """
+    if patched_content is not None:
+        diff = unified_diff(load_file(path), patched_content, path)
     return build_markdown_report(
         path=path,
         eval_result=eval_result,
         diff=diff,
         conclusion=conclusion,
+        test_id=test_id,
+        severity=severity,
+    )
+
+
+def previous_fixes_tool(
+    path: str,
+    test_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Tool: Look up patches that were accepted in earlier runs for a file,
+    optionally restricted to one Bandit test_id.
+    """
+    fixes = RunHistory().previous_fixes(path=path, test_id=test_id)
+    return {
+        "path": path,
+        "fixes": [
+            {
+                "timestamp_utc": fix["timestamp_utc"],
+                "test_id": fix["test_id"],
+                "severity": fix["severity"],
+                "diff": fix["diff"],
+            }
+            for fix in fixes
+        ],
+    }
+
+
+async def speculative_fix_tool(
+    file_path: str,
+    test_id: str,
+    severity: str,
+    line_number: int,
+    issue_text: str,
+    candidates: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Tool: Ask the model for several candidate patches at once and return the
+    first one that removes the finding without adding HIGH findings.
+
+    Candidates use different temperatures and fix strategies. At most
+    STATICGUARD_MAX_PARALLEL_MODEL_CALLS model calls run at the same time;
+    candidates defaults to STATICGUARD_PATCH_CANDIDATES.
+    """
+    from google import genai
+    from google.genai import types
+
+    source = load_file(file_path)
+    finding = {
+        "line_number": line_number,
+        "issue_severity": severity,
+        "test_id": test_id,
+        "issue_text": issue_text,
+    }
+
+    async def generate(index: int) -> str:
+        strategy = strategy_for(index)
+        # Created per candidate, so client errors (missing credentials, ...)
+        # fail that candidate like quota or network errors do.
+        client = genai.Client()
+        response = await client.aio.models.generate_content(
+            model="gemini-2.5-flash",
+            contents=build_patch_prompt(source, file_path, finding, strategy),
+            config=types.GenerateContentConfig(temperature=strategy["temperature"]),
+        )
+        return extract_code(response.text or "")
+
+    # Candidates are evaluated without recording them: only the accepted
+    # patch counts as an attempt in the findings store, the losers do not.
+    result = await first_acceptable_patch(
+        generate,
+        lambda content: evaluate_patch(file_path=file_path, patched_content=content),
+        test_id=test_id,
+        candidates=candidates,
     )
+    if result["accepted"]:
+        record_patch_eval(result["eval_result"], test_id)
+    result["path"] = file_path
+    result["diff"] = ""
+    if result["patched_content"] is not None:
+        result["diff"] = unified_diff(source, result["patched_content"], file_path)
+    return result
 
 
 def save_report_tool(path: str, report: str) -> str:
@@ -100,41 +376,85 @@ def save_report_tool(path: str, report: str) -> str:
     return save_report(path=path, report=report)
 
 
-fixer_agent = Agent(
-    model="gemini-2.5-flash",
-    name="fixer_agent",
-    description="StaticGuard fixer that proposes minimal patches and evaluates them.",
-    instruction=(
-        "You are a patching assistant for static security issues.\n"
-        "You will receive a description of ONE Bandit finding (file path, line "
-        "number, severity, test_id, and issue summary) plus any extra code "
-        "context that the coordinator agent provides.\n\n"
-        "Your job:\n"
-        "1) Use the load_file_tool to load the full original file content if "
-        "it is not already provided.\n"
-        "2) Propose a MINIMAL patch that fixes the issue. Only modify the "
-        "function or very small region that contains the problem. Avoid "
-        "refactoring unrelated code.\n"
-        "3) Produce:\n"
-        "   a) The FULL patched file content.\n"
-        "   b) A unified diff between the original and patched code.\n"
-        "4) Call evaluate_patch_tool with the original file path and the FULL "
-        "patched content to compute Bandit metrics before and after.\n"
-        "5) Based on the evaluation result, decide honestly whether the patch "
-        "improves, worsens, or does not change the static findings. If the "
-        "patch increases high severity issues or introduces serious new "
-        "problems, clearly say that it is NOT acceptable.\n"
-        "6) Finally, call build_report_tool with:\n"
-        "   - path: the original file path\n"
-        "   - eval_result: the full object returned by evaluate_patch_tool\n"
-        "   - diff: your unified diff\n"
-        "   - conclusion: a short, clear natural language conclusion about "
-        "     whether the patch should be accepted.\n"
-        "Return ONLY the markdown string from build_report_tool as your final "
-        "answer for this request.\n\n"
-        "If the issue is too complex or risky to auto-fix safely, or the "
-        "metrics show that the patch makes things worse, clearly state that "
-        "the patch is not successful and explain why in the conclusion."
-    ),
-    tools=[load_file_tool, evaluate_patch_tool, build_report_tool, save_report_tool],
-)
+@lru_cache(maxsize=None)
+def build_fixer_agent() -> "Agent":
+    """
+    Build the fixer agent on first use (see build_scanner_agent).
+    """
+    from google.adk.agents.llm_agent import Agent
+
+    return Agent(
+        model="gemini-2.5-flash",
+        name="fixer_agent",
+        description="StaticGuard fixer that proposes minimal patches and evaluates them.",
+        instruction=(
+            "You are a patching assistant for static security issues.\n"
+            "You will receive a description of ONE Bandit finding (file path, line "
+            "number, severity, test_id, and issue summary) plus any extra code "
+            "context that the coordinator agent provides.\n\n"
+            "Your job:\n"
+            "0) Call previous_fixes_tool with the file path and test_id. If an "
+            "earlier accepted patch for the same finding still applies, reuse it "
+            "instead of writing a new one.\n"
+            "1) Use the load_file_tool to load the full original file content if "
+            "it is not already provided. If the file is too large to load, "
+            "load the lines around the finding with start_line and end_line.\n"
+            "2) Call speculative_fix_tool with the file path, test_id, severity, "
+            "line number and issue summary. If it returns accepted=true, use its "
+            "patched_content, diff and eval_result and go straight to step 5. "
+            "Otherwise, propose a MINIMAL patch that fixes the issue yourself. "
+            "Only modify the function or very small region that contains the "
+            "problem. Avoid refactoring unrelated code.\n"
+            "3) Produce the FULL patched file content (not a diff) and call "
+            "check_patch_tool with the file path and that content. If it "
+            "reports a syntax_error, correct the content at the reported line "
+            "and column and check again; never evaluate content that does not "
+            "compile.\n"
+            "4) Call evaluate_patch_tool with the original file path, the FULL "
+            "patched content and the test_id of the finding to compute Bandit "
+            "metrics before and after.\n"
+            "5) Based on the evaluation result, decide honestly whether the patch "
+            "improves, worsens, or does not change the static findings. If the "
+            "patch increases high severity issues or introduces serious new "
+            "problems, clearly say that it is NOT acceptable.\n"
+            "5b) If the patch is acceptable and the finding's cluster has more "
+            "than one member, call apply_fix_template_tool with the scanned "
+            "path, the file path, line number, test_id and the FULL patched "
+            "content. Mention in the conclusion how many other findings it "
+            "fixed and include its diffs after yours.\n"
+            "6) Finally, call build_report_tool with:\n"
+            "   - path: the original file path\n"
+            "   - eval_result: the full object returned by evaluate_patch_tool, "
+            "     or the eval_result of speculative_fix_tool if you used its patch\n"
+            "   - patched_content: the FULL patched content (the diff is "
+            "     computed from it)\n"
+            "   - conclusion: a short, clear natural language conclusion about "
+            "     whether the patch should be accepted.\n"
+            "   - test_id and severity: the Bandit test_id and severity of the "
+            "     finding you fixed.\n"
+            "Return ONLY the markdown string from build_report_tool as your final "
+            "answer for this request.\n\n"
+            "If the issue is too complex or risky to auto-fix safely, or the "
+            "metrics show that the patch makes things worse, clearly state that "
+            "the patch is not successful and explain why in the conclusion."
+        ),
+        tools=[
+            previous_fixes_tool,
+            load_file_tool,
+            speculative_fix_tool,
+            check_patch_tool,
+            evaluate_patch_tool,
+            apply_fix_template_tool,
+            build_report_tool,
+            save_report_tool,
+        ],
+    )
+
+
+def __getattr__(name: str) -> Any:
+    # scanner_agent and fixer_agent are built on first access.
+    if name == "scanner_agent":
+        return build_scanner_agent()
+    if name == "fixer_agent":
+        return build_fixer_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
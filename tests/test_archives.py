@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import io
+import subprocess
+import sys
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+
+from staticguard_agent.sglib import archives
+from staticguard_agent.sglib.tools import run_bandit
+
+
+VULNERABLE = b"""\
+import subprocess
+
+def bad():
+    cmd = "ls " + input("Enter path: ")
+    subprocess.call(cmd, shell=True)
+"""
+
+
+def test_run_bandit_scans_wheel_members_in_place():
+    """Findings in a wheel carry '<archive>!<member>' filenames."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        wheel = str(Path(tmpdir) / "pkg-1.0-py3-none-any.whl")
+        with zipfile.ZipFile(wheel, "w") as zf:
+            zf.writestr("pkg/__init__.py", "")
+            zf.writestr("pkg/shell.py", VULNERABLE)
+            zf.writestr("pkg/big.py", b"x = 1\n" * 500)
+            zf.writestr("pkg-1.0.dist-info/METADATA", "Name: pkg\n")
+        result = run_bandit(wheel, max_file_size=1000)
+
+    shell_findings = [r for r in result["results"] if r["test_id"] == "B602"]
+    assert [r["filename"] for r in shell_findings] == [f"{wheel}!pkg/shell.py"]
+    assert shell_findings[0]["line_number"] == 5
+    assert result["summary"]["SEVERITY.HIGH"] == 1
+    assert [(s["filename"], s["reason"]) for s in result["skipped"]] == [
+        (f"{wheel}!pkg/big.py", "max_file_size")
+    ]
+
+
+def test_run_bandit_scans_sdist_tarball():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sdist = str(Path(tmpdir) / "pkg-1.0.tar.gz")
+        with tarfile.open(sdist, "w:gz") as tf:
+            info = tarfile.TarInfo("pkg-1.0/pkg/shell.py")
+            info.size = len(VULNERABLE)
+            tf.addfile(info, io.BytesIO(VULNERABLE))
+        result = run_bandit(sdist)
+
+    filenames = {r["filename"] for r in result["results"]}
+    assert filenames == {f"{sdist}!pkg-1.0/pkg/shell.py"}
+
+
+# A worker killed (for example by its memory limit) in the middle of
+# writing its second event.
+KILLED_WORKER = """
+import json, os, signal, sys
+event = {{"type": "member", "filename": {first!r}, "results": [], "errors": []}}
+sys.stdout.write(json.dumps(event) + "\\n")
+sys.stdout.write('{{"type": "member", "filen')
+sys.stdout.flush()
+os.kill(os.getpid(), signal.SIGKILL)
+"""
+
+
+def test_worker_killed_mid_write_reports_pending_members(monkeypatch):
+    real_popen = subprocess.Popen
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        wheel = str(Path(tmpdir) / "pkg-1.0-py3-none-any.whl")
+        with zipfile.ZipFile(wheel, "w") as zf:
+            for name in ("a", "b", "c"):
+                zf.writestr(f"pkg/{name}.py", VULNERABLE)
+
+        script = KILLED_WORKER.format(first=f"{wheel}!pkg/a.py")
+
+        def popen(cmd, **kwargs):
+            return real_popen([sys.executable, "-c", script], **kwargs)
+
+        monkeypatch.setattr(archives.subprocess, "Popen", popen)
+        result = run_bandit(wheel)
+
+    assert result["results"] == []
+    assert [(s["filename"], s["reason"]) for s in result["skipped"]] == [
+        (f"{wheel}!pkg/b.py", "worker_failed"),
+        (f"{wheel}!pkg/c.py", "worker_failed"),
+    ]
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from staticguard_agent.cli import main
+
+
+SHELL_CODE = """\
+import subprocess
+
+
+def run(cmd):
+    subprocess.call(cmd, shell=True)
+"""
+
+
+def test_cli_and_tools_do_not_import_adk():
+    code = (
+        "import sys, staticguard_agent.cli, staticguard_agent.agent; "
+        "print(any(m.startswith(('google.adk', 'google.genai')) for m in sys.modules))"
+    )
+    root = Path(__file__).resolve().parents[1]
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "False"
+
+
+def test_scan_evaluate_and_report(capsys):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        original = Path(tmpdir) / "runner.py"
+        original.write_text(SHELL_CODE, encoding="utf-8")
+        patched = Path(tmpdir) / "patched.txt"
+        patched.write_text(SHELL_CODE.replace("shell=True", "shell=False"), encoding="utf-8")
+
+        assert main(["scan", str(original), "--severity", "HIGH"]) == 1
+        scan = json.loads(capsys.readouterr().out)
+        assert [r["test_id"] for r in scan["results"]] == ["B602"]
+
+        assert main(["evaluate", str(original), str(patched), "--test-id", "B602"]) == 0
+        assert json.loads(capsys.readouterr().out)["accepted"] is True
+
+        base = str(Path(tmpdir) / "out" / "report")
+        assert main(["report", str(original), "--output", base, "--format", "jsonl"]) == 0
+        assert Path(base + ".jsonl").is_file()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+from staticguard_agent.sglib.clustering import (
+    apply_fix_template,
+    build_fix_template,
+    cluster_findings,
+    combine_evaluations,
+    fix_cluster,
+)
+from staticguard_agent.sglib.findings_store import FindingsStore
+from staticguard_agent.sglib.tools import run_bandit
+
+
+RUNNER = """import subprocess
+
+
+def run(cmd):
+    subprocess.call(cmd, shell=True)
+"""
+
+WORKER = """import subprocess
+
+
+class Worker:
+    def go(self, command):
+        if command:
+            subprocess.call(command, shell=True)
+"""
+
+BACKUP = """import subprocess
+
+
+def backup(path):
+    subprocess.call("tar czf /tmp/b.tgz " + path, shell=True)
+"""
+
+
+def _write(tmpdir: str, name: str, source: str) -> str:
+    path = Path(tmpdir) / name
+    path.write_text(source, encoding="utf-8")
+    return str(path)
+
+
+def test_same_shape_findings_share_one_fix():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        runner = _write(tmpdir, "runner.py", RUNNER)
+        worker = _write(tmpdir, "worker.py", WORKER)
+        _write(tmpdir, "backup.py", BACKUP)
+
+        clusters = cluster_findings(run_bandit(tmpdir, severity_filter="HIGH")["results"])
+        sizes = sorted(len(c["members"]) for c in clusters)
+        assert sizes == [1, 2]  # the string concatenation has another shape
+        cluster = next(c for c in clusters if len(c["members"]) == 2)
+
+        exemplar = next(m for m in cluster["members"] if m["filename"] == runner)
+        patched = RUNNER.replace(
+            "subprocess.call(cmd, shell=True)", "subprocess.call(shlex.split(cmd))"
+        ).replace("import subprocess", "import shlex\nimport subprocess")
+        template = build_fix_template(exemplar, RUNNER, patched)
+        assert template["imports"] == ["import shlex"]
+
+        others = [m for m in cluster["members"] if m is not exemplar]
+        outcome = fix_cluster(dict(cluster, members=others), template)
+
+    assert outcome["unfixed"] == []
+    [entry] = outcome["files"]
+    assert entry["path"] == worker
+    assert entry["accepted"] is True
+    assert "subprocess.call(shlex.split(command))" in entry["patched_content"]
+    assert "import shlex\n" in entry["patched_content"]
+
+
+def test_template_does_not_overwrite_different_literals():
+    finding = {"filename": "a.py", "line_number": 1, "test_id": "B602"}
+    original = 'subprocess.call("ls " + d, shell=True)\n'
+    patched = 'subprocess.call(["ls", d])\n'
+    template = build_fix_template(finding, original, patched)
+
+    other = 'subprocess.call("rm " + d, shell=True)\n'
+    _, applied, failed = apply_fix_template(template, other, [finding])
+    assert applied == []
+    assert failed == [finding]
+
+
+def test_template_application_is_recorded_as_one_attempt():
+    def entry(path, high, accepted):
+        eval_result = {
+            "original_path": path,
+            "delta": {"SEVERITY.HIGH": high},
+            "test_id_delta": {"B602": -1},
+        }
+        return {"path": path, "eval_result": eval_result, "accepted": accepted}
+
+    outcome = {
+        "files": [
+            entry("a.py", -1, True),
+            entry("b.py", -1, True),
+            {"path": "c.py", "eval_result": {"error": "boom"}, "accepted": False},
+        ]
+    }
+    combined = combine_evaluations("repo", outcome)
+    assert combined["delta"] == {"SEVERITY.HIGH": -2}
+    assert combined["test_id_delta"] == {"B602": -2}
+    assert combined["files"] == 2 and combined["accepted"] is True
+
+    store = FindingsStore(":memory:")
+    store.record_patch_eval(combined, test_id="B602", accepted=combined["accepted"])
+    assert store.patch_acceptance("B602")[0]["attempts"] == 1
+
+    outcome["files"][1]["accepted"] = False
+    assert combine_evaluations("repo", outcome)["accepted"] is False
+    assert combine_evaluations("repo", {"files": outcome["files"][2:]}) is None
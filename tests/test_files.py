@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from staticguard_agent.sglib import files
+from staticguard_agent.sglib.tools import load_file
+
+
+SOURCE = "import os\n\ndef main():\n    return os.getcwd()\n"
+
+
+def test_read_lines_by_range():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = str(Path(tmpdir) / "mod.py")
+        Path(path).write_text(SOURCE + "print(main())", encoding="utf-8")
+
+        assert files.line_count(path) == 5
+        assert files.read_lines(path, 3, 4) == "def main():\n    return os.getcwd()\n"
+        assert files.read_lines(path, 5) == "print(main())"
+        assert files.read_lines(path, 4, 99) == "    return os.getcwd()\nprint(main())"
+        assert files.read_lines(path, 6) == ""
+        with pytest.raises(ValueError):
+            files.read_lines(path, 0)
+
+
+def test_cache_follows_content_changes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = str(Path(tmpdir) / "mod.py")
+        Path(path).write_text(SOURCE, encoding="utf-8")
+        first = load_file(path)
+        assert load_file(path) is first  # served from the cache
+
+        # Touched but unchanged: same content hash, decoded text reused.
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert load_file(path) is first
+
+        Path(path).write_text(SOURCE.replace("getcwd", "getpid"), encoding="utf-8")
+        assert "getpid" in load_file(path)
+        assert files.read_lines(path, 4) == "    return os.getpid()\n"
+
+
+def test_size_limit_has_clear_error():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = str(Path(tmpdir) / "big.py")
+        Path(path).write_text("x = 1\n" * 1000, encoding="utf-8")
+
+        with pytest.raises(files.FileTooLargeError, match="6000 bytes, the limit is 100"):
+            load_file(path, max_size=100)
+        # Line ranges of large files can still be read.
+        assert files.read_lines(path, 1000) == "x = 1\n"
+
+
+def test_crlf_files_read_with_universal_newlines():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = str(Path(tmpdir) / "dos.py")
+        Path(path).write_bytes(SOURCE.replace("\n", "\r\n").encode("utf-8"))
+
+        assert load_file(path) == SOURCE
+        assert files.read_lines(path, 3, 4) == "def main():\n    return os.getcwd()\n"
+        assert files.line_count(path) == 4
+
+
+def test_reading_a_head_does_not_cache_the_file():
+    files.clear_cache()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = str(Path(tmpdir) / "big.py")
+        Path(path).write_text("x = 1\n" * 1000, encoding="utf-8")
+
+        assert files.read_bytes(path, 12) == b"x = 1\nx = 1\n"
+        assert files._cache == {}
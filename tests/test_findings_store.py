@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+from staticguard_agent.sglib.findings_store import FindingsStore, main
+
+
+def _scan(path: str, findings, severity_filter=None):
+    summary = {"SEVERITY.HIGH": 0, "SEVERITY.MEDIUM": 0, "SEVERITY.LOW": 0}
+    for f in findings:
+        summary[f"SEVERITY.{f['issue_severity']}"] += 1
+    return {
+        "path": path,
+        "summary": summary,
+        "results": findings,
+        "errors": [],
+        "severity_filter": severity_filter,
+    }
+
+
+SHELL = {
+    "filename": "svc/run.py",
+    "line_number": 5,
+    "issue_severity": "HIGH",
+    "issue_text": "subprocess call with shell=True",
+    "test_id": "B602",
+}
+YAML = {
+    "filename": "svc/config.py",
+    "line_number": 9,
+    "issue_severity": "MEDIUM",
+    "issue_text": "Use of unsafe yaml load.",
+    "test_id": "B506",
+}
+
+
+def test_severity_trend_and_time_to_fix():
+    """Daily rollups follow the latest scan and fixed findings get a TTF."""
+    store = FindingsStore(":memory:")
+    store.record_scan(_scan("svc", [SHELL, YAML]), "2025-01-01T08:00:00+00:00")
+    # A filtered scan must not mark the MEDIUM finding as fixed.
+    store.record_scan(_scan("svc", [SHELL], "HIGH"), "2025-01-01T12:00:00+00:00")
+    # Nor must a scan that skipped the file containing it.
+    skipped = dict(
+        _scan("svc", [SHELL]),
+        skipped=[{"filename": "svc/config.py", "reason": "file_timeout"}],
+    )
+    store.record_scan(skipped, "2025-01-02T08:00:00+00:00")
+    # The shell finding moved lines but is the same finding.
+    moved = dict(SHELL, line_number=42)
+    store.record_scan(_scan("svc", [moved]), "2025-01-03T08:00:00+00:00")
+
+    trend = store.severity_trend(path="svc")
+    assert [row["day"] for row in trend] == ["2025-01-01", "2025-01-02", "2025-01-03"]
+    assert trend[0]["scans"] == 2
+    assert trend[2]["SEVERITY.HIGH"] == 1
+    assert trend[2]["SEVERITY.MEDIUM"] == 0
+
+    ttf = store.mean_time_to_fix()
+    assert ttf == [{"test_id": "B506", "fixed": 1, "mean_seconds": 2 * 86400.0}]
+
+
+def test_patch_acceptance_rollup():
+    store = FindingsStore(":memory:")
+    good = {
+        "original_path": "svc/run.py",
+        "delta": {"SEVERITY.HIGH": -1},
+        "test_id_delta": {"B602": -1},
+    }
+    bad = {
+        "original_path": "svc/run.py",
+        "delta": {"SEVERITY.HIGH": 0},
+        "test_id_delta": {"B602": 0},
+    }
+    store.record_patch_eval(good)  # test_id inferred from the delta
+    store.record_patch_eval(bad, test_id="b602")
+    assert store.record_patch_eval({"error": "boom"}) is None
+
+    assert store.patch_acceptance("B602") == [
+        {"test_id": "B602", "attempts": 2, "accepted": 1, "rate": 0.5}
+    ]
+
+
+def test_cli_reads_rollups(capsys):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = str(Path(tmpdir) / "history.db")
+        FindingsStore(db_path).record_scan(
+            _scan("svc", [SHELL]), "2025-01-01T08:00:00+00:00"
+        )
+        assert main(["--db", db_path, "severity", "--since", "2025-01-01"]) == 0
+
+    out = capsys.readouterr().out
+    assert '"day": "2025-01-01"' in out
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+from pathlib import Path
+
+from staticguard_agent.sglib.history import (
+    RunHistory,
+    build_run_summary,
+    default_history_path,
+    use_history_path,
+)
+from staticguard_agent.sglib.reporting import (
+    build_markdown_report,
+    parse_markdown_report,
+)
+
+
+EVAL_RESULT = {
+    "original_summary": {"SEVERITY.HIGH": 1, "SEVERITY.MEDIUM": 0, "SEVERITY.LOW": 1},
+    "patched_summary": {"SEVERITY.HIGH": 0, "SEVERITY.MEDIUM": 0, "SEVERITY.LOW": 1},
+    "delta": {"SEVERITY.HIGH": -1, "SEVERITY.MEDIUM": 0, "SEVERITY.LOW": 0},
+}
+
+DIFF = """\
+--- a/vuln.py
++++ b/vuln.py
+@@ -1 +1 @@
+-subprocess.call(cmd, shell=True)
++subprocess.call(["ls", path])"""
+
+
+def test_parse_markdown_report_round_trip():
+    """parse_markdown_report should recover what build_markdown_report wrote."""
+    report = build_markdown_report(
+        path="vuln.py",
+        eval_result=EVAL_RESULT,
+        diff=DIFF,
+        conclusion="Accept.",
+        test_id="B602",
+        severity="high",
+    )
+
+    parsed = parse_markdown_report(report)
+
+    assert parsed is not None
+    assert parsed["original_summary"] == EVAL_RESULT["original_summary"]
+    assert parsed["patched_summary"] == EVAL_RESULT["patched_summary"]
+    assert parsed["delta"] == EVAL_RESULT["delta"]
+    assert parsed["test_id"] == "B602"
+    assert parsed["severity"] == "HIGH"
+    assert parsed["diff"] == DIFF
+    assert parse_markdown_report("no report here") is None
+
+
+def test_build_run_summary_uses_real_counts():
+    summary = build_run_summary("vuln.py", EVAL_RESULT, test_id="B602")
+
+    assert summary["bandit_findings_before"] == {
+        "total": 2, "high": 1, "medium": 0, "low": 1,
+    }
+    assert summary["bandit_findings_after"]["total"] == 1
+    assert summary["patch_accepted"] is True
+
+    unknown = build_run_summary("vuln.py", None)
+    assert unknown["bandit_findings_before"] is None
+    assert unknown["patch_attempted"] is False
+
+
+def test_run_history_persists_and_finds_previous_fixes():
+    """Runs survive reopening the database and accepted diffs are reusable."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = str(Path(tmpdir) / "history.db")
+
+        history = RunHistory(db_path)
+        history.record_run(
+            build_run_summary("pkg/vuln.py", EVAL_RESULT, "B602", "HIGH", DIFF),
+            session_id="s1",
+        )
+        rejected = dict(
+            EVAL_RESULT,
+            patched_summary=EVAL_RESULT["original_summary"],
+            delta={"SEVERITY.HIGH": 0, "SEVERITY.MEDIUM": 0, "SEVERITY.LOW": 0},
+        )
+        history.record_run(
+            build_run_summary("pkg/vuln.py", rejected, "B602", "HIGH", "bad"),
+            session_id="s2",
+        )
+        history.record_run(
+            build_run_summary("pkg/other.py", EVAL_RESULT, "B506", "MEDIUM", DIFF),
+            session_id="s3",
+        )
+
+        reopened = RunHistory(db_path)
+        assert len(reopened.runs_for_path("pkg/vuln.py")) == 2
+        assert [r["session_id"] for r in reopened.search("b506")] == ["s3"]
+
+        fixes = reopened.previous_fixes(path="pkg/vuln.py", test_id="B602")
+        assert [f["session_id"] for f in fixes] == ["s1"]
+        assert fixes[0]["diff"] == DIFF
+
+
+def test_tools_use_the_history_path_of_their_run():
+    """previous_fixes_tool reads the database of the run that calls it."""
+    from staticguard_agent import sub_agents
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = [str(Path(tmpdir) / f"run{i}.db") for i in range(2)]
+        RunHistory(paths[0]).record_run(
+            build_run_summary("pkg/vuln.py", EVAL_RESULT, "B602", "HIGH", DIFF),
+            session_id="s1",
+        )
+        default = default_history_path()
+
+        async def lookup(db_path):
+            with use_history_path(db_path):
+                await asyncio.sleep(0)  # let the other run set its path
+                return sub_agents.previous_fixes_tool("pkg/vuln.py", "B602")
+
+        async def both():
+            return await asyncio.gather(*(lookup(p) for p in paths))
+
+        first, second = asyncio.run(both())
+        assert [f["diff"] for f in first["fixes"]] == [DIFF]
+        assert second["fixes"] == []
+        assert default_history_path() == default
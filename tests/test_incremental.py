@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+from staticguard_agent.sglib.incremental import incremental_rescan
+from staticguard_agent.sglib.tools import evaluate_patch
+
+
+MODULE = """\
+import pickle
+import subprocess
+
+
+def load(data):
+    return pickle.loads(data)
+
+
+def run(cmd):
+    subprocess.call(cmd, shell=True)
+
+
+def other(cmd):
+    subprocess.call(cmd, shell=True)
+"""
+
+
+def test_incremental_evaluation_matches_full_rescan():
+    patched = MODULE.replace(
+        "def run(cmd):\n    subprocess.call(cmd, shell=True)",
+        "def run(cmd):\n    # keep the argument list\n    subprocess.call(cmd.split())",
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "mod.py"
+        path.write_text(MODULE, encoding="utf-8")
+        full = evaluate_patch(str(path), patched, incremental=False)
+        incremental = evaluate_patch(str(path), patched, verify=True)
+
+    assert full["rescan"] == {"mode": "full"}
+    assert incremental["rescan"]["mode"] == "incremental"
+    assert incremental["rescan"]["reanalyzed"] == ["run"]
+    assert incremental["rescan"]["verified"] is True
+    for key in ("patched_summary", "delta", "test_id_delta"):
+        assert incremental[key] == full[key]
+    assert incremental["test_id_delta"]["B602"] == -1
+
+
+def test_changed_import_reanalyzes_its_users():
+    patched = MODULE.replace("import subprocess\n", "import subprocess as sp\n")
+    scanned = []
+
+    def scan_source(source):
+        scanned.append(source)
+        return []
+
+    _, info = incremental_rescan(MODULE, patched, [], scan_source)
+
+    assert info["reanalyzed"] == ["<line 2>", "run", "other"]
+    # 'load' does not use the changed import, so it is blanked out.
+    assert "pickle.loads" not in scanned[0]
+    assert "import pickle" not in scanned[0]
+    assert scanned[0].count("\n") == patched.count("\n")
+
+
+def test_unparsable_patch_falls_back_to_full_scan():
+    assert incremental_rescan(MODULE, "def broken(:\n", [], lambda source: []) is None
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+from staticguard_agent.sglib import tools
+from staticguard_agent.sglib.patches import check_syntax, prepare_patch
+from staticguard_agent.sglib.reporting import build_markdown_report, parse_markdown_report
+
+
+ORIGINAL = """\
+import subprocess
+
+def bad(cmd):
+    subprocess.call(cmd, shell=True)
+"""
+
+PATCHED = """\
+import subprocess
+
+def bad(cmd):
+    subprocess.call(cmd.split())
+"""
+
+
+def test_check_syntax_reports_location():
+    error = check_syntax("def ok():\n    return 1\n\ndef broken(:\n    pass\n")
+    assert error["type"] == "SyntaxError"
+    assert (error["line"], error["column"]) == (4, 12)
+    assert error["text"] == "def broken(:"
+
+    # Only caught by compiling, not by parsing.
+    assert check_syntax("return 1\n")["message"] == "'return' outside function"
+    assert check_syntax(PATCHED) is None
+
+
+def test_broken_patch_is_rejected_before_bandit(monkeypatch):
+    def no_bandit(*args, **kwargs):
+        raise AssertionError("Bandit must not run for a broken patch")
+
+    monkeypatch.setattr(tools, "run_bandit", no_bandit)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "vuln.py"
+        path.write_text(ORIGINAL, encoding="utf-8")
+        result = tools.evaluate_patch(str(path), PATCHED.replace("split())", "split()"))
+
+    assert "line 4" in result["error"]
+    assert result["syntax_error"]["line"] == 4
+    assert tools.patch_accepted(result, "B602") is False
+
+
+def test_prepared_diff_goes_into_report():
+    prepared = prepare_patch(ORIGINAL, PATCHED, "vuln.py")
+    assert prepared["valid"] and prepared["changed"]
+
+    report = build_markdown_report("vuln.py", {}, prepared["diff"], "Fixed.")
+    parsed = parse_markdown_report(report)
+    assert parsed["diff"] == prepared["diff"].rstrip()
+    assert "-    subprocess.call(cmd, shell=True)" in parsed["diff"]
+
+
+def test_pathological_nesting_is_a_handled_error():
+    chained = "x = " + " + ".join(["1"] * 100_000) + "\n"
+    nested = "x = " + "-" * 200_000 + "1\n"
+    for source in (chained, nested):
+        error = check_syntax(source)
+        assert error is not None
+        assert error["line"] is None
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "vuln.py"
+        path.write_text(ORIGINAL, encoding="utf-8")
+        result = tools.evaluate_patch(str(path), chained)
+    assert "not valid Python" in result["error"]
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from staticguard_agent.sglib.report_writer import FORMATS, ReportWriter, atomic_write_text
+
+
+SCAN = {
+    "path": "svc",
+    "summary": {"SEVERITY.HIGH": 1, "SEVERITY.MEDIUM": 1, "SEVERITY.LOW": 0},
+    "results": [
+        {
+            "filename": "svc/run.py",
+            "line_number": 5,
+            "issue_severity": "HIGH",
+            "issue_text": "subprocess call with shell=True",
+            "test_id": "B602",
+        },
+        {
+            "filename": "svc/config.py",
+            "line_number": 9,
+            "issue_severity": "MEDIUM",
+            "issue_text": "Use of unsafe yaml load.",
+            "test_id": "B506",
+        },
+    ],
+    "errors": [],
+    "skipped": [],
+}
+EVAL = {
+    "original_summary": {"SEVERITY.HIGH": 1},
+    "patched_summary": {"SEVERITY.HIGH": 0},
+    "delta": {"SEVERITY.HIGH": -1},
+    "test_id_delta": {"B602": -1},
+}
+
+
+def test_writes_all_formats_from_one_stream():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base = Path(tmpdir) / "report"
+        with ReportWriter(str(base), formats=FORMATS) as writer:
+            writer.add_scan(SCAN)
+            writer.add_evaluation(
+                "svc/run.py", EVAL, "-shell=True\n+shell=False", "Fixed.", "B602", "HIGH"
+            )
+            # Nothing is visible until the writer is closed.
+            assert sorted(p.name for p in Path(tmpdir).iterdir() if not p.name.startswith(".")) == []
+
+        markdown = (Path(tmpdir) / "report.md").read_text(encoding="utf-8")
+        assert "## Findings in `svc/config.py`" in markdown
+        assert "## StaticGuard evaluation for `svc/run.py`" in markdown
+
+        sarif = json.loads((Path(tmpdir) / "report.sarif").read_text(encoding="utf-8"))
+        run = sarif["runs"][0]
+        assert sarif["version"] == "2.1.0"
+        assert [r["ruleId"] for r in run["results"]] == ["B506", "B602"]
+        assert [r["id"] for r in run["tool"]["driver"]["rules"]] == ["B506", "B602"]
+
+        records = [
+            json.loads(line)
+            for line in (Path(tmpdir) / "report.jsonl").read_text(encoding="utf-8").splitlines()
+        ]
+        assert [r["type"] for r in records] == ["finding", "finding", "scan", "evaluation"]
+        assert records[-1]["accepted"] is True
+        assert [p.name for p in Path(tmpdir).iterdir() if p.name.startswith(".")] == []
+
+
+def test_failed_run_keeps_previous_report():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        target = Path(tmpdir) / "report.md"
+        target.write_text("previous", encoding="utf-8")
+
+        with pytest.raises(RuntimeError):
+            with ReportWriter(str(target)) as writer:
+                writer.add_scan(SCAN)
+                raise RuntimeError("scan crashed")
+
+        assert target.read_text(encoding="utf-8") == "previous"
+        assert [p.name for p in Path(tmpdir).iterdir()] == ["report.md"]
+
+
+def test_reports_keep_normal_file_modes():
+    old_umask = os.umask(0o022)
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            new = Path(tmpdir) / "new.md"
+            atomic_write_text(str(new), "# report\n")
+            assert new.stat().st_mode & 0o777 == 0o644
+
+            existing = Path(tmpdir) / "existing.md"
+            existing.write_text("old\n", encoding="utf-8")
+            existing.chmod(0o664)
+            atomic_write_text(str(existing), "new\n")
+            assert existing.stat().st_mode & 0o777 == 0o664
+
+            with ReportWriter(str(Path(tmpdir) / "run"), formats=FORMATS) as writer:
+                writer.add_findings("a.py", [])
+            for path in writer.close().values():
+                assert Path(path).stat().st_mode & 0o777 == 0o644
+    finally:
+        os.umask(old_umask)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from staticguard_agent.scheduler import Scheduler, run_fix_job
+from staticguard_agent.sglib.history import default_history_path
+from staticguard_agent.sglib.job_queue import JobQueue
+
+
+def _recording_handlers(order, delays=None):
+    running = {"scan": 0, "fix": 0}
+    peak = {"scan": 0, "fix": 0}
+
+    async def handle(job):
+        kind = job["kind"]
+        order.append(job["path"])
+        running[kind] += 1
+        peak[kind] = max(peak[kind], running[kind])
+        await asyncio.sleep((delays or {}).get(job["path"], 0.01))
+        running[kind] -= 1
+        if job["path"] == "broken":
+            raise RuntimeError("bandit crashed")
+        return {"path": job["path"]}
+
+    return {"scan": handle, "fix": handle}, peak
+
+
+def test_priority_then_fair_share_between_tenants():
+    queue = JobQueue(":memory:")
+    for i in range(3):
+        queue.submit(f"a-backfill-{i}", priority="backfill", tenant="team-a")
+    queue.submit("b-backfill", priority="backfill", tenant="team-b")
+    queue.submit("a-pr", priority="pr", tenant="team-a")
+
+    order = []
+    handlers, _ = _recording_handlers(order)
+    asyncio.run(Scheduler(queue, max_bandit_workers=1, handlers=handlers).run())
+
+    # The PR gate job jumps the queue; team-b is not stuck behind team-a's
+    # backlog.
+    assert order == ["a-pr", "b-backfill", "a-backfill-0", "a-backfill-1", "a-backfill-2"]
+    stats = queue.stats()
+    assert stats["queued"] == {"pr": 0, "nightly": 0, "backfill": 0}
+    assert stats["wait_seconds"]["backfill"]["count"] == 4
+
+
+def test_pools_are_bounded_separately_and_failures_recorded():
+    queue = JobQueue(":memory:")
+    queue.submit("slow-fix", kind="fix")
+    for i in range(4):
+        queue.submit(f"scan-{i}")
+    broken = queue.submit("broken")
+
+    order = []
+    handlers, peak = _recording_handlers(order, delays={"slow-fix": 0.2})
+    asyncio.run(
+        Scheduler(
+            queue, max_bandit_workers=2, max_model_calls=1, handlers=handlers
+        ).run()
+    )
+
+    assert peak == {"scan": 2, "fix": 1}
+    # Scans kept running while the fix job held the only model slot.
+    finished = {job["path"]: job["finished_at"] for job in queue.jobs()}
+    assert max(v for k, v in finished.items() if k != "slow-fix") < finished["slow-fix"]
+    job = queue.get(broken)
+    assert job["status"] == "failed"
+    assert "bandit crashed" in job["error"]
+
+
+def test_running_jobs_survive_a_restart():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = str(Path(tmpdir) / "history.db")
+        first = JobQueue(db_path)
+        job_id = first.submit("svc", priority="pr")
+        claimed = first.claim_next(["scan"], owner="dead", lease_seconds=0.05)
+        assert claimed["id"] == job_id  # then the process dies, lease runs out
+        time.sleep(0.1)
+
+        restarted = JobQueue(db_path)
+        assert restarted.stats()["running"] == {"scan": 1}
+        order = []
+        handlers, _ = _recording_handlers(order)
+        asyncio.run(Scheduler(restarted, handlers=handlers).run())
+
+        job = restarted.get(job_id)
+        assert order == ["svc"]
+        assert job["status"] == "done"
+        assert job["attempts"] == 2
+        assert job["result"] == {"path": "svc"}
+
+
+def test_second_scheduler_leaves_live_jobs_alone():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = str(Path(tmpdir) / "history.db")
+        live = JobQueue(db_path)
+        running_id = live.submit("long-scan", tenant="team-a")
+        queued_id = live.submit("next-scan", tenant="team-b")
+        assert live.claim_next(["scan"], owner="live")["id"] == running_id
+
+        order = []
+        handlers, _ = _recording_handlers(order)
+        asyncio.run(Scheduler(JobQueue(db_path), handlers=handlers).run())
+
+        assert order == ["next-scan"]
+        assert live.get(running_id)["status"] == "running"
+        assert live.get(running_id)["attempts"] == 1
+        assert live.get(queued_id)["status"] == "done"
+
+        # A late result from someone who lost the job is ignored.
+        live.complete(running_id, {"late": True}, owner="someone-else")
+        assert live.get(running_id)["status"] == "running"
+        live.complete(running_id, {"ok": True}, owner="live")
+        assert live.get(running_id)["result"] == {"ok": True}
+
+
+def test_jobs_keep_history_in_the_queue_database():
+    """Handlers (and the agent tools they run) see the scheduler's database."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = str(Path(tmpdir) / "history.db")
+        queue = JobQueue(db_path)
+        queue.submit("repo", kind="fix")
+        seen = []
+
+        async def handle(job):
+            seen.append(default_history_path())
+            return {}
+
+        asyncio.run(Scheduler(queue, handlers={"fix": handle}).run())
+
+        assert seen == [db_path]
+        assert default_history_path() != db_path
+
+
+def test_fix_jobs_do_not_block_the_scheduler(monkeypatch):
+    """A fix run blocking longer than the lease keeps its lease and slot."""
+    from staticguard_agent import main_local
+
+    async def blocking_run_once(path, db_path=None, user_id=None):
+        time.sleep(0.6)  # a sync tool running Bandit
+        return {"path": path}
+
+    monkeypatch.setattr(main_local, "run_once", blocking_run_once)
+
+    async def scan(job):
+        return {}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = str(Path(tmpdir) / "history.db")
+        queue = JobQueue(db_path)
+        fix_id = queue.submit("repo", kind="fix")
+        scan_id = queue.submit("svc")
+
+        # Another scheduler looks for expired leases while the fix runs.
+        requeued = []
+        other = threading.Timer(
+            0.4, lambda: requeued.append(JobQueue(db_path).requeue_expired())
+        )
+        other.start()
+        handlers = {"fix": run_fix_job, "scan": scan}
+        asyncio.run(Scheduler(queue, handlers=handlers, lease_seconds=0.15).run())
+        other.join()
+
+        fix = queue.get(fix_id)
+        assert requeued == [0]
+        assert fix["status"] == "done"
+        assert fix["attempts"] == 1
+        assert queue.get(scan_id)["finished_at"] < fix["finished_at"]
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+from pathlib import Path
+
+from staticguard_agent.sglib.sharding import local_worker_command, plan_shards
+from staticguard_agent.sglib.tools import run_bandit
+
+
+SHELL = """import subprocess
+
+def run(cmd):
+    subprocess.call(cmd, shell=True)
+"""
+
+PICKLE = """import pickle
+
+def load(data):
+    return pickle.loads(data)
+"""
+
+
+def _make_repo(tmpdir: str) -> None:
+    for i in range(12):
+        package = Path(tmpdir) / f"pkg{i % 3}"
+        package.mkdir(exist_ok=True)
+        source = SHELL if i % 2 else PICKLE
+        (package / f"mod{i}.py").write_text(source + f"\nVERSION = {i}\n", encoding="utf-8")
+    (Path(tmpdir) / "big.py").write_text("x = 1\n" * 500, encoding="utf-8")
+
+
+def _sorted(results):
+    return sorted(results, key=lambda r: (r["filename"], r["line_number"], r["test_id"]))
+
+
+def test_sharded_scan_matches_single_host_scan():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _make_repo(tmpdir)
+        single = run_bandit(tmpdir, max_file_size=1000)
+        sharded = run_bandit(tmpdir, max_file_size=1000, workers=3)
+
+    assert sharded["summary"] == single["summary"]
+    assert _sorted(sharded["results"]) == _sorted(single["results"])
+    assert len(sharded["results"]) == 24  # import + call finding per module
+    assert [(s["filename"], s["reason"]) for s in sharded["skipped"]] == [
+        (s["filename"], s["reason"]) for s in single["skipped"]
+    ]
+
+
+def test_failed_worker_shards_are_retried_elsewhere():
+    broken = [sys.executable, "-c", "import sys; sys.exit(3)"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _make_repo(tmpdir)
+        single = run_bandit(tmpdir)
+        sharded = run_bandit(tmpdir, workers=[broken, local_worker_command()])
+        dead = run_bandit(tmpdir, workers=[broken])
+
+    assert sharded["summary"] == single["summary"]
+    assert sharded["skipped"] == []
+    assert dead["results"] == []
+    assert {s["reason"] for s in dead["skipped"]} == {"worker_failed"}
+    assert len(dead["skipped"]) == 13
+
+
+def test_shard_assignment_depends_only_on_content():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _make_repo(tmpdir)
+        files = sorted(str(p) for p in Path(tmpdir).rglob("*.py"))
+        first = plan_shards(files, 4)
+        again = plan_shards(list(reversed(files)), 4)
+        fewer = plan_shards(files[1:], 4)
+
+    assert first == again
+    placement = {f["name"]: s["shard_id"] for s in first for f in s["files"]}
+    assert sorted(f["name"] for s in first for f in s["files"]) == files
+    # Removing a file only changes the id of the shard that held it.
+    assert len({s["shard_id"] for s in fewer} & {s["shard_id"] for s in first}) >= len(first) - 1
+
+
+def test_unreadable_file_fails_its_shard_without_hanging(monkeypatch):
+    from staticguard_agent.sglib import sharding
+
+    real_read_bytes = sharding.read_bytes
+
+    def read_bytes(path, limit=None):
+        if path.endswith("mod3.py"):
+            raise PermissionError(13, "Permission denied", path)
+        return real_read_bytes(path, limit)
+
+    monkeypatch.setattr(sharding, "read_bytes", read_bytes)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _make_repo(tmpdir)
+        data, skipped = sharding.scan_sharded(tmpdir, workers=2, scan_timeout=None)
+
+    unreadable = [s for s in skipped if s["reason"] == "read_error"]
+    assert any(s["filename"].endswith("mod3.py") for s in unreadable)
+    assert all(s["reason"] == "read_error" for s in skipped)
+    # Every module is either scanned or reported as skipped, never lost.
+    scanned = {r["filename"] for r in data["results"]}
+    reported = scanned | {s["filename"] for s in unreadable}
+    assert {Path(name).name for name in reported} >= {f"mod{i}.py" for i in range(12)}
+
+
+POISON_WORKER = """
+import json, os, sys
+from staticguard_agent.sglib.sharding import scan_shard
+for line in sys.stdin:
+    if "poison" in line:
+        os._exit(9)  # as if killed by its memory limit
+    sys.stdout.write(json.dumps(scan_shard(json.loads(line))) + "\\n")
+    sys.stdout.flush()
+"""
+
+
+def test_poison_shards_do_not_take_down_the_workers():
+    from staticguard_agent.sglib import sharding
+
+    worker = [sys.executable, "-c", POISON_WORKER]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _make_repo(tmpdir)
+        # Contents chosen so that their shards are the first two handed out,
+        # one to each worker.
+        for i, value in enumerate((2, 10)):
+            (Path(tmpdir) / f"poison{i}.py").write_text(
+                f"POISON = {value}\n", encoding="utf-8"
+            )
+        files = sorted(str(p) for p in Path(tmpdir).rglob("*.py"))
+        poisoned = {
+            f["name"]
+            for shard in plan_shards(files, 8)
+            if any("poison" in f["name"] for f in shard["files"])
+            for f in shard["files"]
+        }
+        data, skipped = sharding.scan_sharded(
+            tmpdir, workers=[worker, worker], num_shards=8, scan_timeout=None
+        )
+
+    assert {s["filename"] for s in skipped} == poisoned
+    assert {s["reason"] for s in skipped} == {"worker_failed"}
+    scanned = {r["filename"] for r in data["results"]}
+    modules = {f for f in files if Path(f).name.startswith("mod")}
+    assert scanned == modules - poisoned
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from staticguard_agent.sglib.speculative import extract_code, first_acceptable_patch
+
+
+GOOD = {"delta": {"SEVERITY.HIGH": -1}, "test_id_delta": {"B602": -1}}
+BAD = {"delta": {"SEVERITY.HIGH": 0}, "test_id_delta": {"B602": 0}}
+
+
+def test_first_acceptable_candidate_wins_and_rest_are_cancelled():
+    in_flight = []
+    peak = []
+    evaluated = []
+    # candidate -> (delay, patched content)
+    plan = {0: (0.05, "bad"), 1: (0.01, "bad"), 2: (0.02, "good"), 3: (5.0, "good")}
+
+    async def generate(index):
+        in_flight.append(index)
+        peak.append(len(in_flight))
+        try:
+            delay, content = plan[index]
+            await asyncio.sleep(delay)
+            return content
+        finally:
+            in_flight.remove(index)
+
+    def evaluate(content):
+        evaluated.append(content)
+        return GOOD if content == "good" else BAD
+
+    result = asyncio.run(
+        first_acceptable_patch(
+            generate, evaluate, test_id="B602", candidates=4, max_parallel_calls=3
+        )
+    )
+
+    assert result["accepted"] is True
+    assert result["candidate"] == 2
+    assert result["patched_content"] == "good"
+    statuses = {a["candidate"]: a["status"] for a in result["attempts"]}
+    assert statuses[1] == "rejected"
+    assert statuses[3] == "cancelled"
+    assert max(peak) <= 3
+    # Identical "bad" candidates are evaluated once.
+    assert evaluated.count("bad") <= 1
+
+
+def test_no_acceptable_candidate():
+    async def generate(index):
+        if index == 0:
+            raise RuntimeError("quota exceeded")
+        return "bad"
+
+    result = asyncio.run(
+        first_acceptable_patch(generate, lambda c: BAD, test_id="B602", candidates=2)
+    )
+    assert result["accepted"] is False
+    assert result["patched_content"] is None
+    assert [a["status"] for a in result["attempts"]] == ["error", "rejected"]
+
+
+def test_no_evaluation_starts_after_the_winner():
+    evaluated = []
+
+    async def generate(index):
+        return f"good{index}"
+
+    def evaluate(content):
+        time.sleep(0.05)
+        evaluated.append(content)
+        return GOOD
+
+    async def run():
+        result = await first_acceptable_patch(
+            generate, evaluate, test_id="B602", candidates=3
+        )
+        await asyncio.sleep(0.2)  # nothing left running in the background
+        return result
+
+    result = asyncio.run(run())
+
+    assert result["accepted"] is True
+    assert evaluated == [result["patched_content"]]
+    assert sorted(a["status"] for a in result["attempts"]) == [
+        "accepted", "cancelled", "cancelled"
+    ]
+
+
+def test_extract_code_from_fenced_reply():
+    assert extract_code("Here:\n```python\nx = 1\n```\n") == "x = 1\n"
+
+
+def test_only_the_winning_candidate_is_recorded(monkeypatch):
+    from google import genai
+
+    from staticguard_agent import sub_agents
+
+    contents = iter(["bad", "good", "bad"])
+
+    class _Models:
+        async def generate_content(self, **kwargs):
+            return type("Response", (), {"text": next(contents)})()
+
+    class _Client:
+        aio = type("Aio", (), {"models": _Models()})()
+
+    recorded = []
+    monkeypatch.setattr(genai, "Client", _Client)
+    monkeypatch.setattr(sub_agents, "load_file", lambda path: "original")
+    monkeypatch.setattr(
+        sub_agents,
+        "evaluate_patch",
+        lambda file_path, patched_content: (
+            GOOD if patched_content.strip() == "good" else BAD
+        ),
+    )
+    monkeypatch.setattr(
+        sub_agents, "record_patch_eval", lambda result, test_id: recorded.append(result)
+    )
+
+    result = asyncio.run(
+        sub_agents.speculative_fix_tool(
+            "app.py", "B602", "HIGH", 3, "shell=True", candidates=3
+        )
+    )
+
+    assert result["accepted"] is True
+    assert recorded == [GOOD]
+
+
+def test_client_errors_fail_candidates_instead_of_escaping(monkeypatch):
+    from google import genai
+
+    from staticguard_agent import sub_agents
+
+    def no_credentials():
+        raise ValueError("Missing key inputs argument")
+
+    monkeypatch.setattr(genai, "Client", no_credentials)
+    monkeypatch.setattr(sub_agents, "load_file", lambda path: "original")
+
+    result = asyncio.run(
+        sub_agents.speculative_fix_tool(
+            "app.py", "B602", "HIGH", 3, "shell=True", candidates=2
+        )
+    )
+
+    assert result["accepted"] is False
+    assert [a["status"] for a in result["attempts"]] == ["error", "error"]
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import subprocess
 import tempfile
+import time
 from pathlib import Path
 
+from staticguard_agent.sglib import files, tools
 from staticguard_agent.sglib.tools import run_bandit, evaluate_patch
 
 
@@ -100,3 +103,96 @@ def bad():
     # The patch should not increase high severity issues, and in
     # realistic cases it should remove the B602 finding.
     assert high_after <= high_before
+
+
+SHELL_CODE = """\
+import subprocess
+
+def bad():
+    cmd = "ls " + input("Enter path: ")
+    subprocess.call(cmd, shell=True)
+"""
+
+
+def test_run_bandit_skips_oversized_file():
+    """Files over max_file_size are reported in 'skipped', not scanned."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write_file(tmpdir, "vuln.py", SHELL_CODE)
+        big = _write_file(tmpdir, "generated.py", "x = 1\n" * 1000)
+        result = run_bandit(tmpdir, max_file_size=1000)
+
+    assert [(s["filename"], s["reason"], s["action"]) for s in result["skipped"]] == [
+        (big, "max_file_size", "skipped")
+    ]
+    assert {r["test_id"] for r in result["results"]} & {"B602", "B605", "B607"}
+
+
+def test_run_bandit_partial_policy_drops_deep_statements():
+    """With the partial policy, only too-deep top-level statements are left out."""
+    deep = "DATA = " + "[" * 40 + "1" + "]" * 40 + "\n"
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = _write_file(tmpdir, "mixed.py", SHELL_CODE + deep)
+        result = run_bandit(path, max_ast_depth=30, limit_policy="partial")
+
+    [entry] = result["skipped"]
+    assert entry["reason"] == "max_ast_depth"
+    assert entry["action"] == "partial"
+    assert "6-6" in entry["detail"]
+    lines = {r["line_number"] for r in result["results"] if r["test_id"] == "B602"}
+    assert lines == {5}
+
+
+def test_temp_copies_stay_out_of_the_file_cache():
+    """Only the real file is cached; scanned temp copies are read directly."""
+    files.clear_cache()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = _write_file(tmpdir, "vuln.py", SHELL_CODE)
+        patched = SHELL_CODE.replace("cmd, shell=True", '["ls", cmd]')
+        evaluate_patch(file_path=path, patched_content=patched)
+        tools.evaluate_patches({path: patched})
+        assert list(files._cache) == [str(Path(path).resolve())]
+
+
+def test_run_bandit_isolates_file_that_times_out(monkeypatch):
+    """A batch that times out is split until the slow file is isolated."""
+    real_batch = tools._run_bandit_batch
+
+    def fake_batch(files, timeout, max_memory_mb):
+        if any(f.endswith("slow.py") for f in files):
+            raise subprocess.TimeoutExpired(cmd="bandit", timeout=timeout)
+        return real_batch(files, timeout, max_memory_mb)
+
+    monkeypatch.setattr(tools, "_run_bandit_batch", fake_batch)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write_file(tmpdir, "vuln.py", SHELL_CODE)
+        _write_file(tmpdir, "safe.py", "def add(a, b):\n    return a + b\n")
+        slow = _write_file(tmpdir, "slow.py", "x = 1\n")
+        result = run_bandit(tmpdir, file_timeout=5)
+
+    assert [(s["filename"], s["reason"]) for s in result["skipped"]] == [
+        (slow, "file_timeout")
+    ]
+    assert result["summary"]["SEVERITY.HIGH"] >= 1
+
+
+def test_run_bandit_hung_file_in_large_batch_spares_the_rest(monkeypatch):
+    """A hung file does not use up the scan deadline for its whole batch."""
+    scanned = []
+
+    def fake_batch(files, timeout, max_memory_mb):
+        if any(f.endswith("hung.py") for f in files):
+            time.sleep(timeout)
+            raise subprocess.TimeoutExpired(cmd="bandit", timeout=timeout)
+        scanned.extend(files)
+        return {"results": [], "errors": [], "metrics": {"_totals": {}}}
+
+    monkeypatch.setattr(tools, "_run_bandit_batch", fake_batch)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        others = [_write_file(tmpdir, f"mod{i}.py", "x = 1\n") for i in range(15)]
+        hung = _write_file(tmpdir, "hung.py", "x = 1\n")
+        result = run_bandit(tmpdir, scan_timeout=1.0, file_timeout=0.5)
+
+    assert sorted(scanned) == sorted(others)
+    assert [s["filename"] for s in result["skipped"]] == [hung]